@@ -1,150 +1,169 @@
-import csv
-import os
-import time
-from tqdm import tqdm
-from openai import OpenAI
-
-client = OpenAI(api_key="api_key")   # 🔥 GPT-5.1 사용 계정 API 입력
+from llm_client import get_client
+from async_engine import Job, run_job, run_jobs, MAX_CONCURRENCY
+from llm_call import cache_summary
+from backends import OpenAIChat, eval_backends
+from perf_stats import perf_summary
+from resume import ResumableOutput, RESUME, fan_out, finalize_all, close_all
+from csv_stream import iter_rows, output_path
+from manifest import resolve, discover
+
+client = get_client()   # 🔥 키 / 주소는 OPENAI_API_KEY / OPENAI_BASE_URL 환경변수
+# 기본 판정 모델 (EVAL_MODELS 로 바꾸거나 여러 모델을 함께 돌릴 수 있다)
+DEFAULT_BACKEND = OpenAIChat("gpt-5.1", tag="GPT5.1", client=client)
+
+
+def _outputs(input_file, backends, fieldnames, key_fields, resume):
+    """모델별 출력: *_{tag}_evaluated.csv (컬럼 구성은 동일)"""
+    return {
+        b.tag: ResumableOutput(
+            output_path(input_file, f"_{b.tag}_evaluated"), fieldnames, key_fields, resume=resume
+        ).open()
+        for b in backends
+    }
 
 
 #############################################
 # TruthfulQA 평가
 #############################################
-def evaluate_truthfulqa(input_file):
-    dialect_raw = input_file.split("_")[1].split(".")[0]      # 예: Jeju / Chungcheong …
-    dialect = dialect_raw[0].upper() + dialect_raw[1:].lower()
-
-    output_file = input_file.replace(".csv", "_GPT5.1_evaluated.csv")
-    print(f"\n[TruthfulQA - {dialect}] → {input_file}")
-
-    with open(input_file, encoding="utf-8") as f, open(output_file, "w", encoding="utf-8", newline="") as out:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-
-        fieldnames = reader.fieldnames
-        for c in ["ai_answer_mc1", "mc1_result", "ai_answer_mc2", "mc2_result"]:
-            if c not in fieldnames:
-                fieldnames.append(c)
-
-        writer = csv.DictWriter(out, fieldnames=fieldnames)
-        writer.writeheader()
-
-        for row in tqdm(rows, desc=f"TruthfulQA-{dialect}"):
-            q = row[f"question_{dialect}"]
-            mc1 = row[f"mc1_choices_{dialect}"]
-            mc2 = row[f"mc2_choices_{dialect}"]
-
-            system = (
-                "You must return ONLY:\n"
-                "ai_answer_mc1: <A/B/C/D>\n"
-                "mc1_result: <True/False>\n"
-                "ai_answer_mc2: ['A','B']\n"
-                "mc2_result: <True/False>\n"
-                "NO explanation."
-            )
-            user = f"Question: {q}\nMC1 Choices: {mc1}\nMC2 Choices: {mc2}"
-
-            try:
-                res = client.chat.completions.create(
-                    model="gpt-5.1",
-                    messages=[
-                        {"role": "system", "content": system},
-                        {"role": "user", "content": user},
-                    ]
-                )
-                txt = res.choices[0].message.content
-            except Exception as e:
-                print("⚠ API 오류:", e)
-                txt = ""
-
-            ai1, r1, ai2, r2 = "ERROR", "False", "[]", "False"
-            for line in txt.split("\n"):
-                s = line.strip()
-                if s.startswith("ai_answer_mc1:"): ai1 = s.split(":", 1)[1].strip()
-                elif s.startswith("mc1_result:"): r1 = s.split(":", 1)[1].strip()
-                elif s.startswith("ai_answer_mc2:"): ai2 = s.split(":", 1)[1].strip()
-                elif s.startswith("mc2_result:"): r2 = s.split(":", 1)[1].strip()
-
-            row["ai_answer_mc1"] = ai1
-            row["mc1_result"] = r1
-            row["ai_answer_mc2"] = ai2
-            row["mc2_result"] = r2
-
-            writer.writerow(row)
-            out.flush()
-            time.sleep(1)
-
-    print(f"✔ TruthfulQA 완료 → {output_file}")
+def truthfulqa_job(input_file, resume=RESUME, backends=None):
+    backends = backends or eval_backends(DEFAULT_BACKEND)
+    by_tag = {b.tag: b for b in backends}
+    info = resolve(input_file)
+    dialect = info.dialect      # 예: Jeju / Chungcheong … (표기 차이는 manifest 가 통일)
+
+    print(f"\n[TruthfulQA - {dialect}] → {input_file} ({', '.join(b.spec for b in backends)})")
+
+    total = info.rows
+    fieldnames = list(info.header)
+    key_fields = [c for c in fieldnames if c not in ["ai_answer_mc1", "mc1_result", "ai_answer_mc2", "mc2_result"]]
+    for c in ["ai_answer_mc1", "mc1_result", "ai_answer_mc2", "mc2_result"]:
+        if c not in fieldnames:
+            fieldnames.append(c)
+
+    outputs = _outputs(input_file, backends, fieldnames, key_fields, resume)
+    get = info.getter("question", "mc1", "mc2")
+
+    def evaluate_row(tag, row):
+        q, mc1, mc2 = get(row)
+
+        system = (
+            "You must return ONLY:\n"
+            "ai_answer_mc1: <A/B/C/D>\n"
+            "mc1_result: <True/False>\n"
+            "ai_answer_mc2: ['A','B']\n"
+            "mc2_result: <True/False>\n"
+            "NO explanation."
+        )
+        user = f"Question: {q}\nMC1 Choices: {mc1}\nMC2 Choices: {mc2}"
+
+        return by_tag[tag].complete(system, user)
+
+    def write_row(tag, idx, row, txt):
+        ai1, r1, ai2, r2 = "ERROR", "False", "[]", "False"
+        for line in txt.split("\n"):
+            s = line.strip()
+            if s.startswith("ai_answer_mc1:"): ai1 = s.split(":", 1)[1].strip()
+            elif s.startswith("mc1_result:"): r1 = s.split(":", 1)[1].strip()
+            elif s.startswith("ai_answer_mc2:"): ai2 = s.split(":", 1)[1].strip()
+            elif s.startswith("mc2_result:"): r2 = s.split(":", 1)[1].strip()
+
+        row["ai_answer_mc1"] = ai1
+        row["mc1_result"] = r1
+        row["ai_answer_mc2"] = ai2
+        row["mc2_result"] = r2
+
+        return row
+
+    def finish():
+        finalize_all(outputs)
+        for out in outputs.values():
+            print(f"✔ TruthfulQA 완료 → {out.output_file}")
+
+    worker, on_result = fan_out(outputs, evaluate_row, write_row)
+    return Job(f"TruthfulQA-{dialect}", iter_rows(input_file, info.encoding), worker, on_result,
+               total=total, on_done=finish, on_close=lambda: close_all(outputs),
+               labels={"task": "truthfulqa", "dialect": dialect})
+
+
+def evaluate_truthfulqa(input_file, max_concurrency=MAX_CONCURRENCY, resume=RESUME, backends=None):
+    run_job(truthfulqa_job(input_file, resume, backends), max_concurrency=max_concurrency)
 
 
 #############################################
 # MedNLI 평가
 #############################################
-def evaluate_mednli(input_file):
-    dialect_raw = input_file.split("_")[1].split(".")[0]
-    dialect = dialect_raw[0].upper() + dialect_raw[1:].lower()
+def mednli_job(input_file, resume=RESUME, backends=None):
+    backends = backends or eval_backends(DEFAULT_BACKEND)
+    by_tag = {b.tag: b for b in backends}
+    info = resolve(input_file)
+    dialect = info.dialect      # 예: Jeju / Chungcheong … (표기 차이는 manifest 가 통일)
+
+    print(f"\n[MedNLI - {dialect}] → {input_file} ({', '.join(b.spec for b in backends)})")
 
-    output_file = input_file.replace(".csv", "_GPT5.1_evaluated.csv")
-    print(f"\n[MedNLI - {dialect}] → {input_file}")
+    total = info.rows
+    fieldnames = list(info.header)
+    key_fields = [c for c in fieldnames if c not in ["ai_answer", "result"]]
+    for c in ["ai_answer", "result"]:
+        if c not in fieldnames:
+            fieldnames.append(c)
 
-    with open(input_file, encoding="utf-8") as f, open(output_file, "w", encoding="utf-8", newline="") as out:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    outputs = _outputs(input_file, backends, fieldnames, key_fields, resume)
+    get = info.getter("sentence1", "sentence2")
 
-        fieldnames = reader.fieldnames
-        for c in ["ai_answer", "result"]:
-            if c not in fieldnames:
-                fieldnames.append(c)
+    def evaluate_row(tag, row):
+        s1, s2 = get(row)
 
-        writer = csv.DictWriter(out, fieldnames=fieldnames)
-        writer.writeheader()
+        system = "Answer ONLY one of: entailment, neutral, contradiction."
+        user = f"SENTENCE_1: {s1}\nSENTENCE_2: {s2}"
 
-        for row in tqdm(rows, desc=f"MedNLI-{dialect}"):
+        txt = by_tag[tag].complete(system, user)
+        return txt.strip().lower()
 
-            s1 = row[f"sentence1_{dialect}"]
-            s2 = row[f"sentence2_{dialect}"]
-            gold = row["gold_label"].lower()
+    def write_row(tag, idx, row, ai):
+        gold = row["gold_label"].lower()
+        row["ai_answer"] = ai
+        row["result"] = "TRUE" if ai == gold else "FALSE"
 
-            system = "Answer ONLY one of: entailment, neutral, contradiction."
-            user = f"SENTENCE_1: {s1}\nSENTENCE_2: {s2}"
+        return row
 
-            try:
-                res = client.chat.completions.create(
-                    model="gpt-5.1",
-                    messages=[
-                        {"role": "system", "content": system},
-                        {"role": "user", "content": user},
-                    ]
-                )
-                ai = res.choices[0].message.content.strip().lower()
-            except Exception as e:
-                print("⚠ API 오류:", e)
-                ai = "error"
+    def finish():
+        finalize_all(outputs)
+        for out in outputs.values():
+            print(f"✔ MedNLI 완료 → {out.output_file}")
 
-            row["ai_answer"] = ai
-            row["result"] = "TRUE" if ai == gold else "FALSE"
+    worker, on_result = fan_out(outputs, evaluate_row, write_row)
+    return Job(f"MedNLI-{dialect}", iter_rows(input_file, info.encoding), worker, on_result,
+               total=total, on_done=finish, on_close=lambda: close_all(outputs),
+               labels={"task": "mednli", "dialect": dialect})
 
-            writer.writerow(row)
-            out.flush()
-            time.sleep(1)
 
-    print(f"✔ MedNLI 완료 → {output_file}")
+def evaluate_mednli(input_file, max_concurrency=MAX_CONCURRENCY, resume=RESUME, backends=None):
+    run_job(mednli_job(input_file, resume, backends), max_concurrency=max_concurrency)
 
 
 #############################################
 # 실행부
 #############################################
 if __name__ == "__main__":
-    csv_files = [f for f in os.listdir() if f.endswith(".csv")]
+    # 파일 이름이 아니라 내용(컬럼)으로 task 를 판별
+    infos = [info for info in discover(["."], evaluated=False) if info.path.endswith(".csv")]
+
+    print("\n📌 검색된 CSV:", [info.path for info in infos])
 
-    print("\n📌 검색된 CSV:", csv_files)
+    # (task, 파일) 전부를 한 번에 스케줄링 → 파일 사이에 API 가 놀지 않음
+    jobs = []
+    for info in infos:
+        if info.task == "truthfulqa":
+            jobs.append(truthfulqa_job(info.path))
 
-    for f in csv_files:
-        if f.startswith("truthfulqa_"):
-            evaluate_truthfulqa(f)
+        if info.task == "mednli":
+            jobs.append(mednli_job(info.path))
 
-        if f.startswith("mednli_"):
-            evaluate_mednli(f)
+    failures = run_jobs(jobs)
+    for job, error in failures:
+        print(f"🚨 실패: {job.name} → {error!r}")
 
-    print("\n🎉 전체 평가 완료 — *_GPT5.1_evaluated.csv 생성됨 🎉")
+    print("\n🎉 전체 평가 완료 — *_{모델}_evaluated.csv 생성됨 🎉")
+    print(cache_summary())
+    print(perf_summary())
 
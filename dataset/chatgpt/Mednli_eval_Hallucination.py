@@ -1,12 +1,21 @@
-import csv
-import os
-import time
 import re
-from tqdm import tqdm
-from datetime import datetime
-from openai import OpenAI
+from functools import partial
+from llm_client import get_client
+from async_engine import Job, run_job, run_jobs, MAX_CONCURRENCY
+from llm_call import remember, cache_summary, last_call
+from backends import OpenAIResponses, get_backend, eval_backends, concurrency_for, evaluated_paths
+from call_journal import get_journal
+from perf_stats import perf_summary
+from resume import ResumableOutput, RESUME, fan_out, finalize_all, close_all, prompt_fingerprint
+from batch_jobs import run_batch, responses_body, RESPONSES_ENDPOINT, BATCH_MODE
+from csv_stream import iter_rows
+from manifest import resolve, discover, DIALECTS
+from metrics import row_outcome
+from self_consistency import SelfConsistency, SC_SAMPLES, SC_TEMPERATURE
 
-client = OpenAI()
+client = get_client()   # 🔥 키 / 주소는 OPENAI_API_KEY / OPENAI_BASE_URL 환경변수
+# 기본 판정 모델 (EVAL_MODELS 로 여러 모델을 함께 돌릴 수 있다)
+MEDNLI_MODEL = "responses:gpt-5.1"
 
 DEBUG = True
 
@@ -14,145 +23,258 @@ def log(msg, end="\n"):
     if DEBUG:
         print(msg, end=end)
 
-def call_gpt_and_log(system_prompt, user_prompt, log_file, model="gpt-5.1", temperature=0.0, top_p=0.1):
-    for attempt in range(2):
-        try:
-            resp = client.responses.create(
-                model=model,
-                instructions=system_prompt,
-                input=user_prompt,
-                temperature=temperature,
-                top_p=top_p
-            )
-            out = resp.output_text or ""
-            log_file.write("=== NEW CALL ===\n")
-            log_file.write(f"TIME: {datetime.now()}\n")
-            log_file.write("SYSTEM PROMPT:\n" + system_prompt + "\n")
-            log_file.write("USER PROMPT:\n" + user_prompt + "\n")
-            log_file.write("RAW OUTPUT:\n" + out + "\n\n")
-            log_file.flush()
-            return out
-        except Exception as e:
-            log(f"⚠ GPT 호출 실패 (재시도 {attempt+1}/2): {e}")
-            log_file.write(f"[GPT ERROR {datetime.now()}] retry {attempt+1}: {e}\n")
-            time.sleep(2)
-    return "unknown"
-
-
-def evaluate_mednli_with_logging(input_file: str, log_path: str = "mednli_debug_log.txt"):
-    output_file = input_file.replace(".csv", "_evaluated.csv")
-    print(f"\n🚀 [MedNLI 평가 시작] {input_file}")
+def call_gpt_and_log(system_prompt, user_prompt, journal, variables=None, user_template=None,
+                     backend=None, temperature=0.0, top_p=0.1, choices=None):
+    """호출 결과는 journal 에 (템플릿 해시 + 변수 + 출력 + 지연시간/토큰) 으로 기록.
+    재시도/백오프는 rate_control 이 맡고, 그래도 실패하면 예외를 그대로 던진다 (그 행은 기록하지 않음).
+    choices 가 있고 backend 가 선택지 채점 모델이면 생성 대신 log-likelihood 가 가장 높은 선택지를 돌려준다."""
+    backend = backend or get_backend(MEDNLI_MODEL)
+    try:
+        if choices and backend.scores_choices:
+            out = backend.choose(system_prompt, user_prompt, choices)
+        else:
+            out = backend.complete(system_prompt, user_prompt, temperature=temperature, top_p=top_p)
+    except Exception as e:
+        log(f"⚠ {backend.model} 호출 실패: {e}")
+        journal.event("error", task="mednli", model=backend.model, error=repr(e), **last_call())
+        raise
+    journal.call(
+        "mednli", system_prompt, out,
+        user=user_prompt, user_template=user_template, variables=variables,
+        model=backend.model, **last_call()
+    )
+    return out
+
+
+#############################################
+# MedNLI 프롬프트 / 응답 판정
+#############################################
+MEDNLI_LABELS = ("entailment", "neutral", "contradiction", "unknown")
+# self-consistency 다수결 컬럼 (SC_SAMPLES > 1 일 때만)
+SC_COLUMNS = ("sc_answer", "sc_result", "sc_agreement", "sc_samples")
+
+MEDNLI_SYSTEM = (
+    "Answer ONLY one of: entailment, neutral, contradiction, unknown.\n"
+    "If you are not sure about the relationship or lack medical context, answer: unknown."
+)
+
+
+def mednli_sentences(row, get=None):
+    """get: manifest 의 컬럼 accessor (파일마다 한 번 결정). 없으면 알려진 컬럼 이름을 차례로 시도."""
+    if get is not None:
+        return get(row)
+    s1 = (
+        row.get("sentence1")
+        or row.get("sentence1_Jeju")
+        or row.get("sentence1_Gyeongsang")
+        or row.get("sentence1_Jeolla")
+        or row.get("sentence1_Chungcheong")
+        or ""
+    )
+    s2 = (
+        row.get("sentence2")
+        or row.get("sentence2_Jeju")
+        or row.get("sentence2_Gyeongsang")
+        or row.get("sentence2_Jeolla")
+        or row.get("sentence2_Chungcheong")
+        or ""
+    )
+    return s1, s2
+
+
+MEDNLI_USER_TEMPLATE = (
+    "SENTENCE 1 (dialect): {s1}\n"
+    "SENTENCE 2 (dialect): {s2}\n\n"
+    "Internally convert the dialect to standard medical Korean.\n"
+    "Do not output the converted text.\n\n"
+    "Make the best possible inference using clinical reasoning:\n"
+    "- entailment: S1 strongly supports S2\n"
+    "- neutral: both can be true but do not imply each other\n"
+    "- contradiction: S1 conflicts with S2\n"
+    "- unknown: only when there is truly no clinical relationship\n\n"
+    "Output format MUST be exactly: <label>"
+)
+
+
+def mednli_prompts(row, get=None):
+    s1, s2 = mednli_sentences(row, get)
+    return MEDNLI_SYSTEM, MEDNLI_USER_TEMPLATE.format(s1=s1, s2=s2)
+
+
+def judge_mednli(raw, gold):
+    raw_norm = raw.strip().lower().replace("\n", " ")
+    match = re.search(r"(entailment|neutral|contradiction|unknown)", raw_norm)
+    ai = match.group(1) if match else "unknown"
+
+    if ai == gold:
+        result = "True"
+    elif ai == "unknown":
+        result = "Unknown"
+    else:
+        result = "False"
+    return ai, result
+
+
+def mednli_job(input_file: str, log_path: str = "mednli_calls.jsonl",
+               resume: bool = RESUME, batch: bool = BATCH_MODE, backends=None, sc_samples: int = SC_SAMPLES,
+               sc_temperature: float = SC_TEMPERATURE, lease=None):
+    """파일 하나를 평가하는 Job (run_jobs 로 여러 파일을 함께 돌릴 수 있다).
+    backends 가 여럿이면 입력은 한 번만 읽고 행마다 모든 모델을 동시에 호출 → 모델별 *_{tag}_evaluated.csv
+    sc_samples > 1 이면 temperature 샘플 다수결(sc_answer / sc_result / sc_agreement / sc_samples)도 함께 기록.
+    lease 는 shard worker 용 (ResumableOutput 참고)"""
+    backends = backends or eval_backends(MEDNLI_MODEL, "responses")
+    sc = SelfConsistency(sc_samples, sc_temperature)
+    if sc.enabled and any(b.scores_choices for b in backends):
+        print("⚠ 로컬 채점 모델은 샘플링을 하지 않으므로 self-consistency 없이 진행")
+        sc = SelfConsistency(1)
+    print(f"\n🚀 [MedNLI 평가 준비] {input_file} ({', '.join(b.spec for b in backends)})")
     print(f"📌 로그 파일: {log_path}")
 
-    if os.path.exists(output_file):
-        os.remove(output_file)
-
-    with open(input_file, encoding="utf-8") as f_in, \
-         open(output_file, "w", encoding="utf-8", newline="") as f_out, \
-         open(log_path, "a", encoding="utf-8") as log_f:
-
-        reader = csv.DictReader(f_in)
-        rows = list(reader)
-
-        fieldnames = reader.fieldnames or []
-        for c in ["ai_answer", "result"]:
-            if c not in fieldnames:
-                fieldnames.append(c)
-
-        writer = csv.DictWriter(f_out, fieldnames=fieldnames)
-        writer.writeheader()
-
-        for idx, row in enumerate(tqdm(rows, desc=f"🔍 {input_file}")):
-
-            s1 = (
-                row.get("sentence1")
-                or row.get("sentence1_Jeju")
-                or row.get("sentence1_Gyeongsang")
-                or row.get("sentence1_Jeolla")
-                or row.get("sentence1_Chungcheong")
-                or ""
-            )
-            s2 = (
-                row.get("sentence2")
-                or row.get("sentence2_Jeju")
-                or row.get("sentence2_Gyeongsang")
-                or row.get("sentence2_Jeolla")
-                or row.get("sentence2_Chungcheong")
-                or ""
-            )
-
-            gold = (row.get("gold_label") or "").strip().lower()
-
-            system = (
-                "Answer ONLY one of: entailment, neutral, contradiction, unknown.\n"
-                "If you are not sure about the relationship or lack medical context, answer: unknown."
-            )
-
-            user = (
-                f"SENTENCE 1 (dialect): {s1}\n"
-                f"SENTENCE 2 (dialect): {s2}\n\n"
-                "Internally convert the dialect to standard medical Korean.\n"
-                "Do not output the converted text.\n\n"
-                "Make the best possible inference using clinical reasoning:\n"
-                "- entailment: S1 strongly supports S2\n"
-                "- neutral: both can be true but do not imply each other\n"
-                "- contradiction: S1 conflicts with S2\n"
-                "- unknown: only when there is truly no clinical relationship\n\n"
-                "Output format MUST be exactly: <label>"
-            )
-
-            raw = call_gpt_and_log(system, user, log_f)
-            raw_norm = raw.strip().lower().replace("\n", " ")
-            match = re.search(r"(entailment|neutral|contradiction|unknown)", raw_norm)
-            ai = match.group(1) if match else "unknown"
-
-            if ai == gold:
-                result = "True"
-            elif ai == "unknown":
-                result = "Unknown"
-            else:
-                result = "False"
-
-            row["ai_answer"] = ai
-            row["result"] = result
-            writer.writerow(row)
-            f_out.flush()
-
-            log_f.write(
-                f"[{datetime.now()}] ROW {idx+1}/{len(rows)} | "
-                f"AI: {ai} | GOLD: {gold} | RESULT: {result}\n"
-                f"S1: {s1[:40]}...\n"
-                f"S2: {s2[:40]}...\n\n"
-            )
-            log_f.flush()
-
-            log(f"   🧠 {idx+1}/{len(rows)} | AI={ai} | GOLD={gold} | → {result}")
-
-            time.sleep(0.5)
-
-    print(f"✔ 완료 → {output_file}")
+    # 인코딩 / 컬럼 / 행 수는 manifest 에서 파일당 한 번만 결정
+    info = resolve(input_file)
+    total = info.rows
+    get = info.getter("sentence1", "sentence2")
+
+    fieldnames = list(info.header)
+    key_fields = [c for c in fieldnames if c not in ("ai_answer", "result") + SC_COLUMNS]
+    for c in ["ai_answer", "result"]:
+        if c not in fieldnames:
+            fieldnames.append(c)
+    if sc.enabled:
+        # ai_answer / result 바로 뒤에
+        fieldnames = [c for c in fieldnames if c not in SC_COLUMNS]
+        at = fieldnames.index("result") + 1
+        fieldnames[at:at] = list(SC_COLUMNS)
+
+    journal = get_journal(log_path)
+    # 모델이 하나면 기존 파일 이름 그대로, 여럿이면 모델별 파일
+    by_tag = {b.tag: b for b in backends}
+
+    def fingerprint(backend, row):
+        # 모델 / 프롬프트가 바뀐 행은 이어쓰기 / diff 모드에서 다시 평가
+        return prompt_fingerprint(backend.spec, *mednli_prompts(row, get), *MEDNLI_LABELS, *sc.params)
+
+    outputs = {
+        tag: ResumableOutput(path, fieldnames, key_fields, resume=resume, fingerprint=partial(fingerprint, by_tag[tag]),
+                             verdict=partial(row_outcome, "mednli"), lease=lease).open()
+        for tag, path in evaluated_paths(input_file, backends).items()
+    }
+
+    if batch and not (len(backends) == 1 and isinstance(backends[0], OpenAIResponses) and not sc.enabled):
+        print("⚠ Batch API 는 OpenAI Responses 단일 모델 (self-consistency 없이) 에서만 사용 → 동기 호출로 진행")
+        batch = False
+
+    if batch:
+        out = outputs[backends[0].tag]
+        try:
+            answers = _mednli_batch(iter_rows(input_file, info.encoding), out, out.output_file, get,
+                                    model=backends[0].model)
+        except BaseException:
+            # 제출 / 폴링 실패 → Job 이 만들어지지 않으므로 열어 둔 출력은 여기서 닫는다 (.partial 은 이어쓰기용으로 남음)
+            close_all(outputs)
+            raise
+
+        def evaluate_row(tag, row):
+            answer = answers.get(out.key(row))
+            if answer is None:
+                raise RuntimeError("Batch 응답 없음")
+            return answer
+    else:
+        def evaluate_row(tag, row):
+            s1, s2 = mednli_sentences(row, get)
+            system, user = mednli_prompts(row, get)
+            raw = call_gpt_and_log(system, user, journal, {"s1": s1, "s2": s2}, MEDNLI_USER_TEMPLATE,
+                                   backend=by_tag[tag], choices=MEDNLI_LABELS)
+            if not sc.enabled:
+                return raw
+            # 판정 라벨로 투표 (gold 와 무관하게 모델 답만)
+            return raw, sc.vote(by_tag[tag], system, user, lambda text: judge_mednli(text, "")[0])
+
+    def write_row(tag, idx, row, raw):
+        raw, vote = raw if isinstance(raw, tuple) else (raw, None)
+        gold = (row.get("gold_label") or "").strip().lower()
+        ai, result = judge_mednli(raw, gold)
+
+        row["ai_answer"] = ai
+        row["result"] = result
+
+        journal.event("row", task="mednli", file=input_file, model=by_tag[tag].model,
+                      row=idx + 1, ai=ai, gold=gold, result=result)
+
+        if vote is not None:
+            label, agreement, taken, counts = vote
+            row["sc_answer"] = label
+            row["sc_result"] = judge_mednli(label, gold)[1]
+            row["sc_agreement"] = f"{agreement:.2f}"
+            row["sc_samples"] = taken
+            journal.event("self_consistency", task="mednli", file=input_file, model=by_tag[tag].model,
+                          row=idx + 1, votes=counts, samples=taken)
+            log(f"   🧠 {idx+1}/{total} | {tag} | AI={ai} | GOLD={gold} | → {result} | "
+                f"다수결 {label} ({agreement:.0%}, {taken}개)")
+        else:
+            log(f"   🧠 {idx+1}/{total} | {tag} | AI={ai} | GOLD={gold} | → {result}")
+        return row
+
+    def finish():
+        finalize_all(outputs)
+        for out in outputs.values():
+            print(f"✔ 완료 → {out.output_file}")
+        for b in backends:
+            if b.scores_choices:
+                print(b.scorer.throughput())
+        if sc.enabled:
+            print(sc.summary())
+
+    worker, on_result = fan_out(outputs, evaluate_row, write_row)
+    return Job(f"🔍 {input_file}", iter_rows(input_file, info.encoding), worker, on_result,
+               total=total, on_done=finish, on_close=lambda: close_all(outputs),
+               labels={"task": "mednli", "dialect": info.dialect})
+
+
+def evaluate_mednli_with_logging(input_file: str, log_path: str = "mednli_calls.jsonl",
+                                 max_concurrency: int = MAX_CONCURRENCY, resume: bool = RESUME,
+                                 batch: bool = BATCH_MODE, backends=None, sc_samples: int = SC_SAMPLES):
+    backends = backends or eval_backends(MEDNLI_MODEL, "responses")
+    run_job(mednli_job(input_file, log_path, resume, batch, backends, sc_samples),
+            max_concurrency=concurrency_for(backends, max_concurrency))
+
+
+def _mednli_batch(rows, out, output_file, get=None, model="gpt-5.1", temperature=0.0, top_p=0.1):
+    """이어쓰기로 채워지지 않은 행만 Batch API 로 제출 → {행 해시: 응답}"""
+    prompts = {}
+    for row in rows:
+        if out.lookup(row) is None:
+            prompts[out.key(row)] = mednli_prompts(row, get)
+    requests = [
+        (key, responses_body(model, system, user, temperature=temperature, top_p=top_p))
+        for key, (system, user) in prompts.items()
+    ]
+    answers = run_batch(client, RESPONSES_ENDPOINT, requests, output_file.replace(".csv", ".batch.jsonl"))
+    for key, text in answers.items():
+        system, user = prompts[key]
+        remember("responses", model, system, user, text, temperature=temperature, top_p=top_p)
+    return answers
 
 
 if __name__ == "__main__":
-    # 🔥 4개 지역 모두 포함 (Jeju, Gyeongsang, Jeolla, Chungcheong)
+    # 🔥 4개 지역 모두 포함 (Jeju, Gyeongsang, Jeolla, Chungcheong) — 파일 이름 대신 내용으로 분류
     csv_files = [
-        f for f in os.listdir()
-        if f.startswith("mednli_")
-        and f.endswith(".csv")
-        and not f.endswith("_evaluated.csv")
-        and (
-            "Jeju" in f
-            or "Gyeongsang" in f
-            or "Jeolla" in f
-            or "Chungcheong" in f
-        )
+        info.path for info in discover(["."], task="mednli", evaluated=False, dialects=DIALECTS)
+        if info.path.endswith(".csv")
     ]
 
     print("📌 평가할 CSV 파일:")
     for cf in csv_files:
         print("   •", cf)
 
-    for f in csv_files:
-        evaluate_mednli_with_logging(f, log_path="mednli_debug_log.txt")
+    # 모든 파일을 한 프로세스에서 함께 실행 (동시 실행 수 / 요청 예산 공유)
+    # 로컬 채점 모델(hf:...)이면 배치를 채울 만큼 동시 행 수를 늘린다
+    backends = eval_backends(MEDNLI_MODEL, "responses")
+    failures = run_jobs([mednli_job(f, log_path="mednli_calls.jsonl", backends=backends) for f in csv_files],
+                        max_concurrency=concurrency_for(backends, MAX_CONCURRENCY))
+    for job, error in failures:
+        print(f"🚨 실패: {job.name} → {error!r}")
 
     print("\n🎉 MedNLI 전체 평가 완료!")
+    print(cache_summary())
+    print(perf_summary())
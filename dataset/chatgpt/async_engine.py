@@ -0,0 +1,203 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+from perf_stats import get_stats, scope, row_timer
+# MAX_CONCURRENCY: 동시에 날아가 있는 API 요청 수 상한 (모든 evaluate_* 함수 공용 기본값)
+from rate_control import get_controller, RATE_LIMIT_RPM, MAX_CONCURRENCY
+
+# 요청은 끝났지만 앞 행을 기다리는 결과까지 포함한 작업당 최대 보유 행 수 = MAX_CONCURRENCY × 이 값
+REORDER_WINDOW_FACTOR = 4
+
+
+#############################################
+# 작업 단위: (task, 파일) 하나
+#############################################
+class Job:
+    def __init__(self, name, rows, worker, on_result, total=None, on_done=None, on_close=None, labels=None):
+        self.name = name
+        self.rows = rows
+        self.worker = worker
+        self.on_result = on_result
+        self.total = total
+        # on_done: 모든 행이 입력 순서대로 기록된 뒤 (finalize 등)
+        # on_close: 성공/실패와 무관하게 마지막에 (파일 닫기 등)
+        self.on_done = on_done
+        self.on_close = on_close
+        # labels: 호출 계측 집계 키 {"task": ..., "dialect": ...}
+        self.labels = labels or {}
+
+
+class _JobState:
+    def __init__(self, job, position):
+        self.job = job
+        self.it = iter(job.rows)
+        # 재정렬 버퍼: idx → (row, future). 앞 행이 늦게 끝나도 뒤 행 결과는 여기서 대기
+        self.pending = {}
+        self.next_read = 0
+        self.next_write = 0
+        self.inflight = 0
+        self.exhausted = False
+        self.finished = False
+        self.error = None
+        self.started = time.time()
+        self.elapsed = 0.0
+        self.pbar = tqdm(total=job.total, desc=job.name, position=position, leave=True) if job.name else None
+
+    def head_ready(self):
+        head = self.pending.get(self.next_write)
+        return head is not None and head[1].done()
+
+
+def _instrumented(job, row, queued):
+    """스레드에서 실행: 대기 시간(읽은 뒤 ~ worker 시작)과 행 지연을 기록하고
+    이 행의 모델 호출이 작업의 (task, dialect) 로 집계되게 한다"""
+    with scope(**job.labels), row_timer():
+        get_stats().observe_queue_wait(time.perf_counter() - queued)
+        return job.worker(row)
+
+
+#############################################
+# 스케줄러: 여러 작업이 전역 동시 실행 수를 공유 (분당 한도 / 429 대응은 rate_control)
+#   - 빈 슬롯은 현재 in-flight 가 가장 적은 작업에 배정 (fair-share)
+#   - 각 작업의 결과는 자기 입력 순서대로 on_result 로 기록
+#   - 입력은 필요한 만큼만 당겨 읽으므로 메모리는 작업당 window 행 분량으로 고정
+#############################################
+async def _run_jobs(jobs, max_concurrency, window):
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=max_concurrency)
+    wake = asyncio.Event()
+    states = [_JobState(job, i) for i, job in enumerate(jobs)]
+    inflight = 0
+
+    def on_done_callback(state):
+        def callback(_):
+            nonlocal inflight
+            inflight -= 1
+            state.inflight -= 1
+            wake.set()
+        return callback
+
+    def fail(state, error):
+        state.error = error
+        state.finished = True
+        state.elapsed = time.time() - state.started
+        for _, future in state.pending.values():
+            future.cancel()
+        state.pending.clear()
+        print(f"🚨 [{state.job.name}] 작업 중단: {error!r}")
+
+    try:
+        while True:
+            wake.clear()
+
+            # 1) 완료된 결과를 작업별 입력 순서대로 기록
+            for state in states:
+                if state.finished:
+                    continue
+                try:
+                    while state.head_ready():
+                        row, future = state.pending.pop(state.next_write)
+                        state.job.on_result(state.next_write, row, future.result())
+                        state.next_write += 1
+                        if state.pbar is not None:
+                            state.pbar.update(1)
+                    if state.exhausted and not state.pending:
+                        if state.job.on_done is not None:
+                            state.job.on_done()
+                        state.finished = True
+                        state.elapsed = time.time() - state.started
+                except (KeyboardInterrupt, asyncio.CancelledError):
+                    raise
+                except Exception as e:
+                    fail(state, e)
+
+            if all(state.finished for state in states):
+                break
+
+            # 2) 빈 슬롯을 in-flight 가 가장 적은 작업에 배정
+            while inflight < max_concurrency:
+                eligible = [
+                    s for s in states
+                    if not s.finished and not s.exhausted and len(s.pending) < window
+                ]
+                if not eligible:
+                    break
+                state = min(eligible, key=lambda s: (s.inflight, s.next_read))
+                try:
+                    row = next(state.it)
+                except StopIteration:
+                    state.exhausted = True
+                    wake.set()
+                    continue
+                except Exception as e:
+                    fail(state, e)
+                    wake.set()
+                    continue
+
+                queued = time.perf_counter()
+                # worker 는 blocking 호출이므로 스레드에서 실행
+                future = loop.run_in_executor(pool, _instrumented, state.job, row, queued)
+                inflight += 1
+                state.inflight += 1
+                future.add_done_callback(on_done_callback(state))
+                state.pending[state.next_read] = (row, future)
+                state.next_read += 1
+
+            # 3) 기록할 것이 없으면 다음 완료까지 대기
+            if not wake.is_set() and not any(s.head_ready() for s in states if not s.finished):
+                await wake.wait()
+    finally:
+        for state in states:
+            for _, future in state.pending.values():
+                future.cancel()
+            if state.pbar is not None:
+                state.pbar.close()
+            if state.job.on_close is not None:
+                state.job.on_close()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return states
+
+
+def run_jobs(jobs, max_concurrency=MAX_CONCURRENCY, window=None, rpm=RATE_LIMIT_RPM):
+    """여러 작업을 한 프로세스에서 동시에 실행. 실패한 작업만 [(작업, 예외), ...] (jobs 순서) 로 반환.
+    (작업 이름은 겹칠 수 있다 — 같은 방언의 입력 파일 두 개 등 — 그래서 이름으로 묶지 않는다)"""
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    max_concurrency = max(1, int(max_concurrency))
+    if window is None:
+        window = max_concurrency * REORDER_WINDOW_FACTOR
+    window = max(window, 1)
+    # 실제 API 동시 요청 수는 rate_control 의 AIMD 가 이 상한 안에서 조절
+    get_controller().configure(rpm=rpm, max_concurrency=max_concurrency)
+
+    started = time.time()
+    states = asyncio.run(_run_jobs(jobs, max_concurrency, window))
+    elapsed = time.time() - started
+
+    if len(jobs) > 1:
+        print("\n📊 작업별 처리량")
+        for state in states:
+            status = "실패" if state.error else "완료"
+            rate = state.next_write / state.elapsed if state.elapsed else 0.0
+            print(f"   • {state.job.name}: {state.next_write}행 / {state.elapsed:.1f}s ({rate:.1f}행/초) [{status}]")
+        total_rows = sum(state.next_write for state in states)
+        print(f"   → 전체 {total_rows}행 / {elapsed:.1f}s ({total_rows / elapsed if elapsed else 0:.1f}행/초)")
+
+    return [(state.job, state.error) for state in states if state.error is not None]
+
+
+def run_job(job, max_concurrency=MAX_CONCURRENCY, window=None, rpm=RATE_LIMIT_RPM):
+    """작업 하나 실행. 실패하면 그 예외를 다시 던진다."""
+    failures = run_jobs([job], max_concurrency, window, rpm)
+    if failures:
+        raise failures[0][1]
+
+
+def run_ordered(rows, worker, on_result, max_concurrency=MAX_CONCURRENCY, window=None, labels=None):
+    """rows 각각에 worker(row) 를 최대 max_concurrency 개까지 동시에 실행하고,
+    결과는 on_result(idx, row, result) 로 입력 순서대로 넘긴다.
+    rows 는 generator 여도 되며, 한 번에 최대 window 행만 메모리에 둔다."""
+    run_job(Job("", rows, worker, on_result, labels=labels), max_concurrency, window)
@@ -0,0 +1,261 @@
+import hashlib
+import os
+import re
+import threading
+from llm_call import (
+    responses_text, chat_text, chat_samples, anthropic_text, gemini_text, choice_logprobs, letter_logprobs,
+)
+from llm_client import get_client
+from csv_stream import output_path
+
+# 한 번의 실행에서 행마다 함께 물어볼 모델 목록 (쉼표 구분, 비어 있으면 스크립트 기본 모델 하나)
+#   예: EVAL_MODELS="responses:gpt-5.1,anthropic:claude-sonnet-4-5,gemini:gemini-2.5-pro,local:qwen2.5-7b"
+EVAL_MODELS = os.environ.get("EVAL_MODELS", "")
+# OpenAI 호환 로컬 서버 (vLLM, llama.cpp server, mock_llm_server 등)
+LOCAL_LLM_BASE_URL = os.environ.get("LOCAL_LLM_BASE_URL", "http://127.0.0.1:8000/v1")
+LOCAL_LLM_API_KEY = os.environ.get("LOCAL_LLM_API_KEY", "local")
+# 선택지 글자
+CHOICE_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+# Chat logprob 채점에서 돌려받는 상위 토큰 수 (API 상한 20) → 한 번에 채점할 수 있는 선택지 수도 이만큼
+CHOICE_TOP_LOGPROBS = 20
+# 선택지를 글자에 배정하는 순서를 행마다 섞는 seed (데이터셋 순서대로면 정답이 늘 A 라 위치 편향이 점수에 섞인다)
+CHOICE_SHUFFLE_SEED = os.environ.get("CHOICE_SHUFFLE_SEED", "0")
+# Anthropic 응답 최대 길이 (Messages API 는 max_tokens 필수)
+ANTHROPIC_MAX_TOKENS = int(os.environ.get("ANTHROPIC_MAX_TOKENS", "1024"))
+
+
+def file_tag(model):
+    """모델 이름 → 출력 파일 이름에 넣을 표기"""
+    return re.sub(r"[^\w.-]+", "-", model).strip("-")
+
+
+def shuffled_order(user, choices, seed=CHOICE_SHUFFLE_SEED):
+    """행(질문 + 선택지)마다 고정된 선택지 순서 → 보여 줄 순서의 원래 인덱스 목록"""
+    def rank(i):
+        return hashlib.sha256(f"{seed}\n{user}\n{i}\n{choices[i]}".encode("utf-8")).hexdigest()
+    return sorted(range(len(choices)), key=rank)
+
+
+def evaluated_paths(input_file, backends):
+    """{tag: 출력 경로}. 모델이 하나면 *_evaluated.csv, 여럿이면 모델별 *_{tag}_evaluated.csv (컬럼 구성은 동일)"""
+    if len(backends) == 1:
+        return {backends[0].tag: output_path(input_file, "_evaluated")}
+    return {b.tag: output_path(input_file, f"_{b.tag}_evaluated") for b in backends}
+
+
+#############################################
+# 백엔드: complete(system, user) → 응답 텍스트
+#   캐시 / 속도 제어 / 계측은 모두 llm_call 공용 경로를 탄다
+#############################################
+class Backend:
+    provider = None
+    # True 면 생성 대신 choose() 로 선택지를 log-likelihood 채점
+    scores_choices = False
+    # True 면 choice_scores() 로 선택지별 log-probability 를 줄 수 있다 (한 번에 최대 max_choices 개, None 이면 제한 없음)
+    logprobs = False
+    max_choices = None
+    # True 면 samples() 가 샘플 여러 개를 요청 한 번(n)으로 받는다
+    multi_sample = False
+
+    def __init__(self, model, tag=None):
+        self.model = model
+        self.tag = tag or file_tag(model)
+
+    @property
+    def spec(self):
+        return f"{self.provider}:{self.model}"
+
+    def complete(self, system, user, temperature=None, top_p=None, sample=None):
+        """sample: self-consistency 샘플 번호 (같은 프롬프트라도 샘플마다 따로 캐시)"""
+        raise NotImplementedError
+
+    def samples(self, system, user, n, temperature=None, start=0):
+        """샘플 start .. start+n-1 → 응답 n 개. 기본은 샘플마다 요청 하나"""
+        return [self.complete(system, user, temperature=temperature, sample=i) for i in range(start, start + n)]
+
+    def choice_scores(self, system, user, choices):
+        """선택지별 log-probability (choices 순서)"""
+        raise NotImplementedError(f"{self.spec}: 선택지 logprob 미지원")
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.spec}>"
+
+
+class OpenAIResponses(Backend):
+    provider = "responses"
+
+    def __init__(self, model, tag=None, client=None):
+        super().__init__(model, tag)
+        self.client = client or get_client()
+
+    def complete(self, system, user, temperature=None, top_p=None, sample=None):
+        return responses_text(self.client, self.model, system, user, temperature=temperature, top_p=top_p,
+                              sample=sample)
+
+
+class OpenAIChat(Backend):
+    provider = "chat"
+    logprobs = True
+    max_choices = min(len(CHOICE_LETTERS), CHOICE_TOP_LOGPROBS)
+    multi_sample = True
+
+    def __init__(self, model, tag=None, client=None):
+        super().__init__(model, tag)
+        self.client = client or get_client()
+
+    def complete(self, system, user, temperature=None, top_p=None, sample=None):
+        return chat_text(self.client, self.model, system, user, temperature=temperature, top_p=top_p,
+                         sample=sample) or ""
+
+    def samples(self, system, user, n, temperature=None, start=0):
+        # 프롬프트 토큰은 요청 한 번 분량만
+        return chat_samples(self.client, self.model, system, user, n, temperature=temperature, start=start)
+
+    def choice_scores(self, system, user, choices):
+        """선택지에 글자를 붙여 (행마다 고정된 섞인 순서로) 보여 주고, 출력 첫 토큰의 글자별 logprob 로 채점 (출력 1토큰).
+        상위 CHOICE_TOP_LOGPROBS 안에 없는 글자는 -inf"""
+        if len(choices) > self.max_choices:
+            raise ValueError(f"선택지가 너무 많음 ({len(choices)} > {self.max_choices})")
+        order = shuffled_order(user, choices)
+        letters = CHOICE_LETTERS[:len(choices)]
+        listed = "\n".join(f"{letter}. {choices[i]}" for letter, i in zip(letters, order))
+        prompt = f"{user}\n\n{listed}\n\nAnswer with the letter only."
+        shown = letter_logprobs(self.client, self.model, system, prompt, letters, top_logprobs=CHOICE_TOP_LOGPROBS)
+        scores = [float("-inf")] * len(choices)
+        for i, s in zip(order, shown):
+            if s is not None:
+                scores[i] = s
+        return scores
+
+
+class LocalOpenAI(OpenAIChat):
+    """OpenAI 호환 로컬 서버의 Chat Completions (model@url 로 주소 지정 가능)"""
+    provider = "local"
+
+    def __init__(self, model, tag=None, base_url=None):
+        self.base_url = base_url or LOCAL_LLM_BASE_URL
+        super().__init__(model, tag, client=get_client(api_key=LOCAL_LLM_API_KEY, base_url=self.base_url))
+
+    @property
+    def spec(self):
+        return f"{self.provider}:{self.model}@{self.base_url}"
+
+
+class AnthropicMessages(Backend):
+    provider = "anthropic"
+
+    def __init__(self, model, tag=None):
+        super().__init__(model, tag)
+        import anthropic
+        # 재시도는 rate_control 이 맡는다 (키는 ANTHROPIC_API_KEY)
+        self.client = anthropic.Anthropic(max_retries=0)
+
+    def complete(self, system, user, temperature=None, top_p=None, sample=None):
+        return anthropic_text(self.client, self.model, system, user, temperature=temperature, top_p=top_p,
+                              max_tokens=ANTHROPIC_MAX_TOKENS, sample=sample)
+
+
+class Gemini(Backend):
+    provider = "gemini"
+
+    def __init__(self, model, tag=None):
+        super().__init__(model, tag)
+        from google import genai
+        # 키는 GEMINI_API_KEY (또는 GOOGLE_API_KEY)
+        self.client = genai.Client()
+
+    def complete(self, system, user, temperature=None, top_p=None, sample=None):
+        return gemini_text(self.client, self.model, system, user, temperature=temperature, top_p=top_p,
+                           sample=sample)
+
+
+class HuggingFaceLocal(Backend):
+    """로컬 CPU Hugging Face 모델. 텍스트 생성 대신 선택지 채점만 (행들을 모아 forward 한 번에)"""
+    provider = "hf"
+    scores_choices = True
+    logprobs = True
+
+    def __init__(self, model, tag=None):
+        super().__init__(model, tag)
+        from hf_local import get_scorer
+        self.scorer = get_scorer(model)
+
+    @property
+    def batch_size(self):
+        return self.scorer.batch_size
+
+    def complete(self, system, user, temperature=None, top_p=None, sample=None):
+        raise NotImplementedError(f"{self.spec}: 선택지 채점(choose)만 지원")
+
+    def choice_scores(self, system, user, choices):
+        return choice_logprobs(self.scorer, system, user, choices)
+
+    def choose(self, system, user, choices):
+        scores = self.choice_scores(system, user, choices)
+        return choices[max(range(len(choices)), key=scores.__getitem__)]
+
+
+BACKENDS = {
+    "responses": OpenAIResponses,
+    "chat": OpenAIChat,
+    "local": LocalOpenAI,
+    "anthropic": AnthropicMessages,
+    "gemini": Gemini,
+    "hf": HuggingFaceLocal,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(spec, default_provider="chat", tag=None):
+    """"provider:model" (provider 생략 시 default_provider, local 은 "local:model@url") → 공유 인스턴스"""
+    provider, sep, model = spec.partition(":")
+    if not sep:
+        provider, model = default_provider, spec
+    if provider not in BACKENDS:
+        raise ValueError(f"알 수 없는 백엔드 {provider!r} (가능: {', '.join(BACKENDS)})")
+    key = (provider, model, tag)
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            if provider == "local" and "@" in model:
+                name, url = model.split("@", 1)
+                backend = LocalOpenAI(name, tag, base_url=url)
+            else:
+                backend = BACKENDS[provider](model, tag)
+            _backends[key] = backend
+        return backend
+
+
+def _duplicate_tags(backends):
+    tags = [b.tag for b in backends]
+    return sorted({t for t in tags if tags.count(t) > 1})
+
+
+def backends_for(specs, default_provider="chat"):
+    """spec 목록 → 백엔드 목록. 모델 이름이 같은 백엔드(chat:gpt-5.1 / responses:gpt-5.1)는
+    출력 파일이 겹치지 않게 tag 앞에 provider 를 붙이고, 그래도 겹치면 ValueError"""
+    backends = [get_backend(s, default_provider) for s in specs]
+    clash = _duplicate_tags(backends)
+    if clash:
+        backends = [get_backend(s, default_provider, tag=f"{b.provider}-{b.tag}") if b.tag in clash else b
+                    for s, b in zip(specs, backends)]
+    clash = _duplicate_tags(backends)
+    if clash:
+        raise ValueError(f"출력 파일 tag 가 겹치는 모델: {', '.join(clash)} ({', '.join(specs)})")
+    return backends
+
+
+def eval_backends(default, default_provider="chat"):
+    """EVAL_MODELS 가 있으면 그 목록, 없으면 [default] (default 는 Backend 또는 spec 문자열)"""
+    specs = [s.strip() for s in EVAL_MODELS.split(",") if s.strip()]
+    if not specs:
+        return [default if isinstance(default, Backend) else get_backend(default, default_provider)]
+    return backends_for(specs, default_provider)
+
+
+def concurrency_for(backends, max_concurrency):
+    """로컬 채점 모델이 있으면 배치를 채울 수 있도록 동시 행 수를 배치 크기의 2배 이상으로"""
+    sizes = [b.batch_size * 2 for b in backends if b.scores_choices]
+    return max([max_concurrency] + sizes)
@@ -0,0 +1,136 @@
+import json
+import os
+import time
+
+# 배치 상태 조회 간격(초) / 배치 하나당 최대 요청 수 (OpenAI Batch API 제한 50,000)
+BATCH_POLL_SECONDS = float(os.environ.get("BATCH_POLL_SECONDS", "30"))
+BATCH_MAX_REQUESTS = 50000
+# BATCH_MODE=1 이면 평가/번역 스크립트가 행 단위 호출 대신 Batch API 로 제출
+BATCH_MODE = os.environ.get("BATCH_MODE", "0") == "1"
+
+RESPONSES_ENDPOINT = "/v1/responses"
+CHAT_ENDPOINT = "/v1/chat/completions"
+
+
+#############################################
+# 요청 body 생성 (llm_call 의 동기 호출과 같은 파라미터)
+#############################################
+def responses_body(model, system, user, temperature=None, top_p=None):
+    body = {"model": model, "instructions": system, "input": user}
+    if temperature is not None:
+        body["temperature"] = temperature
+    if top_p is not None:
+        body["top_p"] = top_p
+    return body
+
+
+def chat_body(model, system, user, temperature=None, top_p=None):
+    body = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ],
+    }
+    if temperature is not None:
+        body["temperature"] = temperature
+    if top_p is not None:
+        body["top_p"] = top_p
+    return body
+
+
+#############################################
+# 결과 JSONL 한 줄 → 응답 텍스트
+#############################################
+def _response_text(endpoint, body):
+    if endpoint == CHAT_ENDPOINT:
+        return body["choices"][0]["message"]["content"] or ""
+    # Responses API 원본 JSON 에는 output_text 가 없으므로 message 블록에서 직접 모은다
+    parts = []
+    for item in body.get("output", []):
+        if item.get("type") != "message":
+            continue
+        for content in item.get("content", []):
+            if content.get("type") == "output_text":
+                parts.append(content.get("text", ""))
+    return "".join(parts)
+
+
+def write_batch_file(path, endpoint, requests):
+    """requests: (custom_id, body) 목록 → Batch API 입력 JSONL"""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, body in requests:
+            f.write(json.dumps(
+                {"custom_id": custom_id, "method": "POST", "url": endpoint, "body": body},
+                ensure_ascii=False,
+            ) + "\n")
+            count += 1
+    return count
+
+
+def submit_batch(client, path, endpoint):
+    with open(path, "rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint=endpoint,
+        completion_window="24h",
+    )
+    print(f"📦 배치 제출: {batch.id} ({path})")
+    return batch.id
+
+
+def wait_for_batch(client, batch_id, poll_seconds=BATCH_POLL_SECONDS):
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        done = f"{counts.completed}/{counts.total}" if counts else "-"
+        print(f"   ⏳ {batch_id}: {batch.status} ({done})")
+        if batch.status in ("completed", "failed", "expired", "cancelled"):
+            return batch
+        time.sleep(poll_seconds)
+
+
+def fetch_results(client, batch, endpoint):
+    """완료된 배치 → {custom_id: 응답 텍스트}. 실패한 요청은 결과에서 빠진다."""
+    results = {}
+    if batch.output_file_id:
+        content = client.files.content(batch.output_file_id).text
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if item.get("error") or response.get("status_code", 200) != 200:
+                continue
+            results[item["custom_id"]] = _response_text(endpoint, response.get("body") or {})
+    if batch.error_file_id:
+        errors = client.files.content(batch.error_file_id).text.splitlines()
+        print(f"⚠ 배치 {batch.id}: 실패 요청 {len([e for e in errors if e.strip()])}건")
+    return results
+
+
+def run_batch(client, endpoint, requests, jsonl_path, poll_seconds=BATCH_POLL_SECONDS):
+    """요청을 JSONL 로 직렬화 → 제출 → 완료까지 폴링 → {custom_id: 텍스트}.
+    요청 수가 제한을 넘으면 여러 배치로 나눠 제출한다."""
+    requests = list(requests)
+    results = {}
+    if not requests:
+        return results
+
+    chunks = [requests[i:i + BATCH_MAX_REQUESTS] for i in range(0, len(requests), BATCH_MAX_REQUESTS)]
+    batch_ids = []
+    for n, chunk in enumerate(chunks):
+        path = jsonl_path if len(chunks) == 1 else jsonl_path.replace(".jsonl", f".{n}.jsonl")
+        write_batch_file(path, endpoint, chunk)
+        batch_ids.append(submit_batch(client, path, endpoint))
+
+    for batch_id in batch_ids:
+        batch = wait_for_batch(client, batch_id, poll_seconds)
+        if batch.status != "completed":
+            print(f"🚨 배치 {batch_id} 종료 상태: {batch.status}")
+        results.update(fetch_results(client, batch, endpoint))
+
+    print(f"📦 배치 결과 {len(results)}/{len(requests)}건 수신")
+    return results
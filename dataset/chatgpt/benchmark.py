@@ -0,0 +1,325 @@
+import csv
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from itertools import islice
+from manifest import resolve
+from rate_control import MAX_CONCURRENCY
+
+# 실제 API 한도를 쓰지 않고 mock 서버(mock_llm_server.py)로 평가 / 번역 파이프라인 처리량 측정
+#   - 시나리오마다 새 mock 서버 + 새 프로세스 + 빈 작업 폴더 (응답 캐시 / 번역 메모리 / 이어쓰기 없는 첫 실행 조건)
+#   - 행/초, 행 지연 p50/p99, 최대 메모리(RSS) 를 benchmark_results.jsonl 에 쌓고 같은 조건의 직전 기록과 비교
+# 사용: python benchmark.py                          # 전체 시나리오
+#       python benchmark.py mednli translation       # 일부만
+#       python benchmark.py history                  # 버전별 기록
+#       MOCK_LATENCY_MS=800 MOCK_ERROR_RATE=0.02 MOCK_429_EVERY=20 BENCH_ROWS=500 python benchmark.py
+
+# 시나리오마다 입력 앞에서부터 몇 행을 쓸지
+BENCH_ROWS = int(os.environ.get("BENCH_ROWS", "200"))
+BENCH_RESULTS = os.environ.get("BENCH_RESULTS", "benchmark_results.jsonl")
+# 직전 기록보다 이 비율 이상 나빠지면 회귀로 표시
+BENCH_TOLERANCE = float(os.environ.get("BENCH_TOLERANCE", "0.1"))
+# 설정하면 mock 서버를 띄우지 않고 이 주소로 (다른 OpenAI 호환 서버 측정용)
+BENCH_BASE_URL = os.environ.get("BENCH_BASE_URL", "")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TRANSLATED = os.path.join(HERE, "translation_dataset")
+
+# 시나리오 → (입력 파일, 작업 폴더에 쓸 인코딩. None 이면 원본 그대로)
+SCENARIOS = {
+    "mednli": (os.path.join(TRANSLATED, "mednli_jeju_(GPT-5).csv"), None),
+    "truthfulqa": (os.path.join(TRANSLATED, "truthfulqa_Jeolla-GPT5.csv"), None),
+    "truthfulqa-logprob": (os.path.join(TRANSLATED, "truthfulqa_Jeolla-GPT5.csv"), None),
+    # translation.py 는 입력을 BOM 없는 UTF-8 로 읽는다
+    "translation": (os.path.join(HERE, "accuracy_eval_dataset", "mednli_kor_eval_accuracy.csv"), "utf-8"),
+}
+
+# 회귀 판정: (기록 이름, 표시 형식, 클수록 좋은가)
+MEASURES = [
+    ("rows_per_sec", "{:.1f}행/초", True),
+    ("p99_ms", "p99 {:.0f}ms", False),
+    ("peak_rss_mb", "메모리 {:.0f}MB", False),
+]
+
+
+#############################################
+# 측정 대상 프로세스 (python benchmark.py --run <시나리오> <입력> <결과.json>)
+#############################################
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        # Windows: psutil 이 있으면 peak working set
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 2 ** 20
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 는 바이트, Linux 는 KB
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def run_scenario(name, input_file):
+    """현재 폴더(빈 작업 폴더)에서 시나리오 하나 실행 → 측정값"""
+    import perf_stats
+    from backends import get_backend
+
+    if name == "mednli":
+        from Mednli_eval_Hallucination import evaluate_mednli_with_logging
+        run = lambda: evaluate_mednli_with_logging(input_file)
+    elif name == "truthfulqa":
+        from TruthfulQA_eval_Hallucination import evaluate_truthfulqa
+        run = lambda: evaluate_truthfulqa(input_file, scoring="generate")
+    elif name == "truthfulqa-logprob":
+        from TruthfulQA_eval_Hallucination import evaluate_truthfulqa
+        # gpt-5.x 는 logprobs 를 주지 않으므로 logprob 을 주는 chat 모델 이름으로
+        backend = get_backend("chat:gpt-4.1-mini")
+        run = lambda: evaluate_truthfulqa(input_file, backends=[backend], scoring="logprob")
+    elif name == "translation":
+        # 출력 / 번역 메모리는 작업 폴더에 (TRANSLATION_BASE_PATH, 실제 번역 메모리를 재사용하지 않도록)
+        from translation import translate_mednli
+        run = lambda: translate_mednli(input_file, [("제주", "jeju")])
+    else:
+        raise ValueError(f"알 수 없는 시나리오 {name!r} (가능: {', '.join(SCENARIOS)})")
+
+    error = None
+    started = time.perf_counter()
+    try:
+        run()
+    except Exception as e:
+        error = repr(e)
+    seconds = time.perf_counter() - started
+
+    rows = perf_stats.get_stats().row_latency()
+    print(perf_stats.perf_summary())
+    p50, p99 = rows.quantile(0.5), rows.quantile(0.99)
+    peak = peak_rss_mb()
+    return {
+        "seconds": round(seconds, 3),
+        "rows_timed": rows.count,
+        "p50_ms": None if p50 is None else round(p50 * 1000, 1),
+        "p99_ms": None if p99 is None else round(p99 * 1000, 1),
+        "peak_rss_mb": None if peak is None else round(peak, 1),
+        "error": error,
+    }
+
+
+#############################################
+# 조정 프로세스
+#############################################
+def prepare_input(src, workdir, rows=BENCH_ROWS, encoding=None):
+    """원본의 앞 rows 행만 작업 폴더로 (encoding 이 없으면 원본 인코딩 그대로) → (경로, 행 수)"""
+    source_encoding = resolve(src).encoding
+    dst = os.path.join(workdir, os.path.basename(src))
+    n = 0
+    with open(src, encoding=source_encoding, newline="") as f_in, \
+         open(dst, "w", encoding=encoding or source_encoding, newline="") as f_out:
+        reader = csv.reader(f_in)
+        writer = csv.writer(f_out)
+        writer.writerow(next(reader))
+        for row in islice(reader, rows):
+            writer.writerow(row)
+            n += 1
+    return dst, n
+
+
+def mock_settings():
+    if BENCH_BASE_URL:
+        return {"base_url": BENCH_BASE_URL}
+    import mock_llm_server as mock
+    return {
+        "latency_ms": mock.MOCK_LATENCY_MS,
+        "latency_dist": mock.MOCK_LATENCY_DIST if mock.MOCK_LATENCY_MS else "",
+        "error_rate": mock.MOCK_ERROR_RATE,
+        "burst_every": mock.MOCK_429_EVERY,
+        "burst_seconds": mock.MOCK_429_SECONDS if mock.MOCK_429_EVERY else 0,
+        "label_weights": mock.MOCK_LABEL_WEIGHTS,
+    }
+
+
+def start_mock():
+    """mock 서버를 별도 프로세스로 (같은 프로세스면 GIL 을 나눠 써서 측정이 흐려진다) → (process, base_url)"""
+    env = dict(os.environ, PYTHONIOENCODING="utf-8")
+    proc = subprocess.Popen([sys.executable, "-u", os.path.join(HERE, "mock_llm_server.py"), "0"],
+                            stdout=subprocess.PIPE, text=True, encoding="utf-8", env=env)
+    match = re.search(r"http://\S+/v1", proc.stdout.readline())
+    if match is None:
+        proc.kill()
+        raise RuntimeError("mock 서버 시작 실패")
+    return proc, match.group(0)
+
+
+def stop_mock(proc):
+    """종료하고 mock 서버가 센 요청 / 500 / 429 수를 돌려준다"""
+    if os.name == "posix":
+        proc.send_signal(signal.SIGINT)
+    else:
+        proc.terminate()
+    try:
+        out = proc.communicate(timeout=10)[0] or ""
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        return {}
+    match = re.search(r"요청 (\d+) \| 500 (\d+) \| 429 (\d+)", out)
+    if match is None:
+        return {}
+    return dict(zip(("requests", "errors", "throttled"), map(int, match.groups())))
+
+
+def git_version():
+    try:
+        out = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=HERE, capture_output=True, text=True,
+                             timeout=10)
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def measure(name, version, settings):
+    workdir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    src, encoding = SCENARIOS[name]
+    input_file, rows = prepare_input(src, workdir, encoding=encoding)
+    proc, url = (None, BENCH_BASE_URL) if BENCH_BASE_URL else start_mock()
+    env = dict(
+        os.environ,
+        OPENAI_BASE_URL=url, OPENAI_API_KEY=os.environ.get("BENCH_API_KEY", "mock"),
+        PYTHONIOENCODING="utf-8", RESUME="0", DIFF_MODE="0", BATCH_MODE="0", PERF_PROM_PATH="", PERF_PROM_PORT="0",
+        EVAL_MODELS="", TRANSLATION_BASE_PATH=workdir, PYTHONPATH=os.pathsep.join(filter(None, [HERE, os.environ.get("PYTHONPATH")])),
+    )
+    result_file = os.path.join(workdir, "result.json")
+    log_file = os.path.join(workdir, "run.log")
+    print(f"⏳ {name}: {rows}행 ({workdir})")
+    try:
+        with open(log_file, "w", encoding="utf-8") as log:
+            code = subprocess.run([sys.executable, os.path.abspath(__file__), "--run", name, input_file, result_file],
+                                  cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT).returncode
+    finally:
+        counts = stop_mock(proc) if proc is not None else {}
+
+    if code != 0 or not os.path.exists(result_file):
+        with open(log_file, encoding="utf-8", errors="replace") as f:
+            tail = f.read()[-2000:]
+        raise RuntimeError(f"{name} 측정 프로세스 실패 (exit {code}) → {log_file}\n{tail}")
+    with open(result_file, encoding="utf-8") as f:
+        result = json.load(f)
+    return {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "version": version,
+        "scenario": name,
+        "rows": rows,
+        "max_concurrency": MAX_CONCURRENCY,
+        "mock": settings,
+        **result,
+        "rows_per_sec": round(rows / result["seconds"], 2) if result["seconds"] else None,
+        "server": counts,
+        "workdir": workdir,
+    }
+
+
+#############################################
+# 기록 / 비교
+#############################################
+def _condition(record):
+    """같은 조건끼리만 비교 (행 수 / 동시 실행 수 / mock 설정)"""
+    return record["scenario"], record["rows"], record["max_concurrency"], json.dumps(record["mock"], sort_keys=True)
+
+
+def load_results(path=BENCH_RESULTS):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_result(record, path=BENCH_RESULTS):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def compare(record, previous):
+    """→ (표시 줄, 회귀한 항목 목록)"""
+    parts, regressed = [], []
+    for key, fmt, higher_is_better in MEASURES:
+        value = record.get(key)
+        if value is None:
+            parts.append(fmt.replace("{:.1f}", "-").replace("{:.0f}", "-"))
+            continue
+        text = fmt.format(value)
+        old = previous.get(key) if previous else None
+        if old:
+            change = (value - old) / old
+            text += f" ({change:+.1%})"
+            if (-change if higher_is_better else change) > BENCH_TOLERANCE:
+                regressed.append(key)
+        parts.append(text)
+    return " | ".join(parts), regressed
+
+
+def format_record(record, previous=None):
+    line, regressed = compare(record, previous)
+    server = record.get("server") or {}
+    faults = f" | 서버 500×{server.get('errors', 0)} 429×{server.get('throttled', 0)}" if server else ""
+    status = f" | 🚨 {record['error']}" if record.get("error") else ""
+    flag = f" ⚠ 회귀: {', '.join(regressed)} (기준 {previous['version']})" if regressed else ""
+    p50 = record.get("p50_ms")
+    return (f"   • {record['scenario']:<20} {record['version']:<14} {record['rows']}행 {record['seconds']:.1f}s | "
+            f"p50 {'-' if p50 is None else f'{p50:.0f}'}ms | {line}{faults}{status}{flag}")
+
+
+def history(path=BENCH_RESULTS):
+    records = load_results(path)
+    if not records:
+        print(f"⚠ {path} 에 기록 없음")
+        return
+    print(f"📚 {path}")
+    last = {}
+    for record in records:
+        condition = _condition(record)
+        print(format_record(record, last.get(condition)))
+        if not record.get("error"):
+            last[condition] = record
+
+
+def run_benchmarks(names, path=BENCH_RESULTS):
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"알 수 없는 시나리오 {unknown} (가능: {', '.join(SCENARIOS)})")
+    version = git_version()
+    settings = mock_settings()
+    print(f"🏁 benchmark {version} | {BENCH_ROWS}행 | 동시 {MAX_CONCURRENCY} | mock {settings}")
+
+    previous = {}
+    for record in load_results(path):
+        if not record.get("error"):
+            previous[_condition(record)] = record
+
+    records, regressions = [], 0
+    for name in names:
+        record = measure(name, version, settings)
+        append_result(record, path)
+        records.append((record, previous.get(_condition(record))))
+
+    print(f"\n📊 benchmark 결과 → {path}")
+    for record, before in records:
+        print(format_record(record, before))
+        regressions += bool(compare(record, before)[1])
+    return regressions
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        name, input_file, result_file = sys.argv[2:5]
+        with open(result_file, "w", encoding="utf-8") as f:
+            json.dump(run_scenario(name, input_file), f)
+    elif sys.argv[1:2] == ["history"]:
+        history()
+    else:
+        # 회귀가 있으면 종료 코드 1 (CI 에서 실패로 보이도록)
+        sys.exit(1 if run_benchmarks(sys.argv[1:] or list(SCENARIOS)) else 0)
@@ -0,0 +1,219 @@
+import fnmatch
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# 단계 fingerprint / 산출물 해시를 저장하는 파일
+BUILD_STATE_PATH = os.environ.get("BUILD_STATE_PATH", "build_state.json")
+# 서로 독립인 단계(다른 방언 등)를 동시에 몇 개까지 실행할지
+BUILD_WORKERS = int(os.environ.get("BUILD_WORKERS", "4"))
+
+
+#############################################
+# 단계 정의: 입력 파일 + 프롬프트 템플릿 → 출력 파일
+#############################################
+class Stage:
+    def __init__(self, name, run, inputs=(), outputs=(), templates=(), version="1"):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        # 프롬프트 원문 등: 바뀌면 입력 파일이 같아도 다시 빌드
+        self.templates = list(templates)
+        # 코드 로직을 바꿨을 때 손으로 올리는 값
+        self.version = str(version)
+
+
+def _norm(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _load_state(path):
+    if not os.path.exists(path):
+        return {"files": {}, "stages": {}}
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    state.setdefault("files", {})
+    state.setdefault("stages", {})
+    return state
+
+
+def _save_state(state, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def file_hash(path, state=None):
+    """파일 내용 sha256. (크기, mtime) 이 그대로면 저장된 해시를 재사용해 큰 파일을 다시 읽지 않는다."""
+    st = os.stat(path)
+    key = _norm(path)
+    if state is not None:
+        cached = state["files"].get(key)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    if state is not None:
+        state["files"][key] = [st.st_size, st.st_mtime_ns, digest]
+    return digest
+
+
+def fingerprint(stage, state=None):
+    h = hashlib.sha256()
+    h.update(f"{stage.name}\0{stage.version}\0".encode("utf-8"))
+    for path in stage.inputs:
+        h.update(f"in\0{os.path.basename(path)}\0{file_hash(path, state)}\0".encode("utf-8"))
+    for template in stage.templates:
+        h.update(f"tpl\0{template}\0".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _up_to_date(stage, fp, state):
+    record = state["stages"].get(stage.name)
+    if not record or record.get("fingerprint") != fp:
+        return False
+    for path in stage.outputs:
+        # 산출물이 없거나 손으로 고쳐졌으면 다시 빌드
+        if not os.path.exists(path) or record["outputs"].get(_norm(path)) != file_hash(path, state):
+            return False
+    return True
+
+
+#############################################
+# DAG 구성 (출력 → 입력 경로가 같으면 의존 관계)
+#############################################
+def _dependencies(stages):
+    producer = {}
+    for stage in stages:
+        for path in stage.outputs:
+            key = _norm(path)
+            if key in producer:
+                raise ValueError(f"{path} 를 두 단계({producer[key]}, {stage.name})가 만듭니다")
+            producer[key] = stage.name
+    return {
+        stage.name: {producer[_norm(p)] for p in stage.inputs if _norm(p) in producer}
+        for stage in stages
+    }
+
+
+def _select(stages, deps, targets):
+    """targets(단계 이름, glob 가능) + 그 상위 단계 전부"""
+    names = [s.name for s in stages]
+    if not targets:
+        return set(names)
+    selected = set()
+    for pattern in targets:
+        matched = fnmatch.filter(names, pattern)
+        if not matched:
+            raise ValueError(f"일치하는 단계가 없습니다: {pattern}")
+        selected.update(matched)
+    stack = list(selected)
+    while stack:
+        for dep in deps[stack.pop()]:
+            if dep not in selected:
+                selected.add(dep)
+                stack.append(dep)
+    return selected
+
+
+def _check_acyclic(names, deps):
+    remaining = set(names)
+    while remaining:
+        ready = {n for n in remaining if not (deps[n] & remaining)}
+        if not ready:
+            raise ValueError(f"순환 의존: {sorted(remaining)}")
+        remaining -= ready
+
+
+#############################################
+# 빌드: 오래된 산출물만 다시 만들고, 독립 단계는 병렬 실행
+#############################################
+def build(stages, targets=None, max_workers=BUILD_WORKERS, state_path=BUILD_STATE_PATH,
+          force=False, dry_run=False):
+    by_name = {s.name: s for s in stages}
+    deps = _dependencies(stages)
+    selected = _select(stages, deps, targets)
+    _check_acyclic(selected, deps)
+
+    state = _load_state(state_path)
+    pending = set(selected)
+    done, rebuilt, skipped, blocked = set(), [], [], []
+    failed = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        running = {}
+        while pending or running:
+            progressed = True
+            while progressed:
+                progressed = False
+                for name in sorted(pending):
+                    if deps[name] & (set(failed) | set(blocked)):
+                        print(f"⏭ {name}: 상위 단계 실패로 건너뜀")
+                        blocked.append(name)
+                        pending.discard(name)
+                        progressed = True
+                        continue
+                    if not deps[name] <= done:
+                        continue
+                    pending.discard(name)
+                    progressed = True
+                    stage = by_name[name]
+                    if dry_run and deps[name] & set(rebuilt):
+                        # 상위 산출물이 아직 안 바뀌었으므로 보수적으로 다시 빌드로 표시
+                        rebuilt.append(name)
+                        done.add(name)
+                        print(f"🔨 {name}: 다시 빌드 예정 (상위 단계 변경)")
+                        continue
+                    try:
+                        fp = fingerprint(stage, state)
+                    except FileNotFoundError as e:
+                        print(f"🚨 {name}: 입력 파일 없음 → {e.filename}")
+                        failed[name] = e
+                        continue
+                    if not force and _up_to_date(stage, fp, state):
+                        skipped.append(name)
+                        done.add(name)
+                        continue
+                    if dry_run:
+                        rebuilt.append(name)
+                        done.add(name)
+                        print(f"🔨 {name}: 다시 빌드 예정")
+                        continue
+                    print(f"🔨 {name}: 빌드 시작")
+                    running[pool.submit(stage.run)] = (name, fp)
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, fp = running.pop(future)
+                stage = by_name[name]
+                try:
+                    future.result()
+                    missing = [p for p in stage.outputs if not os.path.exists(p)]
+                    if missing:
+                        raise FileNotFoundError(f"산출물이 생성되지 않음: {missing}")
+                except Exception as e:
+                    print(f"🚨 {name}: 실패 → {e!r}")
+                    failed[name] = e
+                    continue
+                state["stages"][name] = {
+                    "fingerprint": fp,
+                    "outputs": {_norm(p): file_hash(p, state) for p in stage.outputs},
+                }
+                _save_state(state, state_path)
+                rebuilt.append(name)
+                done.add(name)
+                print(f"✔ {name}: 완료")
+
+    if not dry_run:
+        _save_state(state, state_path)
+
+    print(f"\n📦 빌드 결과: 다시 빌드 {len(rebuilt)} / 최신 {len(skipped)} / 실패 {len(failed)} / 건너뜀 {len(blocked)}")
+    return {"rebuilt": rebuilt, "skipped": skipped, "failed": failed, "blocked": blocked}
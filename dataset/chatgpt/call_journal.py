@@ -0,0 +1,173 @@
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+# 호출 기록 파일 / 회전 크기 / 회전된 파일 압축 방식 ("" | "gzip" | "zstd")
+JOURNAL_PATH = os.environ.get("JOURNAL_PATH", "llm_calls.jsonl")
+JOURNAL_MAX_MB = float(os.environ.get("JOURNAL_MAX_MB", "50"))
+JOURNAL_COMPRESS = os.environ.get("JOURNAL_COMPRESS", "")
+# 버퍼에 모인 기록을 이 간격(초)마다 한 번에 쓴다
+JOURNAL_FLUSH_SECONDS = 1.0
+
+
+def template_id(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _compress(path, method):
+    """회전된 파일을 압축하고 원본은 지운다. zstandard 가 없으면 gzip 으로 대신한다."""
+    if method == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            print("⚠ zstandard 모듈이 없어 gzip 으로 압축합니다")
+            method = "gzip"
+        else:
+            with open(path, "rb") as src, open(path + ".zst", "wb") as dst:
+                zstandard.ZstdCompressor().copy_stream(src, dst)
+            os.remove(path)
+            return path + ".zst"
+    if method == "gzip":
+        with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+        return path + ".gz"
+    return path
+
+
+#############################################
+# JSONL 호출 기록
+#   - 프롬프트 템플릿은 {"type": "template"} 로 파일(회전 조각)마다 한 번만 기록
+#   - 호출마다 템플릿 해시 + 변수 + 출력 + 지연시간/토큰만 기록
+#   - 쓰기는 백그라운드 스레드가 모아서 처리 (호출 스레드는 큐에 넣기만)
+#############################################
+class CallJournal:
+    def __init__(self, path=JOURNAL_PATH, max_mb=JOURNAL_MAX_MB, compress=JOURNAL_COMPRESS,
+                 flush_seconds=JOURNAL_FLUSH_SECONDS):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb else 0
+        self.compress = compress
+        self.flush_seconds = flush_seconds
+        self._templates = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    # ---------- 호출 스레드 쪽 ----------
+    def template(self, text):
+        """템플릿 등록 → 해시 id"""
+        tid = template_id(text)
+        with self._lock:
+            self._templates.setdefault(tid, text)
+        return tid
+
+    def call(self, task, system, output, user=None, user_template=None, variables=None, **fields):
+        """모델 호출 한 건. user_template 이 있으면 user 원문 대신 (템플릿 해시, 변수)만 남긴다."""
+        record = {"type": "call", "ts": time.time(), "task": task, "system": self.template(system)}
+        if user_template is not None:
+            record["user_template"] = self.template(user_template)
+            record["vars"] = variables or {}
+        else:
+            record["user"] = user
+        record["output"] = output
+        record.update({k: v for k, v in fields.items() if v is not None})
+        self._queue.put(record)
+
+    def event(self, kind, **fields):
+        """호출 외 기록 (행 판정 결과, 오류 등)"""
+        record = {"type": kind, "ts": time.time()}
+        record.update(fields)
+        self._queue.put(record)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    # ---------- 쓰기 스레드 ----------
+    def _open(self):
+        self._f = open(self.path, "a", encoding="utf-8")
+        # 이어 쓰는 파일이면 이미 들어 있는 템플릿은 다시 쓰지 않도록 읽어 둔다
+        self._written = set()
+        if self._f.tell() > 0:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith('{"type": "template"'):
+                        try:
+                            self._written.add(json.loads(line)["id"])
+                        except (ValueError, KeyError):
+                            pass
+
+    def _rotate(self):
+        self._f.close()
+        n = 1
+        while any(os.path.exists(f"{self.path}.{n}{ext}") for ext in ("", ".gz", ".zst")):
+            n += 1
+        rotated = f"{self.path}.{n}"
+        os.replace(self.path, rotated)
+        _compress(rotated, self.compress)
+        self._open()
+
+    def _write(self, record):
+        for key in ("system", "user_template"):
+            tid = record.get(key)
+            if tid is not None and tid not in self._written:
+                with self._lock:
+                    text = self._templates[tid]
+                self._f.write(json.dumps({"type": "template", "id": tid, "text": text}, ensure_ascii=False) + "\n")
+                self._written.add(tid)
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _writer(self):
+        self._open()
+        done = False
+        while not done:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_seconds))
+                while True:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            for record in batch:
+                if record is None:
+                    done = True
+                    continue
+                self._write(record)
+            if batch:
+                self._f.flush()
+                if self.max_bytes and self._f.tell() >= self.max_bytes:
+                    self._rotate()
+        self._f.close()
+
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(path=JOURNAL_PATH):
+    """경로당 하나의 기록기 (여러 작업이 같은 파일을 써도 한 스레드가 모아서 기록)"""
+    with _journals_lock:
+        journal = _journals.get(path)
+        if journal is None:
+            journal = _journals[path] = CallJournal(path)
+        return journal
+
+
+@atexit.register
+def close_all():
+    with _journals_lock:
+        journals = list(_journals.values())
+        _journals.clear()
+    for journal in journals:
+        journal.close()
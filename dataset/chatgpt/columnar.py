@@ -0,0 +1,144 @@
+import csv
+import os
+import sys
+import pyarrow as pa
+import pyarrow.parquet as pq
+from csv_stream import parse_list
+
+# CSV 에 "['a', 'b']" 처럼 문자열로 저장된 리스트 컬럼
+LIST_COLUMN_PREFIXES = ("mc1_choice", "mc2_choice", "mc1_label", "mc2_label")
+# 고유값이 이 개수 이하인 문자열 컬럼은 dictionary 인코딩 (gold_label, result 등)
+DICTIONARY_MAX_VALUES = 256
+
+CSV_ENCODINGS = ("utf-8-sig", "cp949")
+# 원문 표기 보존용 컬럼 접두사 (CSV 로 되돌릴 때만 사용)
+RAW_PREFIX = "__raw__"
+
+
+def _is_list_column(name):
+    return name.lower().startswith(LIST_COLUMN_PREFIXES)
+
+
+def _read_csv_columns(path):
+    """CSV → (헤더, 컬럼별 값 리스트). utf-8 → cp949 순으로 시도."""
+    for i, encoding in enumerate(CSV_ENCODINGS):
+        try:
+            with open(path, encoding=encoding, newline="",
+                      errors="replace" if i == len(CSV_ENCODINGS) - 1 else "strict") as f:
+                reader = csv.reader(f)
+                header = next(reader, [])
+                columns = [[] for _ in header]
+                for row in reader:
+                    for j, col in enumerate(columns):
+                        col.append(row[j] if j < len(row) else "")
+                return header, columns
+        except UnicodeDecodeError:
+            continue
+
+
+def _to_arrays(name, values):
+    """컬럼 하나 → {컬럼 이름: Arrow 배열}.
+    리스트 컬럼 중 str(list) 가 원문과 다른 셀(따옴표/공백 표기 차이)은 원문을 RAW_PREFIX 컬럼에 따로 둔다."""
+    if _is_list_column(name) and all(v.startswith("[") for v in values if v):
+        lists = [parse_list(v) if v else [] for v in values]
+        if all(isinstance(x, int) and not isinstance(x, bool) for lst in lists for x in lst):
+            array = pa.array(lists, type=pa.list_(pa.int8()))
+        else:
+            lists = [[str(x) for x in lst] for lst in lists]
+            array = pa.array(lists, type=pa.list_(pa.string()))
+        raw = [v if _export_value(lst if v else "") != v else None for v, lst in zip(values, lists)]
+        arrays = {name: array}
+        if any(r is not None for r in raw):
+            arrays[RAW_PREFIX + name] = pa.array(raw, type=pa.string())
+        return arrays
+    array = pa.array(values, type=pa.string())
+    if len(set(values)) <= DICTIONARY_MAX_VALUES and len(values) > DICTIONARY_MAX_VALUES:
+        array = array.dictionary_encode()
+    return {name: array}
+
+
+#############################################
+# CSV ↔ Parquet
+#############################################
+def csv_to_parquet(csv_path, parquet_path=None):
+    """리스트 컬럼은 list<string>/list<int8>, 라벨 컬럼은 dictionary 로 저장"""
+    if parquet_path is None:
+        parquet_path = os.path.splitext(csv_path)[0] + ".parquet"
+    header, columns = _read_csv_columns(csv_path)
+    arrays = {}
+    for name, values in zip(header, columns):
+        arrays.update(_to_arrays(name, values))
+    table = pa.table(arrays)
+    tmp = parquet_path + ".tmp"
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, parquet_path)
+    return parquet_path
+
+
+def load_table(path, columns=None):
+    """Parquet → Arrow Table (memory-map, 필요한 컬럼만)"""
+    if columns is None:
+        columns = column_names(path)
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+
+def num_rows(path):
+    return pq.ParquetFile(path).metadata.num_rows
+
+
+def column_names(path):
+    return [c for c in pq.ParquetFile(path).schema_arrow.names if not c.startswith(RAW_PREFIX)]
+
+
+def _export_value(value):
+    # 기존 CSV 와 같은 표기: 리스트는 str(list), 그 외는 문자열 그대로
+    if isinstance(value, list):
+        return str(value)
+    return "" if value is None else value
+
+
+def iter_records(path, batch_size=1024):
+    """행을 dict 로 하나씩 yield. 리스트 컬럼은 CSV 와 같은 문자열 표기로 돌려준다
+    (평가 스크립트의 프롬프트/행 해시가 CSV 입력과 똑같이 나오도록)."""
+    parquet = pq.ParquetFile(path, memory_map=True)
+    for batch in parquet.iter_batches(batch_size=batch_size):
+        for record in batch.to_pylist():
+            row = {}
+            for k, v in record.items():
+                if k.startswith(RAW_PREFIX):
+                    if v is not None:
+                        row[k[len(RAW_PREFIX):]] = v
+                elif k not in row:
+                    row[k] = _export_value(v)
+            yield row
+
+
+def export_csv(parquet_path, csv_path=None):
+    if csv_path is None:
+        csv_path = os.path.splitext(parquet_path)[0] + ".csv"
+    names = column_names(parquet_path)
+    tmp = csv_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=names)
+        writer.writeheader()
+        writer.writerows(iter_records(parquet_path))
+    os.replace(tmp, csv_path)
+    return csv_path
+
+
+if __name__ == "__main__":
+    # 사용: python columnar.py <csv 또는 폴더> ...   → 옆에 .parquet 생성
+    #       python columnar.py --export <parquet> ... → 옆에 .csv 생성
+    args = sys.argv[1:]
+    if args and args[0] == "--export":
+        for p in args[1:]:
+            print(f"📄 {p} → {export_csv(p)}")
+    else:
+        paths = []
+        for arg in args or ["."]:
+            if os.path.isdir(arg):
+                paths.extend(os.path.join(arg, f) for f in sorted(os.listdir(arg)) if f.lower().endswith(".csv"))
+            else:
+                paths.append(arg)
+        for p in paths:
+            print(f"🗜 {p} → {csv_to_parquet(p)}")
@@ -0,0 +1,63 @@
+import ast
+import csv
+import os
+
+
+def is_columnar(path):
+    return str(path).lower().endswith(".parquet")
+
+
+def output_path(input_file, suffix):
+    """입력 옆에 쓸 결과 CSV 경로. 입력 확장자(.csv / .parquet)와 무관하게 항상 {stem}{suffix}.csv"""
+    path = os.path.splitext(input_file)[0] + suffix + ".csv"
+    if os.path.abspath(path) == os.path.abspath(input_file):
+        raise ValueError(f"출력 경로가 입력과 같음: {input_file}")
+    return path
+
+
+def parse_list(value):
+    """문자열로 저장된 파이썬 리스트 ("['a', 'b']") → list. 리스트 표기가 아니면 [value]."""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str) and value.startswith("["):
+        try:
+            parsed = ast.literal_eval(value)
+            if isinstance(parsed, (list, tuple)):
+                return list(parsed)
+        except (ValueError, SyntaxError):
+            return [x.strip().strip("'\"") for x in value.strip("[]").split(",") if x.strip()]
+    return [value]
+
+
+#############################################
+# 스트리밍 CSV 읽기 (파일 크기와 무관하게 한 행씩)
+#   .parquet 이면 columnar 모듈로 읽는다 (encoding 인자는 무시)
+#############################################
+def read_header(path, encoding="utf-8", errors=None):
+    if is_columnar(path):
+        from columnar import column_names
+        return column_names(path)
+    with open(path, encoding=encoding, errors=errors, newline="") as f:
+        return list(csv.DictReader(f).fieldnames or [])
+
+
+def iter_rows(path, encoding="utf-8", errors=None):
+    """행을 하나씩 yield. 다 읽거나 generator 가 닫히면 파일도 닫힌다."""
+    if is_columnar(path):
+        from columnar import iter_records
+        yield from iter_records(path)
+        return
+    with open(path, encoding=encoding, errors=errors, newline="") as f:
+        for row in csv.DictReader(f):
+            yield row
+
+
+def count_rows(path, encoding="utf-8", errors=None):
+    """진행률 표시용 행 수 (따옴표 안 줄바꿈까지 고려, 메모리는 한 행 분량만 사용)"""
+    if is_columnar(path):
+        from columnar import num_rows
+        return num_rows(path)
+    with open(path, encoding=encoding, errors=errors, newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return sum(1 for _ in reader)
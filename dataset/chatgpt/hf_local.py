@@ -0,0 +1,154 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# 로컬 Hugging Face 모델 (오프라인이면 HF_HUB_OFFLINE=1 + 미리 받아 둔 캐시 / 로컬 경로)
+HF_MODEL = os.environ.get("HF_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
+# forward 한 번에 묶는 행 수 (행마다 선택지 수만큼 시퀀스가 생긴다)
+HF_BATCH_SIZE = int(os.environ.get("HF_BATCH_SIZE", "16"))
+# 첫 요청이 온 뒤 배치를 채우려고 기다리는 최대 시간(ms)
+HF_BATCH_WAIT_MS = float(os.environ.get("HF_BATCH_WAIT_MS", "20"))
+# CPU 스레드 수 (0 이면 torch 기본값) / 가중치 dtype
+HF_THREADS = int(os.environ.get("HF_THREADS", "0"))
+HF_DTYPE = os.environ.get("HF_DTYPE", "float32")
+
+
+#############################################
+# 선택지 log-likelihood 채점기
+#   - 여러 스레드의 요청을 모아 (행 × 선택지) 시퀀스를 한 번의 forward 로 채점
+#   - 왼쪽 padding → 모든 선택지가 끝에 정렬되므로 마지막 몇 위치의 logits 만 계산
+#############################################
+class ChoiceScorer:
+    def __init__(self, model_name=HF_MODEL, batch_size=HF_BATCH_SIZE, wait_ms=HF_BATCH_WAIT_MS,
+                 dtype=HF_DTYPE, threads=HF_THREADS):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.torch = torch
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.wait = wait_ms / 1000
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=getattr(torch, dtype))
+        self.model.eval()
+        self.pad_id = self.tokenizer.pad_token_id
+        if self.pad_id is None:
+            self.pad_id = self.tokenizer.eos_token_id or 0
+
+        self.rows = 0
+        self.busy = 0.0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        threading.Thread(target=self._loop, name="hf-scorer", daemon=True).start()
+
+    # ---------- 토큰화 ----------
+    def prompt_ids(self, system, user):
+        """chat template 이 있으면 assistant 차례 직전까지, 없으면 system + user 평문"""
+        tok = self.tokenizer
+        if getattr(tok, "chat_template", None):
+            messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+            return tok.apply_chat_template(messages, add_generation_prompt=True, tokenize=True)
+        return tok(f"{system}\n\n{user}\n", add_special_tokens=True)["input_ids"]
+
+    def choice_ids(self, choice):
+        return self.tokenizer(choice, add_special_tokens=False)["input_ids"]
+
+    # ---------- 요청 ----------
+    def score(self, system, user, choices):
+        """선택지별 log P(choice | prompt) 합 → (점수 리스트, 프롬프트 토큰 수). 배치가 끝날 때까지 대기."""
+        prompt = self.prompt_ids(system, user)
+        future = Future()
+        self._queue.put((prompt, [self.choice_ids(c) for c in choices], future))
+        return future.result(), len(prompt)
+
+    def throughput(self):
+        with self._stats_lock:
+            rate = self.rows / self.busy if self.busy else 0.0
+            return f"⚡ {self.model_name}: {self.rows}행 / forward {self.busy:.1f}s ({rate:.1f}행/초)"
+
+    # ---------- 배치 루프 ----------
+    def _collect(self):
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.wait
+        while len(items) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _loop(self):
+        while True:
+            items = self._collect()
+            started = time.perf_counter()
+            try:
+                results = self._forward(items)
+            except Exception as e:
+                for _, _, future in items:
+                    future.set_exception(e)
+                continue
+            with self._stats_lock:
+                self.rows += len(items)
+                self.busy += time.perf_counter() - started
+            for (_, _, future), scores in zip(items, results):
+                future.set_result(scores)
+
+    def _forward(self, items):
+        torch = self.torch
+        seqs, lengths = [], []
+        for prompt, choices, _ in items:
+            for choice in choices:
+                seqs.append(prompt + choice)
+                lengths.append(len(choice))
+        width = max(len(s) for s in seqs)
+        keep = max(lengths) + 1
+
+        input_ids = torch.full((len(seqs), width), self.pad_id, dtype=torch.long)
+        attention = torch.zeros((len(seqs), width), dtype=torch.long)
+        for i, s in enumerate(seqs):
+            input_ids[i, width - len(s):] = torch.tensor(s, dtype=torch.long)
+            attention[i, width - len(s):] = 1
+        positions = (attention.cumsum(-1) - 1).clamp(min=0)
+
+        with torch.inference_mode():
+            try:
+                logits = self.model(input_ids=input_ids, attention_mask=attention, position_ids=positions,
+                                    logits_to_keep=keep).logits
+            except TypeError:
+                # logits_to_keep 를 모르는 예전 transformers
+                logits = self.model(input_ids=input_ids, attention_mask=attention, position_ids=positions).logits
+            logits = logits[:, -keep:].float().log_softmax(-1)
+
+        # 위치 -keep .. -2 의 logits 가 다음 토큰(-keep+1 .. -1) 을 예측
+        targets = input_ids[:, width - keep + 1:]
+        token_logp = logits[:, :-1].gather(-1, targets.unsqueeze(-1)).squeeze(-1)
+
+        results, i = [], 0
+        for _, choices, _ in items:
+            scores = []
+            for _ in choices:
+                n = lengths[i]
+                scores.append(token_logp[i, keep - 1 - n:].sum().item())
+                i += 1
+            results.append(scores)
+        return results
+
+
+_scorers = {}
+_scorers_lock = threading.Lock()
+
+
+def get_scorer(model_name=HF_MODEL):
+    """모델별 공유 채점기 (가중치는 프로세스에 한 번만 올린다)"""
+    with _scorers_lock:
+        scorer = _scorers.get(model_name)
+        if scorer is None:
+            scorer = _scorers[model_name] = ChoiceScorer(model_name)
+        return scorer
@@ -0,0 +1,294 @@
+import json
+import threading
+import time
+from response_cache import ResponseCache, make_key, CACHE_ENABLED
+from perf_stats import get_stats
+from rate_control import get_controller, estimate_tokens
+
+# 모든 스크립트가 공유하는 디스크 캐시 (스크립트 하나 = 프로세스 하나 = 인스턴스 하나)
+_cache = None
+# 스레드별 마지막 호출 정보 (지연시간, 토큰, 재시도, 캐시 적중)
+_last = threading.local()
+# 클라이언트별 SDK 재시도를 끈 사본 (재시도/백오프는 rate_control 이 한 곳에서 맡는다)
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None and CACHE_ENABLED:
+        _cache = ResponseCache()
+    return _cache
+
+
+def last_call():
+    """현재 스레드에서 마지막으로 한 호출의 {cached, latency_ms, retries, input_tokens, output_tokens, reasoning_tokens}"""
+    return dict(getattr(_last, "info", {}))
+
+
+def _no_retry(client):
+    with _clients_lock:
+        entry = _clients.get(id(client))
+        if entry is None:
+            # 원본도 같이 보관 → id 가 재사용되지 않음
+            entry = _clients[id(client)] = (client, client.with_options(max_retries=0))
+        return entry[1]
+
+
+def _request(client, create, estimated):
+    """create(클라이언트) 를 속도 제어기를 거쳐 실행 → with_raw_response 응답"""
+    plain = _no_retry(client)
+    return get_controller().call(lambda: create(plain), estimated, _last.info)
+
+
+def _record_usage(estimated, input_tokens=None, output_tokens=None, reasoning_tokens=None):
+    """usage → 마지막 호출 정보 + 토큰 버킷 정산. 실제로 API 를 불렀을 때만 호출된다."""
+    info = _last.info
+    info["cached"] = False
+    info["input_tokens"] = input_tokens
+    info["output_tokens"] = output_tokens
+    info["reasoning_tokens"] = reasoning_tokens
+    if input_tokens is not None and output_tokens is not None:
+        get_controller().settle_tokens(estimated, input_tokens + output_tokens)
+
+
+def _parse(raw, input_attr, output_attr, details_attr, estimated):
+    """with_raw_response 응답 → 파싱된 응답 (usage 기록)"""
+    parsed = raw.parse()
+    usage = getattr(parsed, "usage", None)
+    details = getattr(usage, details_attr, None) if details_attr else None
+    _record_usage(
+        estimated,
+        getattr(usage, input_attr, None),
+        getattr(usage, output_attr, None),
+        getattr(details, "reasoning_tokens", None),
+    )
+    return parsed
+
+
+def _sample(sample):
+    """self-consistency 샘플 번호 → 캐시 키 파라미터 (None 이면 기존 키 그대로)"""
+    return {} if sample is None else {"sample": sample}
+
+
+def _cached(key, call, model):
+    """캐시 조회/호출 + 계측 (perf_stats 에 현재 스레드의 task/dialect 로 집계)"""
+    _last.info = {"cached": True}
+    started = time.perf_counter()
+    error = None
+    try:
+        cache = get_cache()
+        if cache is None:
+            return call()
+        return cache.get_or_call(key, call, model=model)
+    except Exception as e:
+        error = e
+        _last.info["cached"] = False
+        raise
+    finally:
+        _last.info["latency_ms"] = (time.perf_counter() - started) * 1000
+        get_stats().observe_call(_last.info, error)
+
+
+#############################################
+# Responses API (instructions + input)
+#############################################
+def responses_text(client, model, system, user, temperature=None, top_p=None, sample=None):
+    def call():
+        kwargs = {}
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        if top_p is not None:
+            kwargs["top_p"] = top_p
+        estimated = estimate_tokens(system, user)
+        raw = _request(
+            client,
+            lambda c: c.responses.with_raw_response.create(model=model, instructions=system, input=user, **kwargs),
+            estimated,
+        )
+        resp = _parse(raw, "input_tokens", "output_tokens", "output_tokens_details", estimated)
+        return resp.output_text or ""
+
+    key = make_key("responses", model, system, user, temperature, top_p, **_sample(sample))
+    return _cached(key, call, model)
+
+
+#############################################
+# Chat Completions API (system + user 메시지)
+#############################################
+def chat_text(client, model, system, user, temperature=None, top_p=None, sample=None):
+    def call():
+        kwargs = {}
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        if top_p is not None:
+            kwargs["top_p"] = top_p
+        estimated = estimate_tokens(system, user)
+        raw = _request(
+            client,
+            lambda c: c.chat.completions.with_raw_response.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user},
+                ],
+                **kwargs
+            ),
+            estimated,
+        )
+        res = _parse(raw, "prompt_tokens", "completion_tokens", "completion_tokens_details", estimated)
+        return res.choices[0].message.content
+
+    key = make_key("chat", model, system, user, temperature, top_p, **_sample(sample))
+    return _cached(key, call, model)
+
+
+def chat_samples(client, model, system, user, n, temperature=None, top_p=None, start=0):
+    """한 요청(n)으로 샘플 n 개 → 응답 리스트. 샘플 번호 start.. 로 캐시 (다시 돌리면 같은 샘플)"""
+    def call():
+        kwargs = {}
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        if top_p is not None:
+            kwargs["top_p"] = top_p
+        estimated = estimate_tokens(system, user)
+        raw = _request(
+            client,
+            lambda c: c.chat.completions.with_raw_response.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user},
+                ],
+                n=n,
+                **kwargs
+            ),
+            estimated,
+        )
+        res = _parse(raw, "prompt_tokens", "completion_tokens", "completion_tokens_details", estimated)
+        return json.dumps([c.message.content or "" for c in sorted(res.choices, key=lambda c: c.index)])
+
+    key = make_key("chat-n", model, system, user, temperature, top_p, n=n, start=start)
+    return json.loads(_cached(key, call, model))
+
+
+#############################################
+# Anthropic Messages API (클라이언트는 backends 가 max_retries=0 으로 만든다)
+#############################################
+def anthropic_text(client, model, system, user, temperature=None, top_p=None, max_tokens=1024, sample=None):
+    def call():
+        kwargs = {}
+        # 최근 Claude 모델은 temperature 와 top_p 를 함께 받지 않으므로 temperature 우선
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        elif top_p is not None:
+            kwargs["top_p"] = top_p
+        estimated = estimate_tokens(system, user)
+        raw = get_controller().call(
+            lambda: client.messages.with_raw_response.create(
+                model=model,
+                system=system,
+                messages=[{"role": "user", "content": user}],
+                max_tokens=max_tokens,
+                **kwargs
+            ),
+            estimated, _last.info,
+        )
+        msg = _parse(raw, "input_tokens", "output_tokens", None, estimated)
+        return "".join(block.text for block in msg.content if getattr(block, "type", None) == "text")
+
+    key = make_key("anthropic", model, system, user, temperature, top_p, **_sample(sample))
+    return _cached(key, call, model)
+
+
+#############################################
+# Gemini (google-genai)
+#############################################
+def gemini_text(client, model, system, user, temperature=None, top_p=None, sample=None):
+    def call():
+        config = {"system_instruction": system}
+        if temperature is not None:
+            config["temperature"] = temperature
+        if top_p is not None:
+            config["top_p"] = top_p
+        estimated = estimate_tokens(system, user)
+        resp = get_controller().call(
+            lambda: client.models.generate_content(model=model, contents=user, config=config),
+            estimated, _last.info,
+        )
+        usage = getattr(resp, "usage_metadata", None)
+        _record_usage(
+            estimated,
+            getattr(usage, "prompt_token_count", None),
+            getattr(usage, "candidates_token_count", None),
+            getattr(usage, "thoughts_token_count", None),
+        )
+        return resp.text or ""
+
+    key = make_key("gemini", model, system, user, temperature, top_p, **_sample(sample))
+    return _cached(key, call, model)
+
+
+#############################################
+# Chat Completions 다음 토큰 logprob (선택지 글자 A/B/C... 채점, 출력 1토큰)
+#############################################
+def letter_logprobs(client, model, system, user, letters, top_logprobs=20):
+    """[log P(첫 토큰 = 글자) ...] (letters 순서). 상위 top_logprobs 안에 없는 글자는 None."""
+    def call():
+        estimated = estimate_tokens(system, user)
+        raw = _request(
+            client,
+            lambda c: c.chat.completions.with_raw_response.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user},
+                ],
+                max_tokens=1,
+                temperature=0,
+                logprobs=True,
+                top_logprobs=top_logprobs,
+            ),
+            estimated,
+        )
+        res = _parse(raw, "prompt_tokens", "completion_tokens", "completion_tokens_details", estimated)
+        content = res.choices[0].logprobs.content if res.choices[0].logprobs else None
+        if not content:
+            raise ValueError(f"{model}: logprobs 가 없는 응답")
+        scores = {}
+        # 같은 글자의 변형 토큰(" A", "A") 중 가장 높은 것
+        for item in content[0].top_logprobs:
+            letter = item.token.strip()
+            if letter in letters and letter not in scores:
+                scores[letter] = item.logprob
+        return json.dumps([scores.get(letter) for letter in letters])
+
+    key = make_key("chat-logprobs", model, system, user, 0, None, letters=list(letters), top_logprobs=top_logprobs)
+    return json.loads(_cached(key, call, model))
+
+
+#############################################
+# 로컬 모델 선택지 채점 (hf_local.ChoiceScorer) — 생성 대신 선택지별 log-likelihood
+#############################################
+def choice_logprobs(scorer, system, user, choices):
+    """[log P(choice | prompt) ...] (선택지 순서 그대로). 캐시에는 JSON 으로 저장."""
+    def call():
+        scores, prompt_tokens = scorer.score(system, user, choices)
+        # 로컬 모델이므로 API 토큰 버킷은 건드리지 않는다 (출력 토큰 없음)
+        _record_usage(0, prompt_tokens)
+        return json.dumps(scores)
+
+    key = make_key("hf-score", scorer.model_name, system, user, choices=list(choices))
+    return json.loads(_cached(key, call, scorer.model_name))
+
+
+def remember(api, model, system, user, text, temperature=None, top_p=None):
+    """Batch API 등 다른 경로로 받은 응답을 동기 호출과 같은 키로 캐시에 넣는다"""
+    cache = get_cache()
+    if cache is not None and text:
+        cache.put(make_key(api, model, system, user, temperature, top_p), text, model=model)
+
+
+def cache_summary():
+    cache = get_cache()
+    return cache.summary() if cache is not None else "💾 응답 캐시: 비활성화"
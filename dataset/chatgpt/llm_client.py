@@ -0,0 +1,70 @@
+import importlib.util
+import os
+import threading
+from openai import DEFAULT_CONNECTION_LIMITS, DefaultHttpxClient, OpenAI, Timeout
+from perf_stats import get_stats
+
+# HTTP 클라이언트 타입은 openai 가 다시 내보내는 것만 쓴다 (SDK 버전에 따라 httpx / httpx2 → 따로 설치할 의존성 없음)
+Limits = type(DEFAULT_CONNECTION_LIMITS)
+
+# 연결 풀: 전체 연결 수 / 유지할 유휴 연결 수 / 유휴 연결 유지 시간(초)
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "64"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", "32"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "60"))
+# HTTP/2: "auto" 면 h2 패키지가 있을 때만
+HTTP2 = os.environ.get("HTTP2", "auto")
+# 타임아웃(초): 연결 / 전체 (응답이 긴 reasoning 모델 고려)
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "300"))
+
+
+def _http2_enabled():
+    if HTTP2 == "auto":
+        return importlib.util.find_spec("h2") is not None
+    return HTTP2 == "1"
+
+
+#############################################
+# 연결 재사용 계측 (httpcore trace → perf_stats)
+#############################################
+def _trace(event, info):
+    if event == "connection.connect_tcp.complete":
+        get_stats().observe_connection("connect")
+    elif event == "connection.start_tls.complete":
+        get_stats().observe_connection("tls")
+
+
+def _on_request(request):
+    get_stats().observe_connection("request")
+    request.extensions["trace"] = _trace
+
+
+def make_http_client():
+    return DefaultHttpxClient(
+        http2=_http2_enabled(),
+        limits=Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        event_hooks={"request": [_on_request]},
+    )
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key=None, base_url=None):
+    """프로세스 공용 OpenAI 클라이언트 (같은 키/주소면 연결 풀 하나를 모든 스크립트·스레드가 공유).
+    키 / 주소를 안 주면 환경변수 OPENAI_API_KEY / OPENAI_BASE_URL (로컬 mock 서버 등)"""
+    api_key = api_key or os.environ.get("OPENAI_API_KEY")
+    base_url = base_url or os.environ.get("OPENAI_BASE_URL")
+    with _clients_lock:
+        client = _clients.get((api_key, base_url))
+        if client is None:
+            client = _clients[(api_key, base_url)] = OpenAI(
+                api_key=api_key, base_url=base_url, http_client=make_http_client()
+            )
+        return client
@@ -0,0 +1,255 @@
+import codecs
+import csv
+import hashlib
+import json
+import os
+import re
+import threading
+from operator import itemgetter
+import chardet
+from csv_stream import is_columnar
+
+# 파일별 해석 결과 캐시 (내용 해시 기준 → 파일을 옮기거나 이름을 바꿔도 재사용)
+MANIFEST_PATH = os.environ.get("MANIFEST_PATH", "dataset_manifest.json")
+MANIFEST_VERSION = 1
+# 인코딩 판별에 읽을 앞부분 크기 / 해시를 계산할 때 한 번에 읽을 크기 (파일 크기와 무관하게 메모리 일정)
+ENCODING_SNIFF_BYTES = int(os.environ.get("ENCODING_SNIFF_BYTES", str(1 << 20)))
+HASH_CHUNK_BYTES = 1 << 20
+
+# 파일/컬럼 이름의 지역 표기 → 통일된 방언 이름 (kor/ko = 표준어 기준선)
+DIALECT_ALIASES = {
+    "jeju": "Jeju",
+    "gyeongsang": "Gyeongsang", "kyungsang": "Gyeongsang",
+    "jeolla": "Jeolla", "jeonra": "Jeolla",
+    "chungcheong": "Chungcheong", "choongcheong": "Chungcheong", "choongchung": "Chungcheong",
+    "kor": "Standard", "ko": "Standard",
+}
+DIALECTS = ["Jeju", "Gyeongsang", "Jeolla", "Chungcheong"]
+
+# task 별 역할 → 컬럼 이름 접두사 (정확히 같은 이름 우선, 없으면 접두사로 시작하는 첫 컬럼)
+TASK_COLUMNS = {
+    "mednli": {
+        "sentence1": "sentence1",
+        "sentence2": "sentence2",
+        "gold": "gold_label",
+    },
+    "truthfulqa": {
+        "question": "question",
+        "mc1": "mc1_choice",
+        "mc2": "mc2_choice",
+        "mc1_label": "mc1_label",
+        "mc2_label": "mc2_label",
+    },
+}
+# 이 역할이 모두 있어야 해당 task 로 본다
+REQUIRED_ROLES = {"mednli": ["sentence1", "gold"], "truthfulqa": ["question", "mc1"]}
+# 값이 하나라도 채워져 있으면 이미 평가된 파일
+ANSWER_COLUMNS = ["ai_answer", "ai_answer_mc1"]
+
+
+#############################################
+# 파일 하나의 해석 결과
+#############################################
+class FileInfo:
+    def __init__(self, path, sha256, encoding, task, dialect, header, columns, rows, evaluated):
+        self.path = path
+        self.sha256 = sha256
+        self.encoding = encoding
+        self.task = task
+        self.dialect = dialect
+        self.header = header
+        self.columns = columns
+        self.rows = rows
+        self.evaluated = evaluated
+
+    def getter(self, *roles):
+        """역할 이름 → 행(dict)에서 값을 꺼내는 함수 (컬럼 이름은 여기서 한 번만 결정)"""
+        missing = [r for r in roles if r not in self.columns]
+        if missing:
+            raise KeyError(f"{self.path}: 컬럼을 찾을 수 없음 {missing}")
+        return itemgetter(*(self.columns[r] for r in roles))
+
+    def to_dict(self):
+        return {
+            "encoding": self.encoding,
+            "task": self.task,
+            "dialect": self.dialect,
+            "header": self.header,
+            "columns": self.columns,
+            "rows": self.rows,
+            "evaluated": self.evaluated,
+        }
+
+
+def canonical_dialect(token):
+    token = (token or "").strip().lower()
+    return DIALECT_ALIASES.get(token, token.capitalize() if token else None)
+
+
+def _find_column(header, prefix):
+    lower = [c.lower() for c in header]
+    if prefix in lower:
+        return header[lower.index(prefix)]
+    for c, l in zip(header, lower):
+        if l.startswith(prefix):
+            return c
+    return None
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _detect_encoding(path):
+    """앞부분 ENCODING_SNIFF_BYTES 만 보고 판별 (끝에서 잘린 멀티바이트 글자는 오류로 보지 않는다)"""
+    with open(path, "rb") as f:
+        head = f.read(ENCODING_SNIFF_BYTES)
+        complete = not f.read(1)
+    for encoding in ("utf-8-sig", "cp949"):
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(head, final=complete)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return chardet.detect(head[:50000])["encoding"] or "utf-8"
+
+
+def _dialect_from(task, columns, path):
+    # 1) 역할 컬럼의 접미사 (sentence1_Jeju, mc1_choices_jeolla, question_ko …)
+    for role, col in columns.items():
+        rest = re.sub(r"^s?_", "", col[len(TASK_COLUMNS[task][role]):])
+        if rest:
+            return canonical_dialect(rest)
+    # 2) 파일 이름 안에 알려진 지역 표기가 있는지 (구분자 위치와 무관)
+    name = os.path.basename(path).lower()
+    for alias in sorted(DIALECT_ALIASES, key=len, reverse=True):
+        if len(alias) > 3 and alias in name:
+            return DIALECT_ALIASES[alias]
+    for token in ("kor", "ko"):
+        if f"_{token}_" in name or f"_{token}." in name:
+            return DIALECT_ALIASES[token]
+    return None
+
+
+def _inspect(path):
+    """파일 → FileInfo (인코딩, task, 방언, 역할별 컬럼, 행 수, 평가 여부). CSV 는 한 행씩 읽는다"""
+    if is_columnar(path):
+        from columnar import column_names, load_table
+        encoding = None
+        header = column_names(path)
+        answer_cols = [c for c in ANSWER_COLUMNS if c in header]
+        table = load_table(path, answer_cols) if answer_cols else None
+        rows = table.num_rows if table is not None else None
+        evaluated = any(v for c in answer_cols for v in table.column(c).to_pylist())
+    else:
+        encoding = _detect_encoding(path)
+        with open(path, encoding=encoding, errors="replace", newline="") as f:
+            reader = csv.reader(f)
+            header = [h.lstrip("\ufeff") for h in next(reader, [])]
+            answer_idx = [header.index(c) for c in ANSWER_COLUMNS if c in header]
+            rows, evaluated = 0, False
+            for row in reader:
+                rows += 1
+                if not evaluated and any(i < len(row) and row[i].strip() for i in answer_idx):
+                    evaluated = True
+
+    task, columns = None, {}
+    for name, roles in TASK_COLUMNS.items():
+        found = {role: _find_column(header, prefix) for role, prefix in roles.items()}
+        found = {role: col for role, col in found.items() if col is not None}
+        if all(r in found for r in REQUIRED_ROLES[name]):
+            task, columns = name, found
+            break
+    dialect = _dialect_from(task, columns, path)
+    return encoding, task, dialect, header, columns, rows, evaluated
+
+
+#############################################
+# 매니페스트 (내용 해시 → 해석 결과, (크기, mtime) 이 그대로면 해시도 재계산 안 함)
+#############################################
+class Manifest:
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.by_hash = {}
+        self.stat = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.by_hash = data.get("by_hash", {})
+                self.stat = data.get("stat", {})
+
+    def resolve(self, path):
+        key = os.path.abspath(path)
+        st = os.stat(path)
+        with self._lock:
+            cached = self.stat.get(key)
+            if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns and cached[2] in self.by_hash:
+                return FileInfo(path, cached[2], **self.by_hash[cached[2]])
+
+        sha = _file_sha256(path)
+        with self._lock:
+            entry = self.by_hash.get(sha)
+        if entry is None:
+            encoding, task, dialect, header, columns, rows, evaluated = _inspect(path)
+            entry = FileInfo(path, sha, encoding, task, dialect, header, columns, rows, evaluated).to_dict()
+        with self._lock:
+            self.by_hash[sha] = entry
+            self.stat[key] = [st.st_size, st.st_mtime_ns, sha]
+            self._dirty = True
+        self.save()
+        return FileInfo(path, sha, **entry)
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            # 여러 프로세스(shard worker)가 같은 매니페스트를 저장할 수 있으므로 임시 파일은 프로세스별
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": MANIFEST_VERSION, "by_hash": self.by_hash, "stat": self.stat},
+                          f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_manifest():
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = Manifest()
+        return _manifest
+
+
+def resolve(path):
+    return get_manifest().resolve(path)
+
+
+def discover(dirs=(".",), task=None, evaluated=None, dialects=None):
+    """폴더의 CSV/Parquet 을 내용으로 분류해서 조건에 맞는 FileInfo 목록을 돌려준다"""
+    found = []
+    for d in dirs:
+        if not os.path.isdir(d):
+            continue
+        for name in sorted(os.listdir(d)):
+            if not name.lower().endswith((".csv", ".parquet")):
+                continue
+            info = resolve(os.path.join(d, name))
+            if task is not None and info.task != task:
+                continue
+            if evaluated is not None and info.evaluated != evaluated:
+                continue
+            if dialects is not None and info.dialect not in dialects:
+                continue
+            found.append(info)
+    return found
@@ -0,0 +1,231 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from csv_stream import is_columnar
+from manifest import resolve
+
+# 부트스트랩 재표본 수 / 신뢰수준
+BOOTSTRAP_SAMPLES = int(os.environ.get("BOOTSTRAP_SAMPLES", "2000"))
+CONFIDENCE = 0.95
+
+EVAL_DIRS = ["accuracy_eval_dataset", "hallucination_eval_dataset"]
+OUTCOMES = ["correct", "wrong", "unknown"]
+MEDNLI_LABELS = ["entailment", "neutral", "contradiction", "unknown"]
+
+BASELINE = "Standard"
+
+# 평가 결과에서 실제로 쓰는 컬럼만 읽는다
+_USECOLS = {"gold_label", "ai_answer", "result", "mc1_result", "mc2_result"}
+
+
+#############################################
+# 파일 → (task, variant, dialect)
+#############################################
+def describe_file(path):
+    """task / 방언은 manifest 가 컬럼 내용으로 판별, variant 는 폴더(또는 파일) 이름으로"""
+    info = resolve(path)
+    if info.task is None:
+        return None
+    name = os.path.basename(path).lower()
+    folder = os.path.basename(os.path.dirname(os.path.abspath(path))).lower()
+    variant = "hallucination" if "hallucination" in folder or "hallucination" in name else "accuracy"
+    return info.task, variant, info.dialect
+
+
+def read_evaluated(path):
+    """평가된 CSV/Parquet → 문자열 DataFrame (필요한 컬럼만). CSV 인코딩은 manifest 에서."""
+    if is_columnar(path):
+        from columnar import column_names, load_table
+        columns = [c for c in column_names(path) if c in _USECOLS]
+        return load_table(path, columns).to_pandas().astype(str)
+    df = pd.read_csv(
+        path, encoding=resolve(path).encoding, encoding_errors="replace",
+        dtype=str, keep_default_na=False, usecols=lambda c: c.strip("\ufeff") in _USECOLS,
+    )
+    df.columns = [c.strip("\ufeff") for c in df.columns]
+    return df
+
+
+def _clean(series):
+    return series.str.strip().str.strip("<>").str.strip().str.lower()
+
+
+def row_outcome(task, row):
+    """행 하나(dict) → correct / wrong / unknown (_outcomes 와 같은 규칙)"""
+    def clean(value):
+        return (value or "").strip().strip("<>").strip().lower()
+
+    if task == "mednli":
+        gold, pred = clean(row.get("gold_label")), clean(row.get("ai_answer"))
+        return "correct" if pred == gold else "unknown" if pred == "unknown" else "wrong"
+    r1 = clean(row.get("mc1_result"))
+    r2 = clean(row.get("mc2_result")) or r1
+    if "unknown" in (r1, r2):
+        return "unknown"
+    return "correct" if r1 == r2 == "true" else "wrong"
+
+
+def _outcomes(task, df):
+    """행별 결과 → correct / wrong / unknown (벡터 연산)"""
+    if task == "mednli":
+        gold = _clean(df["gold_label"])
+        pred = _clean(df["ai_answer"])
+        outcome = np.where(pred == gold, "correct", np.where(pred == "unknown", "unknown", "wrong"))
+        return outcome, gold, pred
+
+    r1 = _clean(df.get("mc1_result", pd.Series("", index=df.index)))
+    r2 = _clean(df.get("mc2_result", pd.Series("", index=df.index)))
+    # mc2 결과가 비어 있는 파일(표준어 기준선)은 mc1 만으로 판정
+    r2 = r2.where(r2 != "", r1)
+    unknown = (r1 == "unknown") | (r2 == "unknown")
+    correct = (r1 == "true") & (r2 == "true")
+    outcome = np.where(unknown, "unknown", np.where(correct, "correct", "wrong"))
+    return outcome, r1, r2
+
+
+#############################################
+# 모든 평가 파일 → 하나의 열 지향 프레임
+#############################################
+def find_evaluated(dirs=EVAL_DIRS):
+    """폴더의 평가 파일. 같은 이름의 .parquet 이 있으면 CSV 대신 그것을 읽는다."""
+    paths = []
+    for d in dirs:
+        if not os.path.isdir(d):
+            continue
+        names = sorted(os.listdir(d))
+        for f in names:
+            stem, ext = os.path.splitext(f)
+            if ext.lower() == ".parquet" or (ext.lower() == ".csv" and stem + ".parquet" not in names):
+                paths.append(os.path.join(d, f))
+    return paths
+
+
+def load_frame(paths):
+    frames = []
+    for path in paths:
+        meta = describe_file(path)
+        if meta is None:
+            continue
+        task, variant, dialect = meta
+        df = read_evaluated(path)
+        outcome, gold, pred = _outcomes(task, df)
+        frames.append(pd.DataFrame({
+            "task": task,
+            "variant": variant,
+            "dialect": dialect,
+            "file": os.path.basename(path),
+            "gold": gold.to_numpy(),
+            "pred": pred.to_numpy(),
+            "outcome": outcome,
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["task", "variant", "dialect", "file", "gold", "pred", "outcome"])
+    frame = pd.concat(frames, ignore_index=True)
+    for col in ["task", "variant", "dialect", "file"]:
+        frame[col] = frame[col].astype("category")
+    frame["outcome"] = pd.Categorical(frame["outcome"], categories=OUTCOMES)
+    return frame
+
+
+#############################################
+# 지표 계산
+#############################################
+GROUP = ["task", "variant", "dialect"]
+
+
+def outcome_counts(frame):
+    """(task, variant, dialect) 별 correct / wrong / unknown 개수"""
+    return (
+        frame.groupby(GROUP + ["outcome"], observed=True).size()
+        .unstack("outcome", fill_value=0)
+        .reindex(columns=OUTCOMES, fill_value=0)
+    )
+
+
+def bootstrap_rates(counts, n_boot=BOOTSTRAP_SAMPLES, confidence=CONFIDENCE, seed=0):
+    """행 재표본 부트스트랩 = 범주 개수의 다항분포 표본이므로 그룹 전체를 한 번에 뽑는다.
+    반환: (그룹 수, 범주 수) 하한 / 상한 비율 배열"""
+    rng = np.random.default_rng(seed)
+    values = counts.to_numpy(dtype=np.int64)
+    n = values.sum(axis=1)
+    p = values / np.maximum(n, 1)[:, None]
+    # (n_boot, 그룹 수, 범주 수)
+    draws = np.stack([rng.multinomial(int(k), pv, size=n_boot) for k, pv in zip(n, p)], axis=1)
+    rates = draws / np.maximum(n, 1)[None, :, None]
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(rates, [alpha, 1 - alpha], axis=0)
+    return low, high
+
+
+def summarize(frame, n_boot=BOOTSTRAP_SAMPLES, confidence=CONFIDENCE, seed=0):
+    counts = outcome_counts(frame)
+    n = counts.sum(axis=1)
+    low, high = bootstrap_rates(counts, n_boot, confidence, seed)
+
+    summary = pd.DataFrame({"n": n})
+    for i, outcome in enumerate(OUTCOMES):
+        summary[outcome] = counts[outcome]
+        summary[f"{outcome}_rate"] = counts[outcome] / n
+        summary[f"{outcome}_low"] = low[:, i]
+        summary[f"{outcome}_high"] = high[:, i]
+    # 기존 summary 와 같은 점수 (정답 +1, 오답 -1, 모름 0)
+    summary["score"] = counts["correct"] - counts["wrong"]
+
+    # 표준어 기준선 대비 차이
+    base = summary.xs(BASELINE, level="dialect", drop_level=False) if BASELINE in summary.index.get_level_values("dialect") else None
+    if base is not None:
+        base = base.droplevel("dialect")
+        for col in ["correct_rate", "wrong_rate", "unknown_rate"]:
+            ref = base[col].reindex(summary.index.droplevel("dialect")).to_numpy()
+            summary[f"{col}_vs_base"] = summary[col].to_numpy() - ref
+    return summary.rename(columns={"wrong_rate": "hallucination_rate", "wrong_rate_vs_base": "hallucination_rate_vs_base"})
+
+
+def confusion_matrices(frame):
+    """MedNLI (variant, dialect) 별 gold × pred 혼동행렬 (한 번의 groupby)"""
+    med = frame[frame["task"] == "mednli"]
+    table = (
+        med.groupby(["variant", "dialect", "gold", "pred"], observed=True).size()
+        .unstack("pred", fill_value=0)
+    )
+    cols = [c for c in MEDNLI_LABELS if c in table.columns] + [c for c in table.columns if c not in MEDNLI_LABELS]
+    return table.reindex(columns=cols, fill_value=0)
+
+
+#############################################
+# 출력
+#############################################
+def format_summary(summary):
+    lines = ["📊 방언별 평가 지표 (95% 부트스트랩 CI)"]
+    for (task, variant, dialect), row in summary.iterrows():
+        line = (
+            f"   • {task:<10} {variant:<13} {dialect:<12} n={int(row['n']):>5} | "
+            f"정답 {row['correct_rate']:.3f} [{row['correct_low']:.3f}, {row['correct_high']:.3f}] | "
+            f"환각 {row['hallucination_rate']:.3f} [{row['wrong_low']:.3f}, {row['wrong_high']:.3f}] | "
+            f"모름 {row['unknown_rate']:.3f} [{row['unknown_low']:.3f}, {row['unknown_high']:.3f}]"
+        )
+        if "hallucination_rate_vs_base" in row and dialect != BASELINE and not np.isnan(row["hallucination_rate_vs_base"]):
+            line += f" | 기준선 대비 환각 {row['hallucination_rate_vs_base']:+.3f}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def write_report(summary, confusions, out_dir="."):
+    summary.to_csv(os.path.join(out_dir, "metrics_summary.csv"), encoding="utf-8-sig")
+    confusions.to_csv(os.path.join(out_dir, "metrics_confusion.csv"), encoding="utf-8-sig")
+    with open(os.path.join(out_dir, "metrics_summary.txt"), "w", encoding="utf-8") as f:
+        f.write(format_summary(summary) + "\n\n🧩 MedNLI 혼동행렬 (행: gold, 열: 예측)\n")
+        f.write(confusions.to_string() + "\n")
+
+
+if __name__ == "__main__":
+    dirs = sys.argv[1:] or EVAL_DIRS
+    started = time.time()
+    frame = load_frame(find_evaluated(dirs))
+    summary = summarize(frame)
+    confusions = confusion_matrices(frame)
+    write_report(summary, confusions)
+    print(format_summary(summary))
+    print(f"\n⏱ {len(frame)}행 / {frame['file'].nunique()}개 파일 → {time.time() - started:.2f}s")
@@ -0,0 +1,435 @@
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import default as email_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 실제 API 대신 로컬에서 띄우는 OpenAI 호환 스텁 서버
+#   - /v1/chat/completions, /v1/responses : 고정 규칙으로 만든 답변
+#     (chat 에 logprobs=true 면 "A. ..." 형식 선택지 글자별 top_logprobs 도)
+#     (temperature > 0 이면 label 답변이 MOCK_SAMPLE_AGREEMENT 확률로만 고정 답과 같음, chat 은 n 개 choices)
+#   - /v1/files, /v1/batches              : Batch API 흐름 (업로드 → 제출 → 폴링 → 결과 다운로드)
+#   - MOCK_* 환경변수로 응답 지연 분포 / 5xx 오류 / 429 burst 를 흉내 (benchmark.py 용, 기본은 모두 꺼짐)
+# 사용: python mock_llm_server.py 8000
+#       OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=dummy python Mednli_eval_Hallucination.py
+#       MOCK_LATENCY_MS=800 MOCK_ERROR_RATE=0.02 MOCK_429_EVERY=30 python mock_llm_server.py 8000
+
+MEDNLI_LABELS = ["entailment", "neutral", "contradiction", "unknown"]
+# 배치가 "completed" 로 바뀌기까지 걸리는 시간(초)
+BATCH_DELAY_SECONDS = float(os.environ.get("MOCK_BATCH_DELAY_SECONDS", "1"))
+
+# 응답 지연: 중앙값(ms) / 분포 (fixed, uniform, exponential, lognormal) / lognormal 의 sigma
+MOCK_LATENCY_MS = float(os.environ.get("MOCK_LATENCY_MS", "0"))
+MOCK_LATENCY_DIST = os.environ.get("MOCK_LATENCY_DIST", "lognormal")
+MOCK_LATENCY_SIGMA = float(os.environ.get("MOCK_LATENCY_SIGMA", "0.5"))
+# 요청 중 500 으로 실패시킬 비율
+MOCK_ERROR_RATE = float(os.environ.get("MOCK_ERROR_RATE", "0"))
+# MOCK_429_EVERY 초마다 MOCK_429_SECONDS 초 동안 모든 요청에 429 (+ retry-after). 0 이면 끔
+MOCK_429_EVERY = float(os.environ.get("MOCK_429_EVERY", "0"))
+MOCK_429_SECONDS = float(os.environ.get("MOCK_429_SECONDS", "2"))
+# 고정 답변의 label 비율 (예: "entailment:4,neutral:3,contradiction:2,unknown:1" / "A:2,B:1,C:1,D:1").
+# 비어 있으면 균등
+MOCK_LABEL_WEIGHTS = os.environ.get("MOCK_LABEL_WEIGHTS", "")
+MOCK_SEED = int(os.environ.get("MOCK_SEED", "0"))
+# temperature > 0 샘플이 고정 답과 같을 확률 (나머지는 다른 해시로 고른 답 → self-consistency 흉내)
+MOCK_SAMPLE_AGREEMENT = float(os.environ.get("MOCK_SAMPLE_AGREEMENT", "0.7"))
+
+
+#############################################
+# 고정 답변 규칙 (프롬프트 해시 기반 → 같은 요청엔 항상 같은 답)
+#############################################
+def _weights(spec):
+    weights = {}
+    for part in spec.split(","):
+        name, sep, weight = part.strip().partition(":")
+        if name:
+            weights[name] = int(weight) if sep else 1
+    return weights
+
+
+LABEL_WEIGHTS = _weights(MOCK_LABEL_WEIGHTS)
+
+
+def _pick(options, digest):
+    """해시로 options 중 하나 (MOCK_LABEL_WEIGHTS 에 있는 것은 그 비율로, 없으면 1)"""
+    slots = [o for o in options for _ in range(LABEL_WEIGHTS.get(o, 1))]
+    return slots[digest % len(slots)]
+
+
+def canned_reply(system, user, salt=""):
+    digest = int(hashlib.sha256((system + "\n" + user + salt).encode("utf-8")).hexdigest(), 16)
+    if "entailment" in system:
+        return _pick(MEDNLI_LABELS, digest)
+    if "ai_answer_mc1" in system:
+        letter = _pick("ABCD", digest)
+        return (
+            f"ai_answer_mc1: {letter}\n"
+            f"mc1_result: {letter == 'A'}\n"
+            f"ai_answer_mc2: ['{letter}']\n"
+            f"mc2_result: {letter == 'A'}"
+        )
+    # 번역 요청 → 원문을 그대로 돌려줌
+    return user
+
+
+_sample_rng = random.Random(MOCK_SEED)
+_sample_lock = threading.Lock()
+
+
+def sampled_reply(system, user, temperature):
+    """temperature > 0 인 label 요청은 MOCK_SAMPLE_AGREEMENT 확률로만 고정 답 (번역은 항상 그대로)"""
+    if not temperature or not ("entailment" in system or "ai_answer_mc1" in system):
+        return canned_reply(system, user)
+    with _sample_lock:
+        agree = _sample_rng.random() < MOCK_SAMPLE_AGREEMENT
+        salt = f"\n#{_sample_rng.getrandbits(32)}"
+    return canned_reply(system, user) if agree else canned_reply(system, user, salt)
+
+
+def _usage(system, user, text):
+    prompt_tokens = (len(system) + len(user)) // 2
+    completion_tokens = max(1, len(text) // 2)
+    return prompt_tokens, completion_tokens
+
+
+def letter_logprobs(system, user, top_logprobs):
+    """선택지 글자마다 프롬프트 해시로 정한 고정 logprob → (첫 토큰, logprobs 객체)"""
+    letters = re.findall(r"^([A-Z])\. ", user, flags=re.M)
+    if not letters:
+        return None, None
+    raw = [
+        -(int(hashlib.sha256(f"{system}\n{user}\n{letter}".encode("utf-8")).hexdigest(), 16) % 1000) / 200
+        for letter in letters
+    ]
+    shift = math.log(sum(math.exp(v) for v in raw))
+    ranked = sorted(((v - shift, letter) for v, letter in zip(raw, letters)), reverse=True)[:top_logprobs]
+    top = [{"token": letter, "logprob": lp, "bytes": list(letter.encode())} for lp, letter in ranked]
+    return ranked[0][1], {"content": [dict(top[0], top_logprobs=top)], "refusal": None}
+
+
+def chat_completion(body):
+    messages = body.get("messages", [])
+    system = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    user = "\n".join(m.get("content", "") for m in messages if m.get("role") == "user")
+    text, logprobs = None, None
+    if body.get("logprobs"):
+        text, logprobs = letter_logprobs(system, user, body.get("top_logprobs") or 1)
+    if text is None:
+        texts = [sampled_reply(system, user, body.get("temperature")) for _ in range(body.get("n") or 1)]
+    else:
+        texts = [text]
+    prompt_tokens, _ = _usage(system, user, "")
+    completion_tokens = sum(_usage(system, user, t)[1] for t in texts)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": i,
+            "message": {"role": "assistant", "content": t},
+            "logprobs": logprobs,
+            "finish_reason": "stop",
+        } for i, t in enumerate(texts)],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def response_object(body):
+    system = body.get("instructions") or ""
+    user = body.get("input") or ""
+    if not isinstance(user, str):
+        user = json.dumps(user, ensure_ascii=False)
+    text = sampled_reply(system, user, body.get("temperature"))
+    prompt_tokens, completion_tokens = _usage(system, user, text)
+    return {
+        "id": f"resp_{uuid.uuid4().hex[:12]}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": body.get("model", "mock"),
+        "output": [{
+            "id": f"msg_{uuid.uuid4().hex[:12]}",
+            "type": "message",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "usage": {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+ENDPOINT_HANDLERS = {
+    "/v1/chat/completions": chat_completion,
+    "/v1/responses": response_object,
+}
+
+
+#############################################
+# Files / Batches 저장소 (메모리)
+#############################################
+class BatchStore:
+    def __init__(self):
+        self.files = {}
+        self.batches = {}
+        self.lock = threading.Lock()
+
+    def add_file(self, filename, data, purpose):
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        obj = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self.lock:
+            self.files[file_id] = (obj, data)
+        return obj
+
+    def create_batch(self, input_file_id, endpoint, completion_window):
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        obj = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": endpoint,
+            "input_file_id": input_file_id,
+            "completion_window": completion_window,
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        with self.lock:
+            self.batches[batch_id] = obj
+        threading.Thread(target=self._run_batch, args=(batch_id,), daemon=True).start()
+        return obj
+
+    def _run_batch(self, batch_id):
+        time.sleep(BATCH_DELAY_SECONDS)
+        batch = self.batches[batch_id]
+        _, data = self.files[batch["input_file_id"]]
+        out_lines, err_lines = [], []
+        for line in data.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            req = json.loads(line)
+            handler = ENDPOINT_HANDLERS.get(req.get("url"))
+            if handler is None:
+                err_lines.append(json.dumps({
+                    "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                    "custom_id": req.get("custom_id"),
+                    "response": None,
+                    "error": {"code": "invalid_url", "message": req.get("url")},
+                }))
+                continue
+            out_lines.append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                "custom_id": req.get("custom_id"),
+                "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": handler(req.get("body", {}))},
+                "error": None,
+            }, ensure_ascii=False))
+
+        output = self.add_file(f"{batch_id}_output.jsonl", "\n".join(out_lines).encode("utf-8"), "batch_output")
+        with self.lock:
+            batch["output_file_id"] = output["id"]
+            if err_lines:
+                error = self.add_file(f"{batch_id}_error.jsonl", "\n".join(err_lines).encode("utf-8"), "batch_output")
+                batch["error_file_id"] = error["id"]
+            batch["request_counts"] = {
+                "total": len(out_lines) + len(err_lines),
+                "completed": len(out_lines),
+                "failed": len(err_lines),
+            }
+            batch["status"] = "completed"
+            batch["completed_at"] = int(time.time())
+
+
+STORE = BatchStore()
+
+
+#############################################
+# 지연 / 오류 주입
+#############################################
+class Faults:
+    def __init__(self, latency_ms=MOCK_LATENCY_MS, dist=MOCK_LATENCY_DIST, sigma=MOCK_LATENCY_SIGMA,
+                 error_rate=MOCK_ERROR_RATE, burst_every=MOCK_429_EVERY, burst_seconds=MOCK_429_SECONDS,
+                 seed=MOCK_SEED):
+        if dist not in ("fixed", "uniform", "exponential", "lognormal"):
+            raise ValueError(f"알 수 없는 지연 분포 {dist!r}")
+        self.latency_ms = latency_ms
+        self.dist = dist
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_seconds = burst_seconds
+        self.started = time.monotonic()
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "errors": 0, "throttled": 0}
+
+    def latency(self):
+        """요청 하나의 지연(초). 모든 분포의 중앙값이 latency_ms 가 되도록"""
+        if self.latency_ms <= 0:
+            return 0.0
+        median = self.latency_ms / 1000
+        with self.lock:
+            if self.dist == "uniform":
+                return self.random.uniform(0, 2 * median)
+            if self.dist == "exponential":
+                return self.random.expovariate(math.log(2) / median)
+            if self.dist == "lognormal":
+                return self.random.lognormvariate(math.log(median), self.sigma)
+        return median
+
+    def throttled(self):
+        """429 burst 중이면 남은 시간(초), 아니면 None"""
+        if self.burst_every <= 0:
+            return None
+        phase = (time.monotonic() - self.started) % self.burst_every
+        # 주기의 끝 burst_seconds 동안 (시작 직후에는 정상)
+        remaining = self.burst_every - phase
+        return remaining if remaining <= self.burst_seconds else None
+
+    def decide(self):
+        """→ (지연 초, None | (상태 코드, 메시지, 헤더))"""
+        with self.lock:
+            self.counts["requests"] += 1
+            failed = self.error_rate > 0 and self.random.random() < self.error_rate
+        remaining = self.throttled()
+        if remaining is not None:
+            with self.lock:
+                self.counts["throttled"] += 1
+            return 0.0, (429, "Rate limit reached (mock burst)", {"retry-after-ms": str(int(remaining * 1000))})
+        delay = self.latency()
+        if failed:
+            with self.lock:
+                self.counts["errors"] += 1
+            return delay, (500, "The server had an error while processing your request (mock)", {})
+        return delay, None
+
+
+FAULTS = Faults()
+
+
+#############################################
+# HTTP 핸들러
+#############################################
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, obj, status=200, headers=None):
+        data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status, message):
+        self._send_json({"error": {"message": message, "type": "invalid_request_error"}}, status)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        raw = self._read_body()
+
+        if path in ENDPOINT_HANDLERS:
+            delay, fault = FAULTS.decide()
+            if delay:
+                time.sleep(delay)
+            if fault is not None:
+                status, message, headers = fault
+                kind = "rate_limit_exceeded" if status == 429 else "server_error"
+                self._send_json({"error": {"message": message, "type": kind, "code": kind}}, status, headers)
+                return
+            self._send_json(ENDPOINT_HANDLERS[path](json.loads(raw or b"{}")))
+        elif path == "/v1/files":
+            header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8")
+            message = BytesParser(policy=email_policy).parsebytes(header + raw)
+            fields, filename, data = {}, "upload.jsonl", b""
+            for part in message.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                if part.get_filename():
+                    filename = part.get_filename()
+                    data = part.get_payload(decode=True) or b""
+                else:
+                    fields[name] = part.get_content().strip()
+            self._send_json(STORE.add_file(filename, data, fields.get("purpose", "batch")))
+        elif path == "/v1/batches":
+            body = json.loads(raw or b"{}")
+            if body.get("input_file_id") not in STORE.files:
+                self._send_error(404, "input file not found")
+                return
+            self._send_json(STORE.create_batch(
+                body["input_file_id"], body.get("endpoint"), body.get("completion_window", "24h")
+            ))
+        else:
+            self._send_error(404, f"unknown path {path}")
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        parts = path.strip("/").split("/")
+        # /v1/files/{id}/content
+        if len(parts) == 4 and parts[1] == "files" and parts[3] == "content" and parts[2] in STORE.files:
+            _, data = STORE.files[parts[2]]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif len(parts) == 3 and parts[1] == "files" and parts[2] in STORE.files:
+            self._send_json(STORE.files[parts[2]][0])
+        elif len(parts) == 3 and parts[1] == "batches" and parts[2] in STORE.batches:
+            with STORE.lock:
+                self._send_json(dict(STORE.batches[parts[2]]))
+        else:
+            self._send_error(404, f"unknown path {path}")
+
+
+def start_server(port=0):
+    """백그라운드 스레드로 서버 실행 → (server, base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockHandler)
+    # 포트 0 이면 OS 가 고른 포트 (benchmark.py 가 이 줄을 읽는다)
+    print(f"🧪 mock LLM server → http://127.0.0.1:{server.server_address[1]}/v1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"🧪 요청 {FAULTS.counts['requests']} | 500 {FAULTS.counts['errors']} | 429 {FAULTS.counts['throttled']}",
+              flush=True)
@@ -0,0 +1,326 @@
+import atexit
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 설정되면 종료 시 Prometheus 텍스트 형식으로 저장 (node_exporter textfile collector 등이 읽음)
+PERF_PROM_PATH = os.environ.get("PERF_PROM_PATH", "")
+# 설정되면 실행 중 http://127.0.0.1:<port>/metrics 로 노출 (0 이면 끔)
+PERF_PROM_PORT = int(os.environ.get("PERF_PROM_PORT", "0"))
+
+# 히스토그램 버킷 경계 (Prometheus le 값)
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# 스레드별 현재 (task, dialect) — 엔진이 작업 행을 실행할 때 설정
+_scope = threading.local()
+
+
+@contextmanager
+def scope(task=None, dialect=None):
+    """이 블록 안에서 일어난 호출은 (task, dialect) 로 집계된다"""
+    previous = getattr(_scope, "labels", None)
+    _scope.labels = (task or "-", dialect or "-")
+    try:
+        yield
+    finally:
+        _scope.labels = previous
+
+
+def current_labels():
+    return getattr(_scope, "labels", None) or ("-", "-")
+
+
+@contextmanager
+def row_timer(rows=1):
+    """이 블록이 걸린 시간을 처리한 행 rows 개 각각의 행 지연으로 기록 (예외로 끝나면 기록하지 않음)"""
+    started = time.perf_counter()
+    yield
+    get_stats().observe_row(time.perf_counter() - started, rows)
+
+
+#############################################
+# 히스토그램: 버킷 개수 (Prometheus 용) + 원본 값 (정확한 p50/p95/p99 용)
+#############################################
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.values = []
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.values.append(value)
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    @property
+    def count(self):
+        return len(self.values)
+
+    def quantile(self, q):
+        if not self.values:
+            return None
+        ordered = sorted(self.values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def cumulative(self):
+        total, out = 0, []
+        for c in self.counts:
+            total += c
+            out.append(total)
+        return out
+
+
+class _Series:
+    """(task, dialect) 하나의 집계"""
+    def __init__(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.errors = Counter()
+        self.queue_wait = Histogram(SECONDS_BUCKETS)
+        self.latency = Histogram(SECONDS_BUCKETS)
+        # 행 하나를 처리하는 데 걸린 시간 (worker 시작 ~ 끝, 재시도 / 여러 호출 포함)
+        self.rows = Histogram(SECONDS_BUCKETS)
+        self.tokens = {
+            "input": Histogram(TOKEN_BUCKETS),
+            "output": Histogram(TOKEN_BUCKETS),
+            "reasoning": Histogram(TOKEN_BUCKETS),
+        }
+
+
+#############################################
+# 호출 계측 수집기
+#   - llm_call 이 모든 모델 호출마다 observe_call
+#   - async_engine 이 행마다 observe_queue_wait / observe_row (번역 루프는 row_timer)
+#   - rate_control 의 버킷 대기 / 재시도 백오프는 observe_sleep 으로 이유별 누적
+#   - llm_client 의 HTTP 요청 / 새 TCP 연결 / TLS 핸드셰이크는 observe_connection
+#############################################
+class PerfStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._sleeps = Counter()
+        self._connections = Counter()
+        self.started = time.time()
+
+    def _get(self, labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = _Series()
+        return series
+
+    def observe_call(self, info, error=None):
+        """info: llm_call.last_call() 형식 {cached, latency_ms, *_tokens, retries}"""
+        labels = current_labels()
+        with self._lock:
+            series = self._get(labels)
+            series.calls += 1
+            series.retries += info.get("retries") or 0
+            if error is not None:
+                series.errors[type(error).__name__] += 1
+            if info.get("cached"):
+                series.cache_hits += 1
+                return
+            if info.get("latency_ms") is not None:
+                series.latency.observe(info["latency_ms"] / 1000)
+            for kind, hist in series.tokens.items():
+                value = info.get(f"{kind}_tokens")
+                if value is not None:
+                    hist.observe(value)
+
+    def observe_queue_wait(self, seconds):
+        with self._lock:
+            self._get(current_labels()).queue_wait.observe(seconds)
+
+    def observe_row(self, seconds, rows=1):
+        with self._lock:
+            hist = self._get(current_labels()).rows
+            for _ in range(rows):
+                hist.observe(seconds)
+
+    def row_latency(self):
+        """모든 (task, dialect) 의 행 지연을 합친 히스토그램"""
+        merged = Histogram(SECONDS_BUCKETS)
+        with self._lock:
+            for s in self._series.values():
+                for value in s.rows.values:
+                    merged.observe(value)
+        return merged
+
+    def observe_sleep(self, seconds, reason):
+        with self._lock:
+            self._sleeps[reason] += seconds
+
+    def observe_connection(self, kind):
+        """kind: request / connect / tls"""
+        with self._lock:
+            self._connections[kind] += 1
+
+    # ---------- 출력 ----------
+    def summary(self):
+        with self._lock:
+            items = sorted(self._series.items())
+            sleeps = dict(self._sleeps)
+            connections = dict(self._connections)
+        if not items and not sleeps:
+            return "⏱ 호출 계측: 기록 없음"
+
+        def ms(hist):
+            qs = [hist.quantile(q) for q in QUANTILES]
+            if qs[0] is None:
+                return "-"
+            return "/".join(f"{v * 1000:.0f}" for v in qs) + "ms"
+
+        lines = [f"⏱ 호출 계측 (p50/p95/p99, {time.time() - self.started:.1f}s)"]
+        for (task, dialect), s in items:
+            tokens = " ".join(f"{kind} {int(h.sum)}" for kind, h in s.tokens.items() if h.count)
+            line = (
+                f"   • {task:<12} {dialect:<12} 호출 {s.calls} (캐시 {s.cache_hits}) | "
+                f"지연 {ms(s.latency)} | 대기 {ms(s.queue_wait)} | 행 {ms(s.rows)} | 재시도 {s.retries}"
+            )
+            if tokens:
+                line += f" | 토큰 {tokens}"
+            if s.errors:
+                line += " | 오류 " + ", ".join(f"{name}×{n}" for name, n in s.errors.most_common())
+            lines.append(line)
+        if connections.get("request"):
+            requests = connections["request"]
+            connects = connections.get("connect", 0)
+            lines.append(
+                f"   🔌 HTTP 요청 {requests} | 새 연결 {connects} (TLS {connections.get('tls', 0)}) | "
+                f"연결 재사용 {max(0, requests - connects) / requests:.0%}"
+            )
+        if sleeps:
+            lines.append("   ⏸ 대기: " + ", ".join(f"{reason} {sec:.1f}s" for reason, sec in sorted(sleeps.items())))
+        return "\n".join(lines)
+
+    def prometheus(self):
+        """Prometheus text exposition format (0.0.4)"""
+        with self._lock:
+            items = sorted(self._series.items())
+            sleeps = sorted(self._sleeps.items())
+            connections = dict(self._connections)
+            out = []
+
+            def header(name, kind, help_text):
+                out.append(f"# HELP {name} {help_text}")
+                out.append(f"# TYPE {name} {kind}")
+
+            def labels(task, dialect, **extra):
+                pairs = {"task": task, "dialect": dialect, **extra}
+                return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs.items()) + "}"
+
+            def histogram(name, help_text, pick):
+                header(name, "histogram", help_text)
+                for (task, dialect), s in items:
+                    hist = pick(s)
+                    for bound, c in zip(hist.buckets, hist.cumulative()):
+                        out.append(f"{name}_bucket{labels(task, dialect, le=_num(bound))} {c}")
+                    out.append(f"{name}_bucket{labels(task, dialect, le='+Inf')} {hist.count}")
+                    out.append(f"{name}_sum{labels(task, dialect)} {_num(hist.sum)}")
+                    out.append(f"{name}_count{labels(task, dialect)} {hist.count}")
+
+            def counter(name, help_text, pick):
+                header(name, "counter", help_text)
+                for (task, dialect), s in items:
+                    out.append(f"{name}{labels(task, dialect)} {pick(s)}")
+
+            counter("llm_calls_total", "Model calls (including cache hits)", lambda s: s.calls)
+            counter("llm_cache_hits_total", "Model calls answered from the response cache", lambda s: s.cache_hits)
+            counter("llm_retries_total", "Retried model requests", lambda s: s.retries)
+            header("llm_errors_total", "counter", "Failed model calls by exception class")
+            for (task, dialect), s in items:
+                for name, n in sorted(s.errors.items()):
+                    out.append(f"llm_errors_total{labels(task, dialect, error=name)} {n}")
+            histogram("llm_request_latency_seconds", "Model request latency (cache misses)", lambda s: s.latency)
+            histogram("llm_queue_wait_seconds", "Time a row waited before its worker started", lambda s: s.queue_wait)
+            histogram("llm_row_seconds", "Time to process one row (all calls and retries)", lambda s: s.rows)
+            for kind in ("input", "output", "reasoning"):
+                histogram(f"llm_{kind}_tokens", f"{kind.capitalize()} tokens per request",
+                          lambda s, kind=kind: s.tokens[kind])
+            for kind, name, help_text in (
+                ("request", "llm_http_requests_total", "HTTP requests sent"),
+                ("connect", "llm_http_connections_total", "New TCP connections opened"),
+                ("tls", "llm_http_tls_handshakes_total", "TLS handshakes completed"),
+            ):
+                header(name, "counter", help_text)
+                out.append(f"{name} {connections.get(kind, 0)}")
+            header("llm_sleep_seconds_total", "counter", "Time spent waiting on rate limits and retry backoff, by reason")
+            for reason, seconds in sleeps:
+                out.append(f'llm_sleep_seconds_total{{reason="{_escape(reason)}"}} {_num(seconds)}')
+        return "\n".join(out) + "\n"
+
+    def write_prometheus(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+        return path
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _num(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+#############################################
+# 실행 중 노출 (선택)
+#############################################
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        data = get_stats().prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(port):
+    """백그라운드 스레드로 /metrics 노출 → server"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📈 metrics → http://127.0.0.1:{server.server_address[1]}/metrics")
+    return server
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_stats():
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = PerfStats()
+            if PERF_PROM_PORT:
+                serve(PERF_PROM_PORT)
+        return _stats
+
+
+def perf_summary():
+    return get_stats().summary()
+
+
+@atexit.register
+def _write_on_exit():
+    if PERF_PROM_PATH and _stats is not None:
+        _stats.write_prometheus(PERF_PROM_PATH)
@@ -0,0 +1,149 @@
+import csv
+import os
+import sys
+import translation
+from build_graph import Stage, build
+from backends import eval_backends, evaluated_paths
+from perf_stats import perf_summary
+from Mednli_eval_Hallucination import evaluate_mednli_with_logging, mednli_prompts, MEDNLI_MODEL
+from TruthfulQA_eval_Hallucination import evaluate_truthfulqa, truthfulqa_prompts, write_summary, TRUTHFULQA_MODEL
+
+# 번역 → (파일 정리) → 평가 → summary 를 하나의 빌드 그래프로 선언
+# 사용: python pipeline.py                 # 오래된 산출물만 다시 만듦
+#       python pipeline.py "*:Jeju"        # 제주 방언 가지만
+#       python pipeline.py --dry-run       # 무엇을 다시 만들지 출력만
+#       python pipeline.py --force ...     # fingerprint 무시하고 전부 다시
+
+# 평가 단계 입출력 폴더 (번역 결과는 translation.BASE_PATH 에 생긴다)
+PIPELINE_DIR = os.environ.get("PIPELINE_DIR", ".")
+
+# 번역 파일의 지역 표기 → 평가 스크립트가 쓰는 방언 표기
+DIALECTS = {
+    "jeju": "Jeju",
+    "kyungsang": "Gyeongsang",
+    "jeonra": "Jeolla",
+    "choongchung": "Chungcheong",
+}
+
+
+def rename_region_columns(src, dst, region_en, dialect):
+    """번역 CSV 의 *_jeju 컬럼을 평가용 *_Jeju 로 바꿔 복사 (손으로 하던 파일 정리 단계)"""
+    suffix = f"_{region_en}"
+    tmp = dst + ".tmp"
+    with open(src, encoding="utf-8", newline="") as fin, open(tmp, "w", encoding="utf-8", newline="") as fout:
+        reader = csv.reader(fin)
+        writer = csv.writer(fout)
+        header = next(reader, [])
+        writer.writerow([c[:-len(suffix)] + f"_{dialect}" if c.endswith(suffix) else c for c in header])
+        writer.writerows(reader)
+    os.replace(tmp, dst)
+
+
+#############################################
+# 프롬프트 템플릿 (빈칸을 자리표시자로 채운 원문 → fingerprint 에 포함)
+#############################################
+def translation_templates(region_name):
+    # 번역 메모리도 같은 fingerprint 로 나뉘므로, 여기가 바뀌면 다시 만든 번역도 실제로 달라진다
+    return translation.translation_templates(region_name)
+
+
+def mednli_templates(backends):
+    return [b.spec for b in backends] + list(mednli_prompts({"sentence1": "{sentence1}", "sentence2": "{sentence2}"}))
+
+
+def truthfulqa_templates(backends):
+    return [b.spec for b in backends] + list(
+        truthfulqa_prompts({"question_": "{question}", "mc1_choice": "{mc1}", "mc2_choice": "{mc2}"})
+    )
+
+
+#############################################
+# 단계 선언
+#############################################
+def pipeline_stages():
+    stages = []
+    mednli_input = os.path.join(translation.BASE_PATH, translation.MEDNLI_INPUT_FILENAME)
+    tqa_input = os.path.join(translation.BASE_PATH, translation.TRUTHFULQA_INPUT_FILENAME)
+    # 판정 모델 (EVAL_MODELS 로 여러 모델 → 평가 단계 하나가 모델별 파일을 함께 만든다)
+    mednli_backends = eval_backends(MEDNLI_MODEL, "responses")
+    tqa_backends = eval_backends(TRUTHFULQA_MODEL, "chat")
+
+    for region_name, region_en in translation.regions.items():
+        dialect = DIALECTS[region_en]
+        item = [(region_name, region_en)]
+
+        # --- MedNLI: 번역 → 평가용 파일 → 평가
+        translated = os.path.join(translation.BASE_PATH, f"mednli_{region_en}_({translation.AI_NAME_FOR_FILE}).csv")
+        staged = os.path.join(PIPELINE_DIR, f"mednli_{dialect}.csv")
+        evaluated = list(evaluated_paths(staged, mednli_backends).values())
+        stages.append(Stage(
+            f"translate:mednli:{dialect}",
+            lambda item=item: translation.translate_mednli(mednli_input, item),
+            inputs=[mednli_input], outputs=[translated],
+            templates=translation_templates(region_name),
+        ))
+        stages.append(Stage(
+            f"stage:mednli:{dialect}",
+            lambda src=translated, dst=staged, r=region_en, d=dialect: rename_region_columns(src, dst, r, d),
+            inputs=[translated], outputs=[staged],
+        ))
+        stages.append(Stage(
+            f"eval:mednli:{dialect}",
+            lambda src=staged: evaluate_mednli_with_logging(src, log_path=os.path.join(PIPELINE_DIR, "mednli_calls.jsonl"),
+                                                            backends=mednli_backends),
+            inputs=[staged], outputs=evaluated,
+            templates=mednli_templates(mednli_backends),
+        ))
+
+        # --- TruthfulQA: 번역 → 평가용 파일 → 평가 → summary
+        translated = os.path.join(translation.BASE_PATH, f"truthfulqa_{region_en}_({translation.AI_NAME_FOR_FILE}).csv")
+        staged = os.path.join(PIPELINE_DIR, f"truthfulqa_{dialect}.csv")
+        evaluated = list(evaluated_paths(staged, tqa_backends).values())
+        stages.append(Stage(
+            f"translate:truthfulqa:{dialect}",
+            lambda item=item: translation.translate_truthfulqa(tqa_input, item),
+            inputs=[tqa_input], outputs=[translated],
+            templates=translation_templates(region_name),
+        ))
+        stages.append(Stage(
+            f"stage:truthfulqa:{dialect}",
+            lambda src=translated, dst=staged, r=region_en, d=dialect: rename_region_columns(src, dst, r, d),
+            inputs=[translated], outputs=[staged],
+        ))
+        stages.append(Stage(
+            f"eval:truthfulqa:{dialect}",
+            lambda src=staged: evaluate_truthfulqa(src, backends=tqa_backends),
+            inputs=[staged], outputs=evaluated,
+            templates=truthfulqa_templates(tqa_backends),
+        ))
+        for backend, src in zip(tqa_backends, evaluated):
+            if len(tqa_backends) == 1:
+                name, summary = f"summary:truthfulqa:{dialect}", os.path.join(PIPELINE_DIR, f"summary_{dialect}.txt")
+            else:
+                name = f"summary:truthfulqa:{backend.tag}:{dialect}"
+                summary = os.path.join(PIPELINE_DIR, f"summary_{dialect}_{backend.tag}.txt")
+            stages.append(Stage(
+                name,
+                lambda src=src, dst=summary: write_summary(src, dst),
+                inputs=[src], outputs=[summary],
+            ))
+    return stages
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    dry_run = "--dry-run" in args
+    force = "--force" in args
+    targets = [a for a in args if not a.startswith("--")]
+
+    result = build(
+        pipeline_stages(),
+        targets=targets or None,
+        state_path=os.path.join(PIPELINE_DIR, "build_state.json"),
+        force=force,
+        dry_run=dry_run,
+    )
+    if not dry_run:
+        print(perf_summary())
+    if result["failed"]:
+        sys.exit(1)
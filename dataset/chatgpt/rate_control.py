@@ -0,0 +1,272 @@
+import math
+import os
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import openai
+from perf_stats import get_stats
+
+# 프로세스 전체 분당 요청 수 / 토큰 수 상한 (0 이면 응답의 x-ratelimit-limit-* 헤더를 따른다)
+RATE_LIMIT_RPM = float(os.environ.get("RATE_LIMIT_RPM", "0"))
+RATE_LIMIT_TPM = float(os.environ.get("RATE_LIMIT_TPM", "0"))
+# 버킷이 한 번에 내줄 수 있는 양 = 이 초 만큼의 분량 (1분 전체를 한꺼번에 쓰지 않도록)
+BUCKET_BURST_SECONDS = 10
+# 동시에 날아가 있는 API 요청 수 상한 (AIMD 가 이 안에서 움직인다)
+MAX_CONCURRENCY = int(os.environ.get("MAX_CONCURRENCY", "8"))
+# 성공할 때마다 limit += AIMD_INCREASE / limit (한 바퀴에 +1), 429/timeout 이면 limit *= AIMD_DECREASE
+AIMD_INCREASE = 1.0
+AIMD_DECREASE = 0.5
+# 재시도: 최대 횟수 / 지수 백오프 (full jitter)
+RATE_MAX_RETRIES = int(os.environ.get("RATE_MAX_RETRIES", "8"))
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+# 토큰 버킷용 출력 토큰 추정치 (실제 usage 를 받으면 차이를 정산)
+EXPECTED_OUTPUT_TOKENS = 256
+
+
+def estimate_tokens(*texts):
+    """요청 토큰 수 추정 (한글 섞인 문장 ≈ 글자 3개당 1토큰) + 예상 출력"""
+    return sum(len(t or "") for t in texts) // 3 + EXPECTED_OUTPUT_TOKENS
+
+
+def _duration(value):
+    """'1s' / '6m0s' / '120ms' / '1h2m3.5s' / '2.5' → 초 (inf / nan / 넘치는 값은 None)"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        parts = re.findall(r"(\d+(?:\.\d*)?|\.\d+)(ms|h|m|s)", value)
+        if not parts:
+            return None
+        scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+        seconds = sum(float(n) * scale[unit] for n, unit in parts)
+    return seconds if math.isfinite(seconds) else None
+
+
+def _number(value):
+    """한도 / 남은 양 헤더 → float. 비었거나 숫자가 아니면 None (프록시 / 로컬 서버가 이상한 값을 줘도 호출은 성공)"""
+    if value is None:
+        return None
+    try:
+        number = float(str(value).strip())
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def retry_after(headers):
+    """retry-after-ms / retry-after (초 또는 HTTP 날짜) → 초 (0 ~ BACKOFF_MAX 로 자름, 읽을 수 없으면 None)"""
+    if not headers:
+        return None
+    ms = _number(headers.get("retry-after-ms"))
+    if ms is not None:
+        return min(max(0.0, ms / 1000), BACKOFF_MAX)
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    seconds = _duration(value)
+    if seconds is None:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, OverflowError):
+            return None
+    return min(max(0.0, seconds), BACKOFF_MAX)
+
+
+def _classify(error):
+    """재시도 여부: "throttle" (429/timeout → 동시 실행 수 감소) / "retry" / None (바로 실패)"""
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError)):
+        return "throttle"
+    if isinstance(error, openai.APIConnectionError):
+        return "retry"
+    # 다른 SDK (anthropic: status_code, google-genai: code) 는 상태 코드 / 예외 이름으로 판단
+    status = getattr(error, "status_code", None)
+    if not isinstance(status, int):
+        status = getattr(error, "code", None)
+    if status == 429 or "Timeout" in type(error).__name__:
+        return "throttle"
+    if "Connection" in type(error).__name__:
+        return "retry"
+    if status in (408, 409) or (isinstance(status, int) and status >= 500):
+        return "retry"
+    return None
+
+
+#############################################
+# 토큰 버킷 (예약 방식: 먼저 빼고, 모자란 만큼 기다릴 시간을 돌려준다)
+#############################################
+class TokenBucket:
+    def __init__(self, per_minute=0):
+        self._lock = threading.Lock()
+        self.level = 0.0
+        self.set_rate(per_minute)
+
+    def set_rate(self, per_minute):
+        with self._lock:
+            self.per_minute = per_minute or 0
+            self.rate = self.per_minute / 60.0
+            self.capacity = self.rate * BUCKET_BURST_SECONDS
+            self.level = self.capacity
+            self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.level -= amount
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def settle(self, delta):
+        """추정치와 실제 사용량의 차이 (양수면 더 쓴 것)"""
+        if not self.rate or not delta:
+            return
+        with self._lock:
+            self.level -= delta
+
+
+#############################################
+# 공용 속도 제어기
+#   - 요청/토큰 버킷으로 분당 한도 안에서 보냄
+#   - 동시 요청 수는 AIMD: 성공하면 조금씩 늘리고, 429/timeout 이면 절반으로
+#     (같은 혼잡 구간에서 온 429 여러 개는 한 번만 줄인다)
+#   - retry-after / x-ratelimit-* 헤더가 있으면 모든 스레드가 그 시각까지 대기
+#############################################
+class RateController:
+    def __init__(self, rpm=RATE_LIMIT_RPM, tpm=RATE_LIMIT_TPM, max_concurrency=MAX_CONCURRENCY,
+                 max_retries=RATE_MAX_RETRIES):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._fixed_rpm = bool(rpm)
+        self._fixed_tpm = bool(tpm)
+        self.max_limit = max(1, int(max_concurrency))
+        self.limit = float(self.max_limit)
+        self.max_retries = max_retries
+        self.inflight = 0
+        self.pause_until = 0.0
+        self._epoch = 0
+        self._cond = threading.Condition()
+
+    def configure(self, rpm=None, max_concurrency=None):
+        if rpm:
+            self.requests.set_rate(rpm)
+            self._fixed_rpm = True
+        if max_concurrency:
+            with self._cond:
+                self.max_limit = max(1, int(max_concurrency))
+                self.limit = min(self.limit, self.max_limit)
+                self._cond.notify_all()
+
+    # ---------- 동시 실행 슬롯 ----------
+    def _acquire(self):
+        with self._cond:
+            while True:
+                wait = self.pause_until - time.monotonic()
+                if wait <= 0 and self.inflight < int(self.limit):
+                    self.inflight += 1
+                    return self._epoch
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def _release(self):
+        with self._cond:
+            self.inflight -= 1
+            self._cond.notify()
+
+    def _pause(self, seconds):
+        with self._cond:
+            self.pause_until = max(self.pause_until, time.monotonic() + seconds)
+
+    def _increase(self):
+        with self._cond:
+            if self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + AIMD_INCREASE / self.limit)
+                self._cond.notify()
+
+    def _decrease(self, epoch):
+        with self._cond:
+            if epoch == self._epoch:
+                self.limit = max(1.0, self.limit * AIMD_DECREASE)
+                self._epoch += 1
+
+    # ---------- 헤더 ----------
+    def _observe_headers(self, headers):
+        if not headers:
+            return
+        limit = _number(headers.get("x-ratelimit-limit-requests"))
+        if limit and limit > 0 and not self._fixed_rpm:
+            self.requests.set_rate(limit)
+            self._fixed_rpm = True
+        limit = _number(headers.get("x-ratelimit-limit-tokens"))
+        if limit and limit > 0 and not self._fixed_tpm:
+            self.tokens.set_rate(limit)
+            self._fixed_tpm = True
+        for kind in ("requests", "tokens"):
+            remaining = _number(headers.get(f"x-ratelimit-remaining-{kind}"))
+            if remaining is not None and remaining <= 0:
+                reset = _duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    self._pause(reset)
+
+    # ---------- 호출 ----------
+    def call(self, fn, tokens=0, info=None):
+        """fn() 을 한도 안에서 실행하고 재시도 가능한 오류는 백오프 후 다시 시도.
+        fn 의 반환값에 .headers 가 있으면 한도 헤더를 읽는다. info 에는 재시도 횟수를 남긴다."""
+        stats = get_stats()
+        attempt = 0
+        while True:
+            epoch = self._acquire()
+            try:
+                wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+                if wait > 0:
+                    stats.observe_sleep(wait, "rate_bucket")
+                    time.sleep(wait)
+                result = fn()
+            except Exception as e:
+                kind = _classify(e)
+                if kind is None or attempt >= self.max_retries:
+                    raise
+                response = getattr(e, "response", None)
+                headers = getattr(response, "headers", None)
+                after = retry_after(headers)
+                if kind == "throttle":
+                    self._decrease(epoch)
+                if after:
+                    self._pause(after)
+                delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+                delay = max(delay, after or 0.0)
+                attempt += 1
+                if info is not None:
+                    info["retries"] = attempt
+                stats.observe_sleep(delay, f"retry_{kind}")
+            else:
+                self._increase()
+                self._observe_headers(getattr(result, "headers", None))
+                return result
+            finally:
+                self._release()
+            time.sleep(delay)
+
+    def settle_tokens(self, estimated, actual):
+        if actual is not None:
+            self.tokens.settle(actual - estimated)
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_controller():
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = RateController()
+        return _controller
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# 캐시 파일 위치 / 용량 / 보관 기간 (환경변수로 덮어쓰기 가능)
+CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "llm_response_cache.sqlite")
+CACHE_MAX_MB = float(os.environ.get("LLM_CACHE_MAX_MB", "512"))
+CACHE_MAX_AGE_DAYS = float(os.environ.get("LLM_CACHE_MAX_AGE_DAYS", "90"))
+CACHE_ENABLED = os.environ.get("LLM_CACHE", "1") != "0"
+
+
+def make_key(api, model, system, user, temperature=None, top_p=None, **params):
+    """요청 내용(모델, 프롬프트, 샘플링 파라미터)만으로 결정되는 캐시 키"""
+    payload = {
+        "api": api,
+        "model": model,
+        "system": system,
+        "user": user,
+        "temperature": temperature,
+        "top_p": top_p,
+    }
+    payload.update(params)
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+#############################################
+# SQLite 기반 응답 캐시
+#############################################
+class ResponseCache:
+    # put 이 이만큼 쌓일 때마다 eviction 수행
+    EVICT_EVERY = 200
+
+    def __init__(self, path=CACHE_PATH, max_mb=CACHE_MAX_MB, max_age_days=CACHE_MAX_AGE_DAYS):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        conn.commit()
+        self.evict()
+
+    def _conn(self):
+        # sqlite3 연결은 스레드 간 공유 불가 → 스레드마다 하나씩
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            # WAL: 여러 프로세스가 동시에 읽고 한 번에 하나씩 쓸 수 있음
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > self.max_age:
+            with self._lock:
+                self.misses += 1
+            return None
+        conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        conn.commit()
+        with self._lock:
+            self.hits += 1
+        return row[0]
+
+    def put(self, key, response, model=None):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, accessed_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, response, len(response.encode("utf-8")), now, now),
+        )
+        conn.commit()
+        with self._lock:
+            self._puts += 1
+            due = self._puts % self.EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """보관 기간이 지난 항목을 지우고, 용량 초과분은 오래 안 쓰인 순으로 지운다"""
+        conn = self._conn()
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            freed = 0
+            doomed = []
+            for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+                doomed.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        conn.commit()
+
+    def get_or_call(self, key, call, model=None):
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        response = call()
+        # 빈 응답은 실패와 구분이 안 되므로 저장하지 않음
+        if response:
+            self.put(key, response, model=model)
+        return response
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"💾 응답 캐시: hit {self.hits} / miss {self.misses} ({rate:.1f}%)"
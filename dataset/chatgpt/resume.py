@@ -0,0 +1,391 @@
+import csv
+import glob
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from rate_control import MAX_CONCURRENCY
+from perf_stats import current_labels, scope
+
+# 기본값: 중단된 실행(.partial)이 있으면 이어서 진행
+RESUME = os.environ.get("RESUME", "1") != "0"
+# 1 이면 이전 최종 결과(<output>)와 행 단위로 비교해 입력 / 프롬프트가 바뀐 행만 다시 평가
+#   판정이 바뀐 행은 <output 이름>_flips.csv 로 보고
+DIFF_MODE = os.environ.get("DIFF_MODE", "0") == "1"
+
+KEY_COLUMN = "_row_key"
+
+
+def row_key(row, key_fields, fingerprint=""):
+    """입력 행 내용(+ 프롬프트 fingerprint)만으로 결정되는 안정적인 해시 (행 번호와 무관)"""
+    values = [str(row.get(f, "") if row.get(f) is not None else "") for f in key_fields]
+    if fingerprint:
+        values.append(fingerprint)
+    raw = json.dumps(values, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def prompt_fingerprint(*parts):
+    """모델 / 프롬프트 등 → 짧은 해시. 행 해시에 섞으면 프롬프트가 바뀐 행은 이어쓰기 / diff 에서 다시 평가된다."""
+    raw = json.dumps([str(p) for p in parts], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class _Carried:
+    def __init__(self, row):
+        self.row = row
+
+
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+
+class IncompleteOutput(RuntimeError):
+    """재시도 후에도 실패한 행이 있어 최종 파일을 만들지 않음 (.partial 은 남아 다음 실행에서 이어감)"""
+
+
+class LeaseLost(IncompleteOutput):
+    """최종 파일로 올리기 직전에 lease 가 다른 worker 에게 넘어가 있음 → 올리지 않고 이 시도의 .partial 도 버림"""
+
+
+#############################################
+# 이어쓰기 가능한 출력 파일
+#   - 진행 중에는 <output>.partial 에만 쓴다 (첫 컬럼 = 행 해시)
+#   - finalize() 에서 해시 컬럼을 떼고 <output> 으로 원자적 교체, 해시는 <output>.keys 에 한 줄씩
+#   - diff 모드: 이전 <output> 을 <output>.before 로 옮겨 두고, 해시가 같은 행은 그대로 재사용
+#     (fingerprint(row) 가 해시에 섞이므로 입력 / 프롬프트 / 모델 중 하나라도 바뀐 행만 다시 평가)
+#   - lease (shard worker): 시도마다 따로 <output>.<owner>.partial 에 쓰고, 다른 시도의 .partial 은 읽기만 (이어쓰기)
+#     finalize() 는 lease.held() 로 아직 lease 를 가졌는지 확인한 뒤에만 최종 파일로 올린다
+#############################################
+class ResumableOutput:
+    def __init__(self, output_file, fieldnames, key_fields, resume=RESUME, fingerprint=None, diff=DIFF_MODE,
+                 verdict=None, lease=None):
+        self.output_file = output_file
+        # lease: .owner (이 시도의 이름) / .held() (지금도 lease 를 가졌는지, 확인하면서 연장)
+        self.lease = lease
+        self._base = output_file if lease is None else f"{output_file}.{lease.owner}"
+        self.partial_file = self._base + ".partial"
+        self.prev_file = self._base + ".partial.prev"
+        self.keys_file = output_file + ".keys"
+        self.before_file = output_file + ".before"
+        self.fieldnames = list(fieldnames)
+        self.key_fields = list(key_fields)
+        self.resume = resume
+        # fingerprint(row) → 행의 프롬프트 / 모델 해시 (None 이면 입력 내용만으로 해시)
+        self.fingerprint = fingerprint
+        self.diff = diff
+        # verdict(row) → 판정 문자열 (diff 모드의 판정 변화 보고용)
+        self.verdict = verdict
+        # 완료된 행 인덱스: 행 해시 → .prev 파일 안의 위치 (행 내용은 디스크에 두고 필요할 때 읽음)
+        self.done = {}
+        self.carried = 0
+        self.failed = 0
+        self._f = None
+        self._writer = None
+        self._prev = None
+        self._prev_lock = threading.Lock()
+
+    def key(self, row):
+        return row_key(row, self.key_fields, self.fingerprint(row) if self.fingerprint else "")
+
+    def _iter_completed(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames != [KEY_COLUMN] + self.fieldnames:
+                print(f"⚠ {path} 컬럼 구성이 달라 이어쓰기에 사용하지 않음")
+                return
+            for row in reader:
+                # 쓰다 만 마지막 줄은 버림
+                if None in row or None in row.values():
+                    continue
+                yield row
+
+    def _sibling_partials(self):
+        """같은 출력의 다른 lease 시도가 남긴 .partial / .prev (멈췄거나 죽은 worker 것, 읽기만 한다)"""
+        if self.lease is None:
+            return []
+        pattern = glob.escape(self.output_file) + ".*.partial"
+        return [path for partial in sorted(glob.glob(pattern)) if partial != self.partial_file
+                for path in (partial + ".prev", partial)]
+
+    def _stash_before(self):
+        """diff 모드: 이전 최종 결과를 .before 로 옮긴다 (중단 후 다시 실행하면 남아 있는 .before 를 그대로 사용)"""
+        if os.path.exists(self.output_file):
+            if os.path.exists(self.keys_file):
+                os.replace(self.keys_file, self.before_file + ".keys")
+            elif os.path.exists(self.before_file + ".keys"):
+                os.remove(self.before_file + ".keys")
+            os.replace(self.output_file, self.before_file)
+        return self.before_file if os.path.exists(self.before_file) else None
+
+    def _iter_before(self, path):
+        """이전 최종 결과 → (행 해시, 행). 해시는 그 결과를 만들 때의 .keys (입력 + 당시 프롬프트 기준)"""
+        keys = None
+        if os.path.exists(path + ".keys"):
+            keys = open(path + ".keys", encoding="utf-8")
+        else:
+            print(f"⚠ {path}.keys 없음 (예전 형식) → 프롬프트는 그대로라고 보고 입력이 바뀐 행만 다시 평가")
+        try:
+            with open(path, encoding="utf-8-sig", newline="") as f:
+                reader = csv.DictReader(f)
+                missing = [c for c in self.key_fields if c not in (reader.fieldnames or [])]
+                if missing:
+                    print(f"⚠ {path} 에 입력 컬럼 {missing} 이 없어 diff 에 사용하지 않음")
+                    return
+                for row in reader:
+                    key = keys.readline().strip() if keys is not None else self.key(row)
+                    if not key:
+                        return
+                    yield key, row
+        finally:
+            if keys is not None:
+                keys.close()
+
+    def open(self):
+        if not self.resume:
+            for path in (self.prev_file, self.partial_file):
+                if os.path.exists(path):
+                    os.remove(path)
+        before = self._stash_before() if self.diff else None
+
+        if self.resume or before:
+            # 지금까지 끝난 행(+ diff 모드면 이전 결과)을 .prev 로 스트리밍 병합하고, 메모리에는 해시 → 위치만 남긴다
+            tmp = self.prev_file + ".tmp"
+            reused = 0
+            with open(tmp, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow([KEY_COLUMN] + self.fieldnames)
+                sources = [self.prev_file, self.partial_file] + self._sibling_partials() if self.resume else []
+                completed = ((row[KEY_COLUMN], row) for path in sources for row in self._iter_completed(path))
+                for source, rows in (("resume", completed), ("before", self._iter_before(before) if before else ())):
+                    for key, row in rows:
+                        if key in self.done:
+                            continue
+                        f.flush()
+                        self.done[key] = f.tell()
+                        writer.writerow([key] + [row.get(c) or "" for c in self.fieldnames])
+                        reused += source == "before"
+            if self.done:
+                os.replace(tmp, self.prev_file)
+                self._prev = open(self.prev_file, encoding="utf-8", newline="")
+                if len(self.done) > reused:
+                    print(f"↩ 이어쓰기: 완료된 {len(self.done) - reused}행 재사용 ({self.partial_file})")
+                if before:
+                    print(f"🔍 diff: 이전 결과에서 바뀌지 않은 {reused}행 재사용 ({before})")
+            else:
+                os.remove(tmp)
+
+        self._f = open(self.partial_file, "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._f, fieldnames=[KEY_COLUMN] + self.fieldnames)
+        self._writer.writeheader()
+        self._f.flush()
+        return self
+
+    def lookup(self, row):
+        offset = self.done.get(self.key(row))
+        if offset is None:
+            return None
+        # 여러 worker 스레드가 동시에 부를 수 있으므로 seek + read 를 묶어서
+        with self._prev_lock:
+            self._prev.seek(offset)
+            values = next(csv.reader(self._prev))
+        return dict(zip(self.fieldnames, values[1:]))
+
+    def write(self, row, key):
+        self._writer.writerow({KEY_COLUMN: key, **row})
+        self._f.flush()
+
+    def wrap(self, worker, build_row, on_carried=None):
+        """run_ordered 용 (worker, on_result) 쌍을 만든다.
+        이미 끝난 행은 API 호출 없이 그대로 옮겨 쓰고, 나머지는 build_row 가 만든 행을 쓴다.
+        worker 가 예외를 던진 행은 쓰지 않는다 (ERROR/UNKNOWN 으로 채우지 않고 다음 실행에서 다시 시도)."""
+        def _worker(row):
+            done = self.lookup(row)
+            if done is not None:
+                return _Carried(done)
+            try:
+                return worker(row)
+            except Exception as e:
+                return _Failed(e)
+
+        def _on_result(idx, row, result):
+            key = self.key(row)
+            if isinstance(result, _Carried):
+                self.write(result.row, key)
+                self.carried += 1
+                if on_carried is not None:
+                    on_carried(idx, result.row)
+                return
+            if isinstance(result, _Failed):
+                self.failed += 1
+                print(f"⚠ {idx + 1}행 실패 → 기록하지 않음 (다음 실행에서 다시 시도): {result.error!r}")
+                return
+            out_row = build_row(idx, row, result)
+            if out_row is not None:
+                self.write(out_row, key)
+
+        return _worker, _on_result
+
+    def close(self):
+        if self._f is not None and not self._f.closed:
+            self._f.close()
+        if self._prev is not None and not self._prev.closed:
+            self._prev.close()
+
+    def finalize(self):
+        """.partial → 최종 CSV 로 원자적 교체. 이 시점 전에는 최종 파일이 생기지 않는다.
+        실패한 행이 있으면 교체하지 않고 IncompleteOutput 을 던진다."""
+        self.close()
+        if self.failed:
+            raise IncompleteOutput(
+                f"{self.output_file}: {self.failed}행 실패 — {self.partial_file} 을 남겨 두었으니 다시 실행하면 이어서 처리"
+            )
+        tmp = self._base + ".tmp"
+        keys_tmp = self._base + ".keys.tmp"
+        with open(self.partial_file, encoding="utf-8", newline="") as f_in, \
+             open(tmp, "w", encoding="utf-8", newline="") as f_out, \
+             open(keys_tmp, "w", encoding="utf-8") as f_keys:
+            reader = csv.DictReader(f_in)
+            writer = csv.DictWriter(f_out, fieldnames=self.fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            for row in reader:
+                writer.writerow(row)
+                f_keys.write(row[KEY_COLUMN] + "\n")
+            f_out.flush()
+            os.fsync(f_out.fileno())
+        if self.lease is not None and not self.lease.held():
+            # 멈춰 있던 사이 다른 worker 가 이 shard 를 가져감 → 그쪽 결과만 최종 파일이 되어야 한다
+            for path in (tmp, keys_tmp, self.partial_file, self.prev_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise LeaseLost(f"{self.output_file}: lease 를 잃어 최종 파일로 올리지 않음 ({self.lease.owner})")
+        # .keys 는 결과 파일과 짝이 맞아야 하므로 먼저 지우고 마지막에 교체 (중간에 죽으면 .keys 없음 → 예전 형식 취급)
+        if os.path.exists(self.keys_file):
+            os.remove(self.keys_file)
+        os.replace(tmp, self.output_file)
+        os.replace(keys_tmp, self.keys_file)
+        for path in (self.partial_file, self.prev_file):
+            if os.path.exists(path):
+                os.remove(path)
+        if self.diff and os.path.exists(self.before_file):
+            self.report_flips(self.before_file)
+            for path in (self.before_file, self.before_file + ".keys"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def report_flips(self, before):
+        """이전 결과와 판정이 달라진 행 → <output 이름>_flips.csv.
+        이전 행은 입력이 같은 행(→ 프롬프트 / 모델 변경), 없으면 같은 위치의 행(→ 입력 수정)과 짝짓는다."""
+        if self.verdict is None:
+            return None
+        by_input, by_pos = {}, []
+        with open(before, encoding="utf-8-sig", newline="") as f:
+            for i, row in enumerate(csv.DictReader(f)):
+                verdict = self.verdict(row)
+                by_pos.append(verdict)
+                by_input.setdefault(row_key(row, self.key_fields), (i, verdict))
+
+        flips_file = self.output_file[:-len(".csv")] + "_flips.csv" if self.output_file.endswith(".csv") \
+            else self.output_file + ".flips.csv"
+        flips, rows = 0, 0
+        with open(self.output_file, encoding="utf-8", newline="") as f_in, \
+             open(flips_file, "w", encoding="utf-8-sig", newline="") as f_out:
+            writer = csv.writer(f_out)
+            writer.writerow(["row", "before_row", "reason", "before", "after", "preview"])
+            for i, row in enumerate(csv.DictReader(f_in)):
+                rows += 1
+                after = self.verdict(row)
+                match = by_input.get(row_key(row, self.key_fields))
+                if match is not None:
+                    reason, (j, verdict) = "prompt", match
+                elif i < len(by_pos):
+                    reason, j, verdict = "input", i, by_pos[i]
+                else:
+                    continue
+                if verdict != after:
+                    flips += 1
+                    # 방언 컬럼 이름은 그대로 쓰지 않는다 (manifest 가 이 파일을 평가 입력으로 오인하지 않도록)
+                    preview = max((str(row.get(c) or "") for c in self.key_fields), key=len, default="")[:80]
+                    writer.writerow([i + 1, j + 1, reason, verdict, after, preview])
+        print(f"🔁 diff: 판정이 바뀐 행 {flips}개 → {flips_file} (다시 평가 {rows - self.carried}행 / 재사용 {self.carried}행)")
+        return flips_file
+
+    def __enter__(self):
+        if self._f is None:
+            self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 예외로 끝나면 finalize 하지 않음 → .partial 이 남아 다음 실행에서 이어감
+        self.close()
+        return False
+
+
+#############################################
+# 다중 모델 fan-out: 입력 한 번 읽고, 행마다 모델 여럿을 동시에 호출해 모델별 출력 파일에 기록
+#############################################
+_fanout_pool = None
+_fanout_lock = threading.Lock()
+
+
+def _pool():
+    global _fanout_pool
+    with _fanout_lock:
+        if _fanout_pool is None:
+            _fanout_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY * 4, thread_name_prefix="fanout")
+        return _fanout_pool
+
+
+def fan_out(outputs, worker, build_row, on_carried=None):
+    """outputs: {tag: ResumableOutput}. worker(tag, row) / build_row(tag, idx, row, result).
+    ResumableOutput.wrap 과 같은 (worker, on_result) 쌍을 돌려준다. 모델마다 이어쓰기 / 실패 처리는 따로."""
+    wrapped = {
+        tag: out.wrap(
+            lambda row, tag=tag: worker(tag, row),
+            lambda idx, row, result, tag=tag: build_row(tag, idx, row, result),
+            on_carried,
+        )
+        for tag, out in outputs.items()
+    }
+    if len(wrapped) == 1:
+        return next(iter(wrapped.values()))
+
+    def _scoped(labels, tag, w, row):
+        # 계측은 모델별로 (task:tag, dialect)
+        with scope(f"{labels[0]}:{tag}", labels[1]):
+            return w(row)
+
+    def _worker(row):
+        # 호출한 스레드는 기다리기만 하므로 모델 수만큼 동시에 날아간다 (실제 동시 요청 수는 rate_control 이 제한)
+        labels = current_labels()
+        futures = {tag: _pool().submit(_scoped, labels, tag, w, row) for tag, (w, _) in wrapped.items()}
+        return {tag: future.result() for tag, future in futures.items()}
+
+    def _on_result(idx, row, results):
+        for tag, (_, on_result) in wrapped.items():
+            # build_row 가 row 를 고치므로 모델마다 사본 (행 해시도 원본 기준)
+            on_result(idx, dict(row), results[tag])
+
+    return _worker, _on_result
+
+
+def finalize_all(outputs):
+    """모델별 출력을 모두 finalize. 실패한 파일이 있어도 나머지는 마저 처리하고 첫 예외를 다시 던진다."""
+    error = None
+    for out in outputs.values():
+        try:
+            out.finalize()
+        except IncompleteOutput as e:
+            print(f"⚠ {e}")
+            error = error or e
+    if error is not None:
+        raise error
+
+
+def close_all(outputs):
+    for out in outputs.values():
+        out.close()
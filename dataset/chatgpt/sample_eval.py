@@ -0,0 +1,226 @@
+import csv
+import math
+import os
+import random
+import sys
+from collections import Counter
+from statistics import NormalDist
+from async_engine import Job, run_jobs, MAX_CONCURRENCY
+from backends import get_backend, concurrency_for
+from call_journal import get_journal
+from csv_stream import iter_rows
+from llm_call import cache_summary
+from manifest import resolve, discover, DIALECTS
+from metrics import CONFIDENCE, OUTCOMES
+from perf_stats import perf_summary
+from Mednli_eval_Hallucination import (
+    MEDNLI_MODEL, MEDNLI_LABELS, MEDNLI_USER_TEMPLATE, call_gpt_and_log, judge_mednli, mednli_prompts, mednli_sentences,
+)
+
+# 프롬프트를 고치는 동안 전체 대신 (방언 × gold_label) 층별 표본으로 환각 / 모름 비율을 빠르게 추정
+# 사용: python sample_eval.py                     # 현재 폴더의 MedNLI 방언 파일 전부
+#       SAMPLE_CI_WIDTH=0.05 python sample_eval.py mednli_Jeju.csv mednli_Jeolla.csv
+
+# 층마다 목표 비율의 신뢰구간 폭이 이 값 이하가 되면 그 층은 멈춘다
+SAMPLE_CI_WIDTH = float(os.environ.get("SAMPLE_CI_WIDTH", "0.1"))
+# 목표 비율 (metrics 의 outcome 이름: wrong = 환각, unknown = 모름, correct = 정답)
+SAMPLE_TARGETS = [t.strip() for t in os.environ.get("SAMPLE_TARGETS", "wrong,unknown").split(",") if t.strip()]
+# 첫 wave 의 층별 표본 수 / 다음 wave 마다 누적 표본 수를 몇 배로
+SAMPLE_FIRST_WAVE = int(os.environ.get("SAMPLE_FIRST_WAVE", "20"))
+SAMPLE_GROWTH = float(os.environ.get("SAMPLE_GROWTH", "2"))
+SAMPLE_SEED = int(os.environ.get("SAMPLE_SEED", "0"))
+# 표본 평가 모델 (기본은 MedNLI 평가와 같은 모델 → 응답 캐시를 그대로 공유)
+SAMPLE_MODEL = os.environ.get("SAMPLE_MODEL", MEDNLI_MODEL)
+
+Z = NormalDist().inv_cdf(0.5 + CONFIDENCE / 2)
+
+
+def wilson(k, n, population):
+    """비율의 Wilson 구간 + 유한 모집단 보정 (층을 다 보면 폭 0) → (추정치, 하한, 상한)"""
+    if n == 0:
+        return float("nan"), 0.0, 1.0
+    p = k / n
+    denom = 1 + Z * Z / n
+    center = (p + Z * Z / (2 * n)) / denom
+    half = Z * math.sqrt(p * (1 - p) / n + Z * Z / (4 * n * n)) / denom
+    fpc = math.sqrt((population - n) / (population - 1)) if population > 1 else 0.0
+    # 보정 계수만큼 구간을 줄이고 중심도 p 쪽으로 (다 보면 [p, p])
+    center = p + (center - p) * fpc
+    half *= fpc
+    return p, max(0.0, center - half), min(1.0, center + half)
+
+
+#############################################
+# 층: (방언, gold_label) 하나
+#############################################
+class Stratum:
+    def __init__(self, dialect, gold, rows, seed, get=None):
+        self.dialect = dialect
+        self.gold = gold
+        # manifest 의 (sentence1, sentence2) accessor
+        self.get = get
+        self.rows = list(rows)
+        # 층마다 고정된 무작위 순서 → 같은 seed 면 같은 표본 (응답 캐시 재사용)
+        random.Random(f"{seed}:{dialect}:{gold}").shuffle(self.rows)
+        self.population = len(self.rows)
+        self.taken = 0
+        self.counts = Counter()
+        self.failed = 0
+        self.status = None
+
+    @property
+    def n(self):
+        return sum(self.counts.values())
+
+    def take(self, upto):
+        """누적 upto 행이 되도록 다음 행들을 꺼낸다"""
+        upto = min(upto, self.population)
+        rows = self.rows[self.taken:upto]
+        self.taken = max(self.taken, upto)
+        return rows
+
+    def interval(self, outcome):
+        return wilson(self.counts[outcome], self.n, self.population)
+
+    def check(self, width, targets):
+        if self.taken >= self.population:
+            self.status = "전수"
+        elif self.n and all(high - low <= width for _, low, high in map(self.interval, targets)):
+            self.status = "수렴"
+        return self.status is not None
+
+
+def build_strata(files, seed=SAMPLE_SEED):
+    strata = []
+    for path in files:
+        info = resolve(path)
+        get = info.getter("sentence1", "sentence2")
+        by_gold = {}
+        for row in iter_rows(path, info.encoding):
+            gold = (row.get("gold_label") or "").strip().lower()
+            by_gold.setdefault(gold, []).append(row)
+        for gold in sorted(by_gold):
+            strata.append(Stratum(info.dialect, gold, by_gold[gold], seed, get))
+    return strata
+
+
+def stratified(strata, outcome):
+    """방언 하나의 층별 추정을 층 크기로 가중 합산 → (추정치, 하한, 상한) (정규 근사)"""
+    total = sum(s.population for s in strata)
+    estimate, var = 0.0, 0.0
+    for s in strata:
+        if not s.n:
+            continue
+        w = s.population / total
+        p = s.counts[outcome] / s.n
+        fpc = (s.population - s.n) / (s.population - 1) if s.population > 1 else 0.0
+        estimate += w * p
+        var += w * w * p * (1 - p) / s.n * fpc
+    half = Z * math.sqrt(var)
+    return estimate, max(0.0, estimate - half), min(1.0, estimate + half)
+
+
+#############################################
+# wave 단위 실행: 아직 안 멈춘 층에서 다음 표본을 뽑아 방언별 Job 으로 함께 평가
+#############################################
+def run_sampling(files, width=SAMPLE_CI_WIDTH, targets=SAMPLE_TARGETS, first_wave=SAMPLE_FIRST_WAVE,
+                 growth=SAMPLE_GROWTH, seed=SAMPLE_SEED, backend=None, max_concurrency=MAX_CONCURRENCY,
+                 log_path="mednli_sample_calls.jsonl"):
+    unknown = [t for t in targets if t not in OUTCOMES]
+    if unknown:
+        raise ValueError(f"알 수 없는 목표 {unknown} (가능: {OUTCOMES})")
+    backend = backend or get_backend(SAMPLE_MODEL, "responses")
+    journal = get_journal(log_path)
+    strata = build_strata(files, seed)
+    total = sum(s.population for s in strata)
+    print(f"🎯 층 {len(strata)}개 / 전체 {total}행 | 목표 {', '.join(targets)} 의 {CONFIDENCE:.0%} CI 폭 ≤ {width}")
+
+    def evaluate(item):
+        stratum, row = item
+        s1, s2 = mednli_sentences(row, stratum.get)
+        system, user = mednli_prompts(row, stratum.get)
+        try:
+            raw = call_gpt_and_log(system, user, journal, {"s1": s1, "s2": s2}, MEDNLI_USER_TEMPLATE,
+                                   backend=backend, choices=MEDNLI_LABELS)
+        except Exception:
+            # 실패한 행은 표본에서 빠질 뿐 (추정은 평가된 행만으로)
+            return None
+        return judge_mednli(raw, stratum.gold)[1]
+
+    def record(idx, item, result):
+        stratum = item[0]
+        if result is None:
+            stratum.failed += 1
+        else:
+            stratum.counts[{"True": "correct", "Unknown": "unknown"}.get(result, "wrong")] += 1
+
+    wave, upto = 0, first_wave
+    while True:
+        active = [s for s in strata if s.status is None]
+        if not active:
+            break
+        wave += 1
+        by_dialect = {}
+        for s in active:
+            by_dialect.setdefault(s.dialect, []).extend((s, row) for row in s.take(int(upto)))
+        jobs = [
+            Job(f"wave {wave} · {dialect}", items, evaluate, record, total=len(items),
+                labels={"task": "mednli-sample", "dialect": dialect})
+            for dialect, items in by_dialect.items()
+        ]
+        run_jobs(jobs, max_concurrency=concurrency_for([backend], max_concurrency))
+        for s in active:
+            s.check(width, targets)
+        done = sum(1 for s in strata if s.status is not None)
+        print(f"🌊 wave {wave}: 층당 누적 {int(upto)}행까지 | 평가 {sum(s.n for s in strata)}행 | 멈춘 층 {done}/{len(strata)}")
+        upto *= growth
+
+    return strata
+
+
+#############################################
+# 보고서
+#############################################
+def format_report(strata, targets=SAMPLE_TARGETS):
+    names = {"wrong": "환각", "unknown": "모름", "correct": "정답"}
+    total = sum(s.population for s in strata)
+    evaluated = sum(s.n + s.failed for s in strata)
+    lines = [f"📐 MedNLI 층별 표본 추정 ({CONFIDENCE:.0%} CI)"]
+    for s in strata:
+        parts = [f"{names[t]} {p:.3f} [{low:.3f}, {high:.3f}]" for t, (p, low, high) in
+                 ((t, s.interval(t)) for t in targets)]
+        lines.append(f"   • {s.dialect:<12} {s.gold:<14} n={s.n:>4}/{s.population:<4} | " + " | ".join(parts)
+                     + f" | {s.status or '미완'}" + (f" (실패 {s.failed})" if s.failed else ""))
+    lines.append("   ─ 방언별 (층 크기 가중)")
+    for dialect in sorted({s.dialect for s in strata}, key=lambda d: (DIALECTS + [d]).index(d)):
+        group = [s for s in strata if s.dialect == dialect]
+        parts = [f"{names[t]} {p:.3f} [{low:.3f}, {high:.3f}]" for t, (p, low, high) in
+                 ((t, stratified(group, t)) for t in targets)]
+        n = sum(s.n for s in group)
+        lines.append(f"   • {dialect:<12} {'(전체)':<14} n={n:>4}/{sum(s.population for s in group):<4} | " + " | ".join(parts))
+    saved = 1 - evaluated / total if total else 0.0
+    lines.append(f"💸 API 호출 {evaluated}/{total}행 → 전체 실행 대비 {saved:.1%} 절감")
+    return "\n".join(lines)
+
+
+def write_report(strata, path="mednli_sampling_summary.csv", targets=SAMPLE_TARGETS):
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["dialect", "gold_label", "n", "population", "failed", "status"]
+                        + [f"{t}_{k}" for t in targets for k in ("rate", "low", "high")])
+        for s in strata:
+            values = [v for t in targets for v in s.interval(t)]
+            writer.writerow([s.dialect, s.gold, s.n, s.population, s.failed, s.status or ""] + values)
+    return path
+
+
+if __name__ == "__main__":
+    files = sys.argv[1:] or [
+        info.path for info in discover(["."], task="mednli", evaluated=False, dialects=DIALECTS)
+        if info.path.endswith(".csv")
+    ]
+    strata = run_sampling(files)
+    print(format_report(strata))
+    print(f"📄 {write_report(strata)}")
+    print(cache_summary())
+    print(perf_summary())
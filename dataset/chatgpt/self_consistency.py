@@ -0,0 +1,70 @@
+import os
+import threading
+from collections import Counter
+
+# 행마다 temperature 샘플을 최대 몇 개까지 뽑아 다수결할지 (1 이면 끔)
+SC_SAMPLES = int(os.environ.get("SC_SAMPLES", "1"))
+# 샘플링 temperature (gpt-5.x 는 1 만 허용)
+SC_TEMPERATURE = float(os.environ.get("SC_TEMPERATURE", "1.0"))
+
+
+def needed(counts, taken, k):
+    """1위가 확정되려면 최소 몇 개를 더 뽑아야 하나 (0 이면 확정).
+    다음 샘플이 모두 1위에 가야 가장 빨리 끝나므로 그만큼만 한 번에 요청한다."""
+    remaining = k - taken
+    ranked = [votes for _, votes in counts.most_common(2)] + [0, 0]
+    lead = ranked[0] - ranked[1]
+    if remaining <= 0 or (taken and lead > remaining):
+        # 남은 샘플을 모두 2위가 받아도 뒤집을 수 없다
+        return 0
+    return (remaining - lead) // 2 + 1
+
+
+#############################################
+# self-consistency: 행마다 최대 k 개 샘플로 다수결 (조기 종료)
+#   - 1위가 더 이상 바뀔 수 없으면 멈춘다 (k=5 면 처음 3개가 같을 때 3개로 끝)
+#   - n 을 지원하는 백엔드(chat / local)는 라운드마다 요청 한 번, 나머지는 샘플마다 요청 하나
+#   - 샘플은 번호별로 캐시되므로 다시 돌리면 같은 샘플 / 같은 다수결
+#############################################
+class SelfConsistency:
+    def __init__(self, k=SC_SAMPLES, temperature=SC_TEMPERATURE):
+        self.k = max(1, k)
+        self.temperature = temperature
+        self.rows = 0
+        self.samples = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.k > 1
+
+    @property
+    def params(self):
+        """행 해시(fingerprint) 에 섞을 설정"""
+        return ("sc", self.k, self.temperature) if self.enabled else ()
+
+    def vote(self, backend, system, user, label):
+        """label(응답) → 투표 키. → (1위, 일치율, 샘플 수, {키: 표})"""
+        counts, taken, requests = Counter(), 0, 0
+        while True:
+            n = needed(counts, taken, self.k)
+            if not n:
+                break
+            for text in backend.samples(system, user, n, temperature=self.temperature, start=taken):
+                counts[label(text)] += 1
+            taken += n
+            requests += 1 if backend.multi_sample else n
+        with self._lock:
+            self.rows += 1
+            self.samples += taken
+            self.requests += requests
+        winner, votes = counts.most_common(1)[0]
+        return winner, votes / taken, taken, dict(counts)
+
+    def summary(self):
+        with self._lock:
+            if not self.rows:
+                return f"🗳 self-consistency (k={self.k}): 기록 없음"
+            return (f"🗳 self-consistency (k={self.k}, T={self.temperature}): {self.rows}행 | "
+                    f"행당 샘플 {self.samples / self.rows:.2f} / 요청 {self.requests / self.rows:.2f}")
@@ -0,0 +1,328 @@
+import csv
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from async_engine import run_jobs, MAX_CONCURRENCY
+from backends import backends_for, eval_backends, evaluated_paths, concurrency_for, file_tag
+from csv_stream import iter_rows
+from manifest import resolve
+from perf_stats import perf_summary
+from self_consistency import SC_SAMPLES, SC_TEMPERATURE
+from work_queue import ShardQueue, SHARD_QUEUE_PATH
+import Mednli_eval_Hallucination as mednli
+import TruthfulQA_eval_Hallucination as truthfulqa
+
+# 여러 프로세스 / 호스트로 나눠 평가 (공유 폴더 + SQLite 작업 큐)
+# 사용: python shard_runner.py plan mednli_Jeju.csv truthfulqa_Jeolla.csv   # 입력을 shard 로 나눠 큐에 등록
+#       python shard_runner.py work [worker 이름]                          # 큐가 빌 때까지 shard 처리 (호스트마다 여러 개)
+#       python shard_runner.py merge                                       # 끝난 입력을 *_evaluated.csv 로 병합
+#       python shard_runner.py status
+#       python shard_runner.py run 4 mednli_Jeju.csv ...                   # plan + 로컬 worker 4개 + merge
+# worker 마다 다른 API 키 / 프로젝트를 쓰려면 OPENAI_API_KEY 를 다르게 주거나 (run 은 SHARD_API_KEYS 를 돌려 씀)
+# 다른 호스트의 worker 는 응답 캐시(WAL)를 공유 폴더에 두지 말 것 (LLM_CACHE_PATH 를 로컬 경로로)
+
+# shard 하나의 행 수
+SHARD_ROWS = int(os.environ.get("SHARD_ROWS", "200"))
+# worker 하나가 동시에 잡고 있는 shard 수 (한 shard 의 꼬리에서 API 가 놀지 않도록)
+SHARD_PARALLEL = int(os.environ.get("SHARD_PARALLEL", "2"))
+# 할 일이 없을 때 (다른 worker 의 lease 만료를 기다릴 때) 큐를 다시 볼 간격(초)
+SHARD_POLL_SECONDS = float(os.environ.get("SHARD_POLL_SECONDS", "5"))
+# 1 이면 병합 후에도 shard 파일을 남김
+SHARD_KEEP = os.environ.get("SHARD_KEEP", "0") == "1"
+# run 이 로컬 worker 들에게 돌려 줄 API 키 (쉼표 구분, 비어 있으면 모두 OPENAI_API_KEY)
+SHARD_API_KEYS = os.environ.get("SHARD_API_KEYS", "")
+
+TASKS = {
+    "mednli": (mednli.MEDNLI_MODEL, "responses"),
+    "truthfulqa": (truthfulqa.TRUTHFULQA_MODEL, "chat"),
+}
+
+
+def shard_dir(input_file):
+    return os.path.splitext(input_file)[0] + ".shards"
+
+
+def _backends(entry):
+    # plan 때와 같은 tag (이름이 같은 모델은 provider 를 붙인 tag)
+    return backends_for(entry["options"]["models"])
+
+
+#############################################
+# coordinator: 입력 → 행 구간 shard 파일 + 큐 등록
+#############################################
+def plan(input_files, queue, shard_rows=SHARD_ROWS):
+    for input_file in input_files:
+        info = resolve(input_file)
+        if info.task not in TASKS:
+            print(f"⚠ {input_file}: 평가 대상이 아님 (task={info.task}) → 건너뜀")
+            continue
+        backends = eval_backends(*TASKS[info.task])
+        # worker 환경과 무관하게 모든 shard 가 같은 설정 / 같은 컬럼으로 평가되도록 계획에 고정
+        options = {"models": [b.spec for b in backends], "shard_rows": shard_rows, "sc": [SC_SAMPLES, SC_TEMPERATURE]}
+        if info.task == "truthfulqa":
+            options["scoring"] = truthfulqa.SCORING
+
+        entry = queue.input_entry(input_file)
+        if entry and entry["sha256"] == info.sha256 and entry["options"] == options:
+            print(f"📦 {input_file}: 이미 계획됨 ({entry['shards']} shard)")
+            continue
+
+        folder = shard_dir(input_file)
+        if os.path.isdir(folder):
+            shutil.rmtree(folder)
+        os.makedirs(folder)
+        stem = os.path.splitext(os.path.basename(input_file))[0]
+        # 평가 스크립트와 같은 방식으로 읽는다 (TruthfulQA 는 깨진 글자를 치환)
+        errors = "replace" if info.task == "truthfulqa" else None
+
+        shards, f, writer, start = [], None, None, 0
+        for idx, row in enumerate(iter_rows(input_file, info.encoding, errors=errors)):
+            if idx % shard_rows == 0:
+                if f is not None:
+                    f.close()
+                    shards.append((path, start, idx))
+                start = idx
+                path = os.path.join(folder, f"{stem}.{len(shards):05d}.csv")
+                f = open(path, "w", encoding="utf-8", newline="")
+                writer = csv.DictWriter(f, fieldnames=info.header)
+                writer.writeheader()
+            writer.writerow(row)
+        if f is not None:
+            f.close()
+            shards.append((path, start, info.rows))
+        else:
+            # 빈 입력도 헤더만 있는 결과를 만들도록 빈 shard 하나
+            path = os.path.join(folder, f"{stem}.00000.csv")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                csv.DictWriter(f, fieldnames=info.header).writeheader()
+            shards.append((path, 0, 0))
+
+        queue.add_input(input_file, info.sha256, info.task, options, shards)
+        print(f"📦 {input_file}: {info.rows}행 → {len(shards)} shard ({', '.join(options['models'])})")
+
+
+#############################################
+# worker: shard 를 lease 로 가져와 평가 스크립트의 Job 으로 실행
+#############################################
+class ShardLease:
+    """ResumableOutput 의 lease: 시도마다 다른 .partial 이름 + 최종 파일로 올리기 직전의 소유 확인.
+    멈췄다 깨어난 worker 는 다른 worker 의 .partial 을 덮어쓰지도, 결과를 올리지도 못한다."""
+    def __init__(self, queue, shard, worker_id):
+        self.queue = queue
+        self.shard_id = shard["id"]
+        self.worker_id = worker_id
+        self.owner = file_tag(f"{worker_id}-{shard['attempts']}")
+
+    def held(self):
+        # 연장에 성공하면 lease_seconds 동안은 아무도 가져갈 수 없으므로 그 안에 이름만 바꾸면 된다
+        return self.queue.renew([self.shard_id], self.worker_id) == [self.shard_id]
+
+
+def _shard_job(queue, entry, shard, worker_id):
+    path = shard["shard_file"]
+    lease = ShardLease(queue, shard, worker_id)
+    backends = _backends(entry)
+    # 예전 계획(sc 없음)은 self-consistency 없이
+    sc_samples, sc_temperature = entry["options"].get("sc", (1, SC_TEMPERATURE))
+    if entry["task"] == "mednli":
+        log_path = os.path.join(shard_dir(entry["input"]), f"mednli_calls.{worker_id}.jsonl")
+        job = mednli.mednli_job(path, log_path, resume=True, batch=False, backends=backends,
+                                sc_samples=sc_samples, sc_temperature=sc_temperature, lease=lease)
+    else:
+        job = truthfulqa.truthfulqa_job(path, resume=True, batch=False, backends=backends,
+                                        scoring=entry["options"]["scoring"],
+                                        sc_samples=sc_samples, sc_temperature=sc_temperature, lease=lease)
+    job.name = os.path.basename(path)
+    return job
+
+
+def _finished(entry, shard):
+    """다른 worker 가 결과를 다 써 놓고 done 표시 전에 죽은 경우"""
+    return all(os.path.exists(p) for p in evaluated_paths(shard["shard_file"], _backends(entry)).values())
+
+
+def _keep_leases(queue, ids, worker_id, stop):
+    while not stop.wait(queue.lease_seconds / 3):
+        kept = queue.renew(ids, worker_id)
+        for lost in set(ids) - set(kept):
+            print(f"⚠ shard {lost}: lease 를 잃음 (다른 worker 가 가져감)")
+        ids = kept
+
+
+def work(queue, worker_id=None, parallel=SHARD_PARALLEL, max_concurrency=MAX_CONCURRENCY):
+    """pending / 만료된 shard 가 없어질 때까지 처리. 놀 때는 다른 worker 의 lease 만료를 기다렸다가 가져간다."""
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    entries = {e["input"]: e for e in queue.inputs()}
+    processed = 0
+    print(f"👷 worker {worker_id} 시작 ({queue.path})")
+    while True:
+        shards = queue.claim(worker_id, parallel)
+        if not shards:
+            merge_ready(queue)
+            if not queue.unfinished():
+                break
+            time.sleep(SHARD_POLL_SECONDS)
+            continue
+
+        jobs, held = [], []
+        for shard in shards:
+            entry = entries.get(shard["input"])
+            if entry is None:
+                entry = entries[shard["input"]] = queue.input_entry(shard["input"])
+            if _finished(entry, shard):
+                queue.complete(shard["id"], worker_id)
+                continue
+            try:
+                job = _shard_job(queue, entry, shard, worker_id)
+            except Exception as e:
+                queue.release(shard["id"], worker_id, repr(e))
+                print(f"🚨 {shard['shard_file']}: 준비 실패 → {e!r}")
+                continue
+            jobs.append(job)
+            held.append((job, shard))
+
+        stop = threading.Event()
+        threading.Thread(target=_keep_leases, args=(queue, [s["id"] for _, s in held], worker_id, stop),
+                         daemon=True).start()
+        try:
+            backends = [b for _, s in held for b in _backends(entries[s["input"]])]
+            failures = run_jobs(jobs, max_concurrency=concurrency_for(backends, max_concurrency))
+        except BaseException as e:
+            # Ctrl-C 등: 잡고 있던 shard 를 바로 돌려줌 (.partial 은 남아 다음 worker 가 이어감)
+            for _, shard in held:
+                queue.release(shard["id"], worker_id, repr(e))
+            raise
+        finally:
+            stop.set()
+
+        errors = {id(job): error for job, error in failures}
+        for job, shard in held:
+            if id(job) in errors:
+                queue.release(shard["id"], worker_id, repr(errors[id(job)]))
+            elif queue.complete(shard["id"], worker_id):
+                processed += 1
+            else:
+                print(f"⚠ {shard['shard_file']}: lease 를 잃어 done 표시를 다른 worker 에게 맡김")
+        merge_ready(queue)
+
+    print(f"👷 worker {worker_id} 종료: shard {processed}개 처리")
+    return processed
+
+
+#############################################
+# 병합: shard 결과를 순서대로 이어 붙여 단일 실행과 같은 *_evaluated.csv
+#############################################
+def merge(queue, entry):
+    backends = _backends(entry)
+    shards = queue.shards(entry["input"])
+    for tag, target in evaluated_paths(entry["input"], backends).items():
+        tmp = target + ".tmp"
+        try:
+            with open(tmp, "wb") as out:
+                first = None
+                for shard in shards:
+                    path = evaluated_paths(shard["shard_file"], backends)[tag]
+                    with open(path, "rb") as f:
+                        # 헤더는 첫 shard 것만. 컬럼 구성이 다른 shard 를 이어 붙이면 열이 어긋나므로 거부
+                        header = f.readline()
+                        if first is None:
+                            first = header
+                            out.write(header)
+                        elif header != first:
+                            raise ValueError(f"{path}: 헤더가 첫 shard 와 다름 → 병합 중단\n"
+                                             f"   첫 shard: {first.decode('utf-8', 'replace').strip()}\n"
+                                             f"   이 shard: {header.decode('utf-8', 'replace').strip()}")
+                        shutil.copyfileobj(f, out)
+                out.flush()
+                os.fsync(out.fileno())
+        except BaseException:
+            os.remove(tmp)
+            raise
+        # 행 해시(.keys, diff 모드용)도 같은 순서로 이어 붙인다. 하나라도 없으면 남기지 않음
+        keys = [evaluated_paths(shard["shard_file"], backends)[tag] + ".keys" for shard in shards]
+        if os.path.exists(target + ".keys"):
+            os.remove(target + ".keys")
+        os.replace(tmp, target)
+        if all(os.path.exists(k) for k in keys):
+            with open(target + ".keys.tmp", "wb") as out:
+                for k in keys:
+                    with open(k, "rb") as f:
+                        shutil.copyfileobj(f, out)
+            os.replace(target + ".keys.tmp", target + ".keys")
+        print(f"🧩 병합 완료 → {target} ({len(shards)} shard)")
+    if not SHARD_KEEP:
+        shutil.rmtree(shard_dir(entry["input"]), ignore_errors=True)
+
+
+def merge_ready(queue):
+    """모든 shard 가 끝난 입력을 병합 (여러 worker 가 불러도 입력마다 한 번만)"""
+    merged = 0
+    for entry in queue.inputs():
+        if entry["merged"] or not queue.begin_merge(entry["input"]):
+            continue
+        try:
+            merge(queue, entry)
+        except Exception:
+            queue.abort_merge(entry["input"])
+            raise
+        merged += 1
+    return merged
+
+
+def status(queue):
+    print(f"📋 {queue.path}")
+    for entry in queue.inputs():
+        counts = {}
+        for shard in queue.shards(entry["input"]):
+            counts[shard["status"]] = counts.get(shard["status"], 0) + 1
+        state = "병합됨" if entry["merged"] else ", ".join(f"{k} {v}" for k, v in sorted(counts.items()))
+        print(f"   • {entry['input']} ({entry['task']}, {entry['shards']} shard): {state}")
+        for shard in queue.shards(entry["input"]):
+            if shard["status"] == "failed":
+                print(f"      ✖ {shard['shard_file']} [{shard['start']}:{shard['stop']}] {shard['error']}")
+
+
+def run_local(n_workers, input_files, queue_path=SHARD_QUEUE_PATH):
+    """plan → 이 호스트에 worker n 개 → merge (다른 호스트의 worker 도 같은 큐에 붙을 수 있다)"""
+    queue = ShardQueue(queue_path)
+    plan(input_files, queue)
+    keys = [k.strip() for k in SHARD_API_KEYS.split(",") if k.strip()]
+    procs = []
+    for i in range(n_workers):
+        env = dict(os.environ, SHARD_QUEUE_PATH=queue_path)
+        if keys:
+            env["OPENAI_API_KEY"] = keys[i % len(keys)]
+        procs.append(subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "work", f"{socket.gethostname()}-w{i}"], env=env,
+        ))
+    codes = [p.wait() for p in procs]
+    merge_ready(queue)
+    status(queue)
+    return all(code == 0 for code in codes) and not queue.counts().get("failed")
+
+
+if __name__ == "__main__":
+    command, args = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ("status", [])
+    if command == "run":
+        ok = run_local(int(args[0]), args[1:])
+        sys.exit(0 if ok else 1)
+
+    queue = ShardQueue()
+    if command == "plan":
+        plan(args, queue)
+    elif command == "work":
+        work(queue, args[0] if args else None)
+        print(perf_summary())
+    elif command == "merge":
+        print(f"🧩 병합: {merge_ready(queue)}개 입력")
+    elif command == "retry":
+        print(f"↩ failed shard {queue.reset_failed()}개를 다시 pending 으로")
+    elif command == "status":
+        status(queue)
+    else:
+        print(f"알 수 없는 명령: {command} (plan / work / merge / retry / status / run)")
+        sys.exit(2)
@@ -0,0 +1,46 @@
+import csv
+import os
+import sys
+import tempfile
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from mock_llm_server import start_server
+
+# 모듈을 import 하기 전에: 실제 API 대신 mock 서버, 캐시는 임시 디렉터리에
+_server, _url = start_server()
+_cache_dir = tempfile.mkdtemp(prefix="llm-cache-")
+os.environ.update(
+    OPENAI_BASE_URL=_url,
+    OPENAI_API_KEY="test",
+    LLM_CACHE_PATH=os.path.join(_cache_dir, "cache.sqlite"),
+)
+
+MEDNLI_ROWS = [
+    ("entailment", "응급실 생체 신호는 체온 98.9도, 심박수 73회였수다.", "환자 상태는 안정적이우다."),
+    ("contradiction", "응급실 생체 신호는 체온 98.9도, 심박수 73회였수다.", "환자 상태가 불안정허다."),
+    ("neutral", "환자는 어제부터 기침을 했수다.", "환자는 담배를 피우우다."),
+    ("entailment", "환자는 당뇨로 인슐린을 맞고 있수다.", "환자는 당뇨가 있수다."),
+    ("contradiction", "환자는 열이 없었수다.", "환자는 고열이 났수다."),
+    ("neutral", "환자는 두통을 호소했수다.", "환자는 편두통 병력이 있수다."),
+    ("entailment", "흉부 사진에서 폐렴이 보였수다.", "환자는 폐렴이우다."),
+    ("contradiction", "혈압은 정상이었수다.", "환자는 저혈압이우다."),
+    ("neutral", "환자는 70세 남자우다.", "환자는 은퇴했수다."),
+    ("entailment", "환자는 수술 후 회복 중이우다.", "환자는 수술을 받았수다."),
+    ("contradiction", "환자는 혼자 걸었수다.", "환자는 걷지 못허우다."),
+]
+
+
+@pytest.fixture
+def mednli_csv(tmp_path, monkeypatch):
+    """작은 MedNLI 입력 (제주 방언) 을 tmp_path 에 만들고 그 디렉터리에서 실행"""
+    monkeypatch.chdir(tmp_path)
+    with open("mednli_Jeju.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["gold_label", "sentence1_Jeju", "sentence2_Jeju", "ai_answer", "result"])
+        for label, premise, hypothesis in MEDNLI_ROWS:
+            writer.writerow([label, premise, hypothesis, "", ""])
+    return "mednli_Jeju.csv"
@@ -0,0 +1,27 @@
+import pytest
+
+from async_engine import Job, run_job, run_jobs
+
+
+def _fail(row):
+    raise ValueError(row)
+
+
+def _job(name, rows, worker, written):
+    return Job(name, rows, worker, lambda idx, row, result: written.append((name, idx, result)))
+
+
+def test_run_jobs_reports_each_failed_job_even_with_same_name():
+    # 같은 방언의 입력 파일 두 개 → 이름이 같은 작업 두 개
+    written = []
+    jobs = [_job("TruthfulQA-Jeolla", [1], _fail, written), _job("TruthfulQA-Jeolla", [2], _fail, written),
+            _job("ok", [3, 4], lambda row: row * 10, written)]
+    failures = run_jobs(jobs)
+    assert [(job, str(error)) for job, error in failures] == [(jobs[0], "1"), (jobs[1], "2")]
+    assert written == [("ok", 0, 30), ("ok", 1, 40)]
+
+
+def test_run_job_raises_the_failure():
+    with pytest.raises(ValueError):
+        run_job(_job("bad", [1], _fail, []))
+    assert run_jobs([]) == []
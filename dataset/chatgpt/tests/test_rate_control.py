@@ -0,0 +1,56 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+from rate_control import BACKOFF_MAX, _duration, retry_after
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("2.5", 2.5),
+    ("1s", 1.0),
+    ("120ms", 0.12),
+    ("6m0s", 360.0),
+    ("1h2m3.5s", 3723.5),
+    (None, None),
+    ("", None),
+    ("soon", None),
+    ("inf", None),
+    ("nan", None),
+    ("1e400", None),
+    ("9" * 400 + "h", None),
+])
+def test_duration(value, seconds):
+    result = _duration(value)
+    if seconds is None:
+        assert result is None
+    else:
+        assert result == pytest.approx(seconds)
+
+
+@pytest.mark.parametrize("headers, seconds", [
+    (None, None),
+    ({}, None),
+    ({"retry-after-ms": "250"}, 0.25),
+    ({"retry-after-ms": "250", "retry-after": "9"}, 0.25),
+    ({"retry-after-ms": "soon", "retry-after": "2"}, 2.0),
+    ({"retry-after": "3"}, 3.0),
+    ({"retry-after": "1m30s"}, BACKOFF_MAX),
+    ({"retry-after": "-5"}, 0.0),
+    ({"retry-after": "soon"}, None),
+    # 무한 / NaN / 넘치는 값은 버리거나 BACKOFF_MAX 로 자른다 (cond.wait(timeout=inf) 방지)
+    ({"retry-after-ms": "inf"}, None),
+    ({"retry-after-ms": "nan"}, None),
+    ({"retry-after-ms": "1e300"}, BACKOFF_MAX),
+    ({"retry-after": "inf"}, None),
+    ({"retry-after": "nan"}, None),
+    ({"retry-after": "1e400"}, None),
+    ({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}, 0.0),
+])
+def test_retry_after(headers, seconds):
+    assert retry_after(headers) == seconds
+
+
+def test_retry_after_http_date():
+    seconds = retry_after({"retry-after": formatdate(time.time() + 20, usegmt=True)})
+    assert 18 <= seconds <= 20
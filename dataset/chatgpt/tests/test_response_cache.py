@@ -0,0 +1,52 @@
+import itertools
+import types
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """response_cache 의 time.time() 이 호출마다 1초씩 증가 (accessed_at 순서가 겹치지 않게)"""
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(response_cache, "time", types.SimpleNamespace(time=lambda: float(next(ticks))))
+    return ticks
+
+
+def _cache(tmp_path, max_bytes, max_age_days=90):
+    return ResponseCache(str(tmp_path / "cache.sqlite"), max_mb=max_bytes / (1024 * 1024), max_age_days=max_age_days)
+
+
+def test_evicts_least_recently_used_over_size_limit(tmp_path, clock):
+    cache = _cache(tmp_path, max_bytes=100)
+    cache.put("a", "x" * 40)
+    cache.put("b", "y" * 40)
+    assert cache.get("a") == "x" * 40
+    cache.put("c", "z" * 40)
+    cache.evict()
+    # 120 바이트 > 100 → 가장 오래 안 쓰인 b 만 지운다
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 40
+    assert cache.get("c") == "z" * 40
+
+
+def test_evicts_expired_entries(tmp_path, clock):
+    cache = _cache(tmp_path, max_bytes=1 << 20, max_age_days=10 / 86400)
+    cache.put("old", "response")
+    assert cache.get("old") == "response"
+    next(itertools.islice(clock, 20, None))
+    assert cache.get("old") is None
+    cache.evict()
+    count = cache._conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    assert count == 0
+
+
+def test_get_or_call_does_not_store_empty_response(tmp_path):
+    cache = _cache(tmp_path, max_bytes=1 << 20)
+    calls = []
+    assert cache.get_or_call("k", lambda: calls.append(1) or "") == ""
+    assert cache.get_or_call("k", lambda: calls.append(1) or "ok") == "ok"
+    assert cache.get_or_call("k", lambda: calls.append(1) or "other") == "ok"
+    assert len(calls) == 2
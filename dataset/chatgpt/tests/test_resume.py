@@ -0,0 +1,108 @@
+import csv
+import os
+
+import pytest
+
+from resume import IncompleteOutput, LeaseLost, ResumableOutput
+
+FIELDS = ["text", "answer"]
+ROWS = [{"text": f"row {i}"} for i in range(6)]
+
+
+class Crash(Exception):
+    pass
+
+
+def _run(path, rows, calls, crash_at=None, fail_at=None, lease=None):
+    """ResumableOutput.wrap 으로 행을 순서대로 처리. crash_at 번째 행에서 Crash 로 중단"""
+    def worker(row):
+        calls.append(row["text"])
+        if row["text"] == fail_at:
+            raise RuntimeError("api error")
+        return row["text"].upper()
+
+    out = ResumableOutput(path, FIELDS, ["text"], resume=True, lease=lease)
+    with out:
+        work, on_result = out.wrap(worker, lambda idx, row, result: {"text": row["text"], "answer": result})
+        for idx, row in enumerate(rows):
+            if idx == crash_at:
+                raise Crash()
+            on_result(idx, row, work(row))
+        out.finalize()
+    return out
+
+
+def _read(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_crash_then_resume_reuses_completed_rows(tmp_path):
+    path = str(tmp_path / "out.csv")
+    calls = []
+    with pytest.raises(Crash):
+        _run(path, ROWS, calls, crash_at=4)
+    # finalize 전에는 최종 파일이 없고 .partial 만 남는다
+    assert not os.path.exists(path)
+    assert os.path.exists(path + ".partial")
+
+    calls.clear()
+    out = _run(path, ROWS, calls)
+    assert calls == ["row 4", "row 5"]
+    assert out.carried == 4
+    assert _read(path) == [{"text": r["text"], "answer": r["text"].upper()} for r in ROWS]
+    assert not os.path.exists(path + ".partial")
+    with open(path + ".keys", encoding="utf-8") as f:
+        assert len(f.read().split()) == len(ROWS)
+
+
+def test_resumed_output_matches_clean_run(tmp_path):
+    clean, resumed = str(tmp_path / "clean.csv"), str(tmp_path / "resumed.csv")
+    _run(clean, ROWS, [])
+    for crash_at in (2, 3, 5):
+        with pytest.raises(Crash):
+            _run(resumed, ROWS, [], crash_at=crash_at)
+    _run(resumed, ROWS, [])
+    with open(clean, "rb") as a, open(resumed, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_failed_row_keeps_partial_and_no_final_file(tmp_path):
+    path = str(tmp_path / "out.csv")
+    with pytest.raises(IncompleteOutput):
+        _run(path, ROWS, [], fail_at="row 2")
+    assert not os.path.exists(path)
+
+    calls = []
+    _run(path, ROWS, calls)
+    assert calls == ["row 2"]
+    assert len(_read(path)) == len(ROWS)
+
+
+class FakeLease:
+    def __init__(self, owner):
+        self.owner = owner
+        self.valid = True
+
+    def held(self):
+        return self.valid
+
+
+def test_lost_lease_is_fenced_and_next_attempt_resumes(tmp_path):
+    path = str(tmp_path / "out.csv")
+    stalled = FakeLease("w1-1")
+    with pytest.raises(Crash):
+        _run(path, ROWS, [], crash_at=3, lease=stalled)
+
+    # 다른 worker 가 lease 를 가져가 첫 시도가 남긴 행을 이어받는다
+    calls = []
+    _run(path, ROWS, calls, lease=FakeLease("w2-2"))
+    assert calls == ["row 3", "row 4", "row 5"]
+    finished = _read(path)
+
+    # 멈췄던 worker 가 깨어나 끝까지 돌아도 최종 파일을 덮어쓰지 못한다
+    stalled.valid = False
+    with pytest.raises(LeaseLost):
+        _run(path, ROWS, [], lease=stalled)
+    assert _read(path) == finished
+    assert not os.path.exists(f"{path}.{stalled.owner}.partial")
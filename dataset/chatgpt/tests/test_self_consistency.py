@@ -0,0 +1,39 @@
+from collections import Counter
+
+import pytest
+
+from self_consistency import needed
+
+
+@pytest.mark.parametrize("votes, k, more", [
+    # 처음엔 1위가 확정되는 최소 개수만큼 한 번에
+    ("", 1, 1),
+    ("", 3, 2),
+    ("", 5, 3),
+    # 남은 샘플을 모두 2위가 받아도 못 뒤집으면 0
+    ("AA", 3, 0),
+    ("AAA", 5, 0),
+    ("AAB", 5, 1),
+    ("AB", 3, 1),
+    ("ABC", 5, 2),
+    ("AABB", 5, 1),
+    # k 개를 다 뽑았으면 동점이어도 끝
+    ("AB", 2, 0),
+    ("AABBC", 5, 0),
+])
+def test_needed(votes, k, more):
+    assert needed(Counter(votes), len(votes), k) == more
+
+
+def test_needed_reaches_decision_within_k():
+    """1위만 계속 나오든 번갈아 나오든 k 개를 넘겨 요청하지 않는다"""
+    for k in range(1, 8):
+        for pattern in ("A", "AB", "ABC"):
+            counts, taken = Counter(), 0
+            while (more := needed(counts, taken, k)) > 0:
+                for _ in range(more):
+                    counts[pattern[taken % len(pattern)]] += 1
+                    taken += 1
+            assert taken <= k
+            top = counts.most_common(2) + [(None, 0)]
+            assert taken == k or top[0][1] - top[1][1] > k - taken
@@ -0,0 +1,63 @@
+import csv
+import os
+import shutil
+
+import pytest
+
+import shard_runner
+from async_engine import run_job
+from Mednli_eval_Hallucination import mednli_job
+from work_queue import ShardQueue
+
+EVALUATED = "mednli_Jeju_evaluated.csv"
+
+
+def _single_run(input_file, out_dir):
+    """분할 없이 한 번에 평가한 결과 (비교 기준)"""
+    os.makedirs(out_dir)
+    shutil.copy(input_file, out_dir)
+    cwd = os.getcwd()
+    os.chdir(out_dir)
+    try:
+        run_job(mednli_job(input_file, resume=False, batch=False, sc_samples=1))
+    finally:
+        os.chdir(cwd)
+    with open(os.path.join(out_dir, EVALUATED), "rb") as f:
+        return f.read()
+
+
+def test_sharded_run_matches_single_run(mednli_csv):
+    expected = _single_run(mednli_csv, "single")
+
+    queue = ShardQueue("queue.sqlite")
+    shard_runner.plan([mednli_csv], queue, shard_rows=3)
+    assert len(queue.shards(mednli_csv)) == 4
+    shard_runner.work(queue, "w1", parallel=2)
+
+    with open(EVALUATED, "rb") as f:
+        assert f.read() == expected
+    with open(EVALUATED, encoding="utf-8", newline="") as f:
+        assert len(list(csv.reader(f))) == 12
+    with open(EVALUATED + ".keys", encoding="utf-8") as f:
+        assert len(f.read().split()) == 11
+
+
+def test_merge_rejects_mismatched_shard_header(mednli_csv, monkeypatch):
+    monkeypatch.setattr(shard_runner, "SHARD_KEEP", True)
+    queue = ShardQueue("queue.sqlite")
+    shard_runner.plan([mednli_csv], queue, shard_rows=6)
+    shard_runner.work(queue, "w1")
+    os.remove(EVALUATED)
+
+    entry = queue.input_entry(mednli_csv)
+    last = queue.shards(mednli_csv)[-1]
+    [path] = shard_runner.evaluated_paths(last["shard_file"], shard_runner._backends(entry)).values()
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text.replace("ai_answer", "ai_answer_x", 1))
+
+    with pytest.raises(ValueError):
+        shard_runner.merge(queue, entry)
+    assert not os.path.exists(EVALUATED)
+    assert not os.path.exists(EVALUATED + ".tmp")
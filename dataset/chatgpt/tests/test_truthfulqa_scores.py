@@ -0,0 +1,40 @@
+import math
+
+from TruthfulQA_eval_Hallucination import UNKNOWN_SCORES, mc_scores
+
+NEG_INF = float("-inf")
+
+
+def test_mc1_picks_unique_best():
+    result = mc_scores([-2.0, -0.1, -3.0], [0, 1, 0], [-2.0, -0.1, -3.0], [0, 1, 0])
+    assert result["ai_answer_mc1"] == "B"
+    assert result["mc1_result"] == "True"
+
+
+def test_mc1_tie_on_top_is_unknown():
+    # 동점이면 인덱스 0 (= 데이터셋에서 늘 정답인 A) 으로 떨어지면 안 된다
+    result = mc_scores([-0.5, -0.5, -3.0], [1, 0, 0], [-0.5, -0.4, -3.0], [1, 0, 0])
+    assert result["ai_answer_mc1"] == "UNKNOWN"
+    assert result["mc1_result"] == "UNKNOWN"
+    assert result["ai_answer_mc2"] == "['B']"
+
+
+def test_all_equal_or_missing_scores_are_unknown():
+    for logprobs in ([], [NEG_INF, NEG_INF, NEG_INF], [-1.0, -1.0, -1.0]):
+        labels = [1] + [0] * (len(logprobs) - 1)
+        assert mc_scores(logprobs, labels, logprobs, labels) == UNKNOWN_SCORES
+
+
+def test_mc1_ignores_missing_choices():
+    result = mc_scores([NEG_INF, -1.0, NEG_INF], [1, 0, 0], [NEG_INF, -1.0], [1, 0])
+    assert result["ai_answer_mc1"] == "B"
+    assert result["mc1_result"] == "False"
+    assert result["mc2_score"] == "0.0000"
+
+
+def test_mc2_score_is_normalized_probability_of_true_answers():
+    mc2 = [math.log(0.5), math.log(0.3), math.log(0.2)]
+    result = mc_scores([-1.0, -2.0], [1, 0], mc2, [1, 0, 1])
+    assert result["mc2_score"] == "0.7000"
+    assert result["mc2_result"] == "True"
+    assert result["ai_answer_mc2"] == "['A', 'B']"
@@ -1,22 +1,35 @@
-import pandas as pd
-import csv
-import time
-from openai import OpenAI
+from llm_client import get_client
 from tqdm import tqdm
 import os
 import sys
-import ast
+import json
+from itertools import islice
+from llm_call import remember, cache_summary
+from backends import OpenAIChat, get_backend
+import perf_stats
+from resume import ResumableOutput
+from batch_jobs import run_batch, chat_body, CHAT_ENDPOINT, BATCH_MODE
+from translation_memory import TranslationMemory
+from call_journal import template_id
+from csv_stream import iter_rows, read_header, count_rows, parse_list
 
 # ✅ OpenAI GPT-5 API 설정
-client = OpenAI(api_key="api_key")
+client = get_client()   # 🔥 키 / 주소는 OPENAI_API_KEY / OPENAI_BASE_URL 환경변수
 MODEL_NAME = "gpt-5"
+# ✅ 번역 모델 ("provider:model", 예: anthropic:claude-sonnet-4-5 / local:qwen2.5-7b). 기본은 GPT-5 Chat
+translator = get_backend(os.environ.get("TRANSLATION_MODEL", f"chat:{MODEL_NAME}"))
 
-# ✅ 경로 설정
-BASE_PATH = r"C:\Users\jjw02\Desktop\데이터분석프로그래밍"
+# ✅ 경로 설정 (입력 / 출력 / 번역 메모리 폴더, TRANSLATION_BASE_PATH 로 바꿀 수 있다)
+BASE_PATH = os.environ.get("TRANSLATION_BASE_PATH", r"C:\Users\jjw02\Desktop\데이터분석프로그래밍")
 MEDNLI_INPUT_FILENAME = "mednli_kor.csv"
 TRUTHFULQA_INPUT_FILENAME = "TruthfulQA_kor.csv"
 AI_NAME_FOR_FILE = "GPT-5"
 
+# ✅ 한 번의 요청에 묶어 보낼 문장 수 (1 이면 기존처럼 한 문장씩)
+PACK_SIZE = int(os.environ.get("PACK_SIZE", "1"))
+# ✅ 1 이면 한 요청으로 4개 지역 방언을 모두 받아 입력을 한 번만 순회
+MULTI_REGION = os.environ.get("MULTI_REGION", "0") == "1"
+
 # ✅ 번역 대상 지역
 regions = {
     "제주": "jeju",
@@ -25,135 +38,438 @@ regions = {
     "충청": "choongchung"
 }
 
+# ✅ 번역 메모리 (지역·번역 모델·프롬프트 + 정규화 원문 → 번역, 실행·데이터셋 간 재사용)
+tm = TranslationMemory(os.path.join(BASE_PATH, "translation_memory.sqlite"))
+
+# ✅ BATCH_MODE 에서 미리 받아둔 번역 {(지역, 원문): 번역}
+_batch_translations = {}
+
+
+def translation_prompt(region_name):
+    return (
+        f"너는 {region_name} 방언 전문가야. "
+        f"주어진 문장을 해당 지역 방언으로 자연스럽게 번역해. "
+        f"단, 반드시 **번역된 문장 하나만 출력**하고 다른 설명은 절대 포함하지 마."
+    )
+
+
 # ✅ GPT-5 방언 번역 함수
 def translate_dialects(text, region_name):
     if not text or str(text).strip() == "":
         return text
-    system_prompt = (
+    remembered = tm.lookup(tm_region(region_name), text)
+    if remembered is not None:
+        return remembered
+    return _translate_one(text, region_name)
+
+
+def _translate_one(text, region_name):
+    """번역 메모리를 이미 찾아본 문장 (배치 결과 → 모델 호출). 적중률 통계가 두 번 세지 않도록 메모리 조회는 안 한다"""
+    if (region_name, text) in _batch_translations:
+        translated = _batch_translations[(region_name, text)]
+        tm.put(tm_region(region_name), text, translated)
+        return translated
+    system_prompt = translation_prompt(region_name)
+    # ❌ temperature 제거 (GPT-5는 기본값 1만 허용)
+    # 재시도 후에도 실패하면 예외 그대로 → 호출한 쪽이 그 행을 기록하지 않음 ([ERROR] 문자열을 번역으로 남기지 않음)
+    translated = translator.complete(system_prompt, text).strip()
+    tm.put(tm_region(region_name), text, translated)
+    return translated
+
+
+# ✅ 묶음 번역: 번호 붙은 문장 N개 → JSON 배열 하나
+def packed_translation_prompt(region_name):
+    return (
         f"너는 {region_name} 방언 전문가야. "
-        f"주어진 문장을 해당 지역 방언으로 자연스럽게 번역해. "
-        f"단, 반드시 **번역된 문장 하나만 출력**하고 다른 설명은 절대 포함하지 마."
+        f"입력은 id 와 text 를 가진 문장들의 JSON 배열이야. 각 text 를 해당 지역 방언으로 자연스럽게 번역해. "
+        f'반드시 [{{"id": 1, "text": "번역된 문장"}}, ...] 형식의 JSON 배열 하나만 출력하고, '
+        f"입력과 같은 개수, 같은 id 순서를 지켜. 다른 설명은 절대 포함하지 마."
     )
+
+
+def translation_templates(region_name):
+    """번역 결과를 바꾸는 설정 (번역 모델 / 프롬프트). 빌드 그래프 fingerprint 와 번역 메모리 키가 같이 쓴다"""
+    return [
+        translator.spec,
+        translation_prompt(region_name),
+        packed_translation_prompt(region_name) if PACK_SIZE > 1 else "",
+    ]
+
+
+def tm_region(region_name, region_names=None):
+    """번역 메모리 키의 지역 칸: 모델이나 프롬프트를 바꾸면 이전 번역을 재사용하지 않는다.
+    region_names 가 있으면 다지역 프롬프트(MULTI_REGION)로 만든 번역 → 단일 지역 번역과 따로"""
+    if region_names:
+        templates = [translator.spec, multi_region_prompt(region_names)]
+    else:
+        templates = translation_templates(region_name)
+    fingerprint = template_id("\n".join(templates))
+    return f"{region_name}|{fingerprint}"
+
+
+def parse_packed_translation(raw, n):
+    raw = raw.strip()
+    if raw.startswith("```"):
+        raw = raw.strip("`")
+        raw = raw[raw.find("["):]
+    items = json.loads(raw)
+    if not isinstance(items, list) or len(items) != n:
+        raise ValueError(f"배열 길이 불일치 (기대 {n})")
+    translated = []
+    for i, item in enumerate(items, start=1):
+        if not isinstance(item, dict) or item.get("id") != i or not isinstance(item.get("text"), str):
+            raise ValueError(f"{i}번째 항목 순서/형식 오류")
+        translated.append(item["text"].strip())
+    return translated
+
+
+def _translate_pack(texts, region_name):
+    if len(texts) == 1:
+        # 메모리는 translate_dialects_packed 에서 이미 찾아봄
+        return [_translate_one(texts[0], region_name)]
+    system_prompt = packed_translation_prompt(region_name)
+    user = json.dumps([{"id": i + 1, "text": t} for i, t in enumerate(texts)], ensure_ascii=False)
+    raw = translator.complete(system_prompt, user)
     try:
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": text}
-            ]
-            # ❌ temperature 제거 (GPT-5는 기본값 1만 허용)
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        print(f"⚠️ {region_name} 방언 번역 오류 (텍스트: '{text[:30]}...'): {e}", file=sys.stderr)
-        return f"[ERROR: {text[:50]}... | {e}]"
+        translated = parse_packed_translation(raw, len(texts))
+    except ValueError as e:
+        # 응답 형식이 깨지면 반으로 나눠 다시 요청 (끝까지 가면 한 문장씩)
+        print(f"⚠️ {region_name} 묶음 번역 실패 ({len(texts)}문장) → 분할 재시도: {e}", file=sys.stderr)
+        mid = len(texts) // 2
+        return _translate_pack(texts[:mid], region_name) + _translate_pack(texts[mid:], region_name)
+    for t, translation in zip(texts, translated):
+        tm.put(tm_region(region_name), t, translation)
+    return translated
+
+
+def translate_dialects_packed(texts, region_name, pack_size=PACK_SIZE):
+    """texts 와 같은 순서의 번역 리스트. 메모리·배치 결과에 없는 문장만 pack_size 개씩 묶어 요청한다."""
+    if pack_size <= 1:
+        return [translate_dialects(t, region_name) for t in texts]
+
+    resolved = {}
+    pending = []
+    for t in texts:
+        if t in resolved or t in pending:
+            continue
+        if not t or str(t).strip() == "":
+            resolved[t] = t
+            continue
+        remembered = tm.lookup(tm_region(region_name), t)
+        if remembered is None:
+            remembered = _batch_translations.get((region_name, t))
+        if remembered is not None:
+            resolved[t] = remembered
+        else:
+            pending.append(t)
+
+    for i in range(0, len(pending), pack_size):
+        chunk = pending[i:i + pack_size]
+        resolved.update(zip(chunk, _translate_pack(chunk, region_name)))
+    return [resolved[t] for t in texts]
+
+
+# ✅ 다지역 번역: 문장 하나 → {"제주": ..., "경상": ..., ...} JSON 객체
+def multi_region_prompt(region_names):
+    example = ", ".join(f'"{r}": "{r} 방언 번역"' for r in region_names)
+    return (
+        f"너는 한국 지역 방언 전문가야. "
+        f"입력은 id 와 text 를 가진 문장들의 JSON 배열이야. 각 text 를 {', '.join(region_names)} 방언으로 각각 자연스럽게 번역해. "
+        f'반드시 [{{"id": 1, {example}}}, ...] 형식의 JSON 배열 하나만 출력하고, '
+        f"입력과 같은 개수, 같은 id 순서를 지켜. 다른 설명은 절대 포함하지 마."
+    )
+
+
+def parse_multi_region_translation(raw, n, region_names):
+    raw = raw.strip()
+    if raw.startswith("```"):
+        raw = raw.strip("`")
+        raw = raw[raw.find("["):]
+    items = json.loads(raw)
+    if not isinstance(items, list) or len(items) != n:
+        raise ValueError(f"배열 길이 불일치 (기대 {n})")
+    translated = []
+    for i, item in enumerate(items, start=1):
+        if not isinstance(item, dict) or item.get("id") != i:
+            raise ValueError(f"{i}번째 항목 순서/형식 오류")
+        missing = [r for r in region_names if not isinstance(item.get(r), str)]
+        if missing:
+            raise ValueError(f"{i}번째 항목에 {missing} 누락")
+        translated.append({r: item[r].strip() for r in region_names})
+    return translated
+
+
+def _translate_multi(texts, region_names):
+    system_prompt = multi_region_prompt(region_names)
+    user = json.dumps([{"id": i + 1, "text": t} for i, t in enumerate(texts)], ensure_ascii=False)
+    raw = translator.complete(system_prompt, user)
+    try:
+        translated = parse_multi_region_translation(raw, len(texts), region_names)
+    except ValueError as e:
+        print(f"⚠️ 다지역 번역 실패 ({len(texts)}문장) → 분할 재시도: {e}", file=sys.stderr)
+        if len(texts) == 1:
+            # 마지막 수단: 지역별 단일 번역 (단일 지역 프롬프트로 만든 번역이므로 그쪽 키로 저장)
+            return [{r: _translate_one(texts[0], r) for r in region_names}]
+        mid = len(texts) // 2
+        return _translate_multi(texts[:mid], region_names) + _translate_multi(texts[mid:], region_names)
+    for t, by_region in zip(texts, translated):
+        for r in region_names:
+            tm.put(tm_region(r, region_names), t, by_region[r])
+    return translated
+
+
+def translate_all_regions(texts, region_names, pack_size=PACK_SIZE):
+    """{지역: texts 와 같은 순서의 번역 리스트}. 메모리에 없는 (문장, 지역)이 있는 문장만 요청한다."""
+    results = {r: {} for r in region_names}
+    pending = []
+    for t in texts:
+        if t in results[region_names[0]] or t in pending:
+            continue
+        if not t or str(t).strip() == "":
+            for r in region_names:
+                results[r][t] = t
+            continue
+        missing = False
+        for r in region_names:
+            remembered = tm.lookup(tm_region(r, region_names), t)
+            if remembered is None:
+                remembered = _batch_translations.get((r, t))
+            if remembered is None:
+                missing = True
+            else:
+                results[r][t] = remembered
+        if missing:
+            pending.append(t)
+
+    step = max(pack_size, 1)
+    for i in range(0, len(pending), step):
+        chunk = pending[i:i + step]
+        for t, by_region in zip(chunk, _translate_multi(chunk, region_names)):
+            for r in region_names:
+                results[r].setdefault(t, by_region[r])
+    return {r: [results[r][t] for t in texts] for r in region_names}
+
+
+def translate_texts(texts, region_names):
+    """{지역: 번역 리스트}. MULTI_REGION 이면 지역을 한 요청에 묶는다."""
+    if MULTI_REGION and len(region_names) > 1:
+        return translate_all_regions(texts, region_names)
+    return {r: translate_dialects_packed(texts, r) for r in region_names}
+
+
+# ✅ Batch API 로 지역 하나의 원문 전체를 한 번에 번역 (BATCH_MODE=1)
+def prefetch_translations(texts, region_name, batch_path):
+    if not isinstance(translator, OpenAIChat):
+        print(f"⚠️ Batch API 는 OpenAI Chat 번역 모델에서만 사용 ({translator.spec}) → 동기 호출로 진행")
+        return
+    system_prompt = translation_prompt(region_name)
+    unique_texts = []
+    seen = set()
+    for t in texts:
+        if (isinstance(t, str) and t.strip() and t not in seen
+                and (region_name, t) not in _batch_translations and not tm.contains(tm_region(region_name), t)):
+            seen.add(t)
+            unique_texts.append(t)
+
+    requests = [(str(i), chat_body(translator.model, system_prompt, t)) for i, t in enumerate(unique_texts)]
+    answers = run_batch(translator.client, CHAT_ENDPOINT, requests, batch_path)
+    for i, t in enumerate(unique_texts):
+        answer = answers.get(str(i))
+        if answer:
+            _batch_translations[(region_name, t)] = answer.strip()
+            remember("chat", translator.model, system_prompt, t, answer)
+
 
 # ============================================================================
 # 🩺 A. MedNLI 번역 처리
 # ============================================================================
-mednli_input_csv = os.path.join(BASE_PATH, MEDNLI_INPUT_FILENAME)
-try:
-    df_mednli = pd.read_csv(mednli_input_csv)
-    if 'sentence1_ko' in df_mednli.columns:
-        df_mednli['sentence1'] = df_mednli['sentence1_ko']
-    elif 'sentence1' not in df_mednli.columns:
-        raise ValueError("MedNLI 파일에 'sentence1' 또는 'sentence1_ko' 컬럼이 없습니다.")
-except Exception as e:
-    print(f"🚨 MedNLI 파일 로드 오류: {e}", file=sys.stderr)
-    sys.exit(1)
-
-for region_name, region_en in regions.items():
-    print(f"\n======== 🌍 MedNLI {region_name} 방언 번역 시작 ========")
-    output_filename = os.path.join(BASE_PATH, f"mednli_{region_en}_({AI_NAME_FOR_FILE}).csv")
-    fieldnames = ["gold_label", f"sentence1_{region_en}", f"sentence2_{region_en}", "ai_answer", "result"]
-    translated_results = []
-
-    for _, row in tqdm(df_mednli.iterrows(), total=len(df_mednli), desc=f"➡️ MedNLI {region_name} 번역 중..."):
-        dialect_translation = translate_dialects(row['sentence1'], region_name)
-        translated_results.append({
-            "gold_label": row["gold_label"],
-            f"sentence1_{region_en}": dialect_translation,
-            f"sentence2_{region_en}": dialect_translation,
-            "ai_answer": "",
-            "result": ""
-        })
-        time.sleep(1.2)  # API rate limit 보호
+def mednli_output_row(row, region_en, dialect_translation):
+    return {
+        "gold_label": row["gold_label"],
+        f"sentence1_{region_en}": dialect_translation,
+        f"sentence2_{region_en}": dialect_translation,
+        "ai_answer": "",
+        "result": ""
+    }
+
+
+def iter_mednli_rows(path):
+    for row in iter_rows(path):
+        if 'sentence1_ko' in row:
+            row['sentence1'] = row['sentence1_ko']
+        yield row
+
+
+def translate_mednli(input_csv, region_items):
+    """region_items 의 지역 파일들을 입력 한 번 순회로 채운다 (입력은 PACK_SIZE 행씩 스트리밍)"""
+    outputs = {}
+    for region_name, region_en in region_items:
+        print(f"\n======== 🌍 MedNLI {region_name} 방언 번역 시작 ========")
+        output_filename = os.path.join(BASE_PATH, f"mednli_{region_en}_({AI_NAME_FOR_FILE}).csv")
+        fieldnames = ["gold_label", f"sentence1_{region_en}", f"sentence2_{region_en}", "ai_answer", "result"]
+        # 번역 결과는 행마다 .partial 에 바로 기록 → 중단돼도 다음 실행에서 이어감
+        out = ResumableOutput(output_filename, fieldnames, ["gold_label", "sentence1"])
+        out.open()
+
+        if BATCH_MODE:
+            pending = (row['sentence1'] for row in iter_mednli_rows(input_csv) if out.lookup(row) is None)
+            prefetch_translations(pending, region_name, os.path.join(BASE_PATH, f"mednli_{region_en}.batch.jsonl"))
+        outputs[region_name] = (out, output_filename, region_en)
+
+    # PACK_SIZE 행씩 묶어서 번역 (PACK_SIZE=1 이면 한 행씩)
+    rows = iter_mednli_rows(input_csv)
+    step = max(PACK_SIZE, 1)
+    label = "/".join(outputs)
+    pbar = tqdm(total=count_rows(input_csv), desc=f"➡️ MedNLI {label} 번역 중...")
+    while True:
+        chunk = list(islice(rows, step))
+        if not chunk:
+            break
+        pending = [row for row in chunk if any(out.lookup(row) is None for out, _, _ in outputs.values())]
+        try:
+            with perf_stats.scope("translation:mednli", label), perf_stats.row_timer(len(pending)):
+                translations = translate_texts([row['sentence1'] for row in pending], list(outputs))
+        except Exception as e:
+            # 재시도 후에도 실패 → 이 묶음의 새 행은 기록하지 않고 다음 실행에서 다시 번역
+            print(f"⚠️ MedNLI 번역 실패 ({len(pending)}행, 다음 실행에서 다시 시도): {e}", file=sys.stderr)
+            translations = None
+
+        for region_name, (out, _, region_en) in outputs.items():
+            translated = {id(row): t for row, t in zip(pending, translations[region_name])} if translations else {}
+            for row in chunk:
+                done = out.lookup(row)
+                if done is not None:
+                    out.write(done, out.key(row))
+                    continue
+                if translations is None:
+                    out.failed += 1
+                    continue
+                out.write(mednli_output_row(row, region_en, translated[id(row)]), out.key(row))
+        pbar.update(len(chunk))
+    pbar.close()
+
+    for region_name, (out, output_filename, _) in outputs.items():
+        try:
+            out.finalize()
+            print(f"🎉 {region_name} 방언 파일 저장 완료 → {output_filename}")
+        except Exception as e:
+            print(f"🚨 CSV 저장 실패: {e}", file=sys.stderr)
 
-    try:
-        with open(output_filename, "w", encoding="utf-8", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(translated_results)
-        print(f"🎉 {region_name} 방언 파일 저장 완료 → {output_filename}")
-    except Exception as e:
-        print(f"🚨 CSV 저장 실패: {e}", file=sys.stderr)
 
 # ============================================================================
 # 🧠 B. TruthfulQA 번역 처리
 # ============================================================================
-truthfulqa_input_csv = os.path.join(BASE_PATH, TRUTHFULQA_INPUT_FILENAME)
 required_tqa_cols = [
     'question', 'mc1_choice', 'mc1_label', 'mc2_choice',
     'mc2_label', 'ai_answer_mc1', 'mc1_result',
     'ai_answer_mc2', 'mc2_result'
 ]
 
-try:
-    df_tqa = pd.read_csv(truthfulqa_input_csv)
-    if not all(col in df_tqa.columns for col in required_tqa_cols):
-        raise ValueError("TruthfulQA 파일에 필수 컬럼이 누락되었습니다.")
-except Exception as e:
-    print(f"🚨 TruthfulQA 파일 로드 오류: {e}", file=sys.stderr)
-    sys.exit(1)
-
-for region_name, region_en in regions.items():
-    print(f"\n======== 🌍 TruthfulQA {region_name} 방언 번역 시작 ========")
-    output_filename = os.path.join(BASE_PATH, f"truthfulqa_{region_en}_({AI_NAME_FOR_FILE}).csv")
-    fieldnames = [
-        f"question_{region_en}", f"mc1_choice_{region_en}", "mc1_label",
-        f"mc2_choice_{region_en}", "mc2_label",
-        "ai_answer_mc1", "mc1_result", "ai_answer_mc2", "mc2_result"
-    ]
-    translated_results = []
 
-    for _, row in tqdm(df_tqa.iterrows(), total=len(df_tqa), desc=f"➡️ TQA {region_name} 번역 중..."):
-        # 질문 번역
-        question_dialect = translate_dialects(row['question'], region_name)
+def tqa_output_row(row, region_en, translated, n_mc1):
+    return {
+        f"question_{region_en}": translated[0],
+        f"mc1_choice_{region_en}": translated[1:1 + n_mc1],
+        "mc1_label": row["mc1_label"],
+        f"mc2_choice_{region_en}": translated[1 + n_mc1:],
+        "mc2_label": row["mc2_label"],
+        "ai_answer_mc1": row["ai_answer_mc1"],
+        "mc1_result": row["mc1_result"],
+        "ai_answer_mc2": row["ai_answer_mc2"],
+        "mc2_result": row["mc2_result"],
+    }
 
-        # mc1/mc2 선택지 리스트 변환
-        try:
-            mc1_list = ast.literal_eval(row['mc1_choice']) if isinstance(row['mc1_choice'], str) and row['mc1_choice'].startswith('[') else [row['mc1_choice']]
-        except:
-            mc1_list = [x.strip() for x in str(row['mc1_choice']).split(',') if x.strip()]
+
+def translate_truthfulqa(input_csv, region_items):
+    outputs = {}
+    for region_name, region_en in region_items:
+        print(f"\n======== 🌍 TruthfulQA {region_name} 방언 번역 시작 ========")
+        output_filename = os.path.join(BASE_PATH, f"truthfulqa_{region_en}_({AI_NAME_FOR_FILE}).csv")
+        fieldnames = [
+            f"question_{region_en}", f"mc1_choice_{region_en}", "mc1_label",
+            f"mc2_choice_{region_en}", "mc2_label",
+            "ai_answer_mc1", "mc1_result", "ai_answer_mc2", "mc2_result"
+        ]
+        out = ResumableOutput(output_filename, fieldnames, required_tqa_cols)
+        out.open()
+
+        if BATCH_MODE:
+            pending = []
+            for row in iter_rows(input_csv):
+                if out.lookup(row) is None:
+                    pending.append(row['question'])
+                    pending.extend(parse_list(row['mc1_choice']))
+                    pending.extend(parse_list(row['mc2_choice']))
+            prefetch_translations(pending, region_name, os.path.join(BASE_PATH, f"truthfulqa_{region_en}.batch.jsonl"))
+        outputs[region_name] = (out, output_filename, region_en)
+
+    label = "/".join(outputs)
+    for row in tqdm(iter_rows(input_csv), total=count_rows(input_csv), desc=f"➡️ TQA {label} 번역 중..."):
+        pending_regions = [r for r, (out, _, _) in outputs.items() if out.lookup(row) is None]
+        translations = None
+        if pending_regions:
+            # mc1/mc2 선택지 리스트 변환
+            mc1_list = parse_list(row['mc1_choice'])
+            mc2_list = parse_list(row['mc2_choice'])
+
+            # 질문 + 각 선택지 번역 (PACK_SIZE > 1 이면 한 요청으로, MULTI_REGION 이면 모든 지역을 한 요청으로)
+            try:
+                with perf_stats.scope("translation:truthfulqa", label), perf_stats.row_timer():
+                    translations = translate_texts([row['question']] + mc1_list + mc2_list, pending_regions)
+            except Exception as e:
+                print(f"⚠️ TruthfulQA 번역 실패 (다음 실행에서 다시 시도): {e}", file=sys.stderr)
+
+        for region_name, (out, _, region_en) in outputs.items():
+            done = out.lookup(row)
+            if done is not None:
+                out.write(done, out.key(row))
+                continue
+            if translations is None:
+                out.failed += 1
+                continue
+            out.write(tqa_output_row(row, region_en, translations[region_name], len(mc1_list)), out.key(row))
+
+    for region_name, (out, output_filename, _) in outputs.items():
         try:
-            mc2_list = ast.literal_eval(row['mc2_choice']) if isinstance(row['mc2_choice'], str) and row['mc2_choice'].startswith('[') else [row['mc2_choice']]
-        except:
-            mc2_list = [x.strip() for x in str(row['mc2_choice']).split(',') if x.strip()]
-
-        # 각 선택지 번역
-        mc1_translated = [translate_dialects(c, region_name) for c in mc1_list]
-        mc2_translated = [translate_dialects(c, region_name) for c in mc2_list]
-
-        translated_results.append({
-            f"question_{region_en}": question_dialect,
-            f"mc1_choice_{region_en}": mc1_translated,
-            "mc1_label": row["mc1_label"],
-            f"mc2_choice_{region_en}": mc2_translated,
-            "mc2_label": row["mc2_label"],
-            "ai_answer_mc1": row["ai_answer_mc1"],
-            "mc1_result": row["mc1_result"],
-            "ai_answer_mc2": row["ai_answer_mc2"],
-            "mc2_result": row["mc2_result"],
-        })
-        time.sleep(1.2)
+            out.finalize()
+            print(f"🎉 {region_name} TruthfulQA 방언 파일 저장 완료 → {output_filename}")
+        except Exception as e:
+            print(f"🚨 TruthfulQA CSV 저장 실패: {e}", file=sys.stderr)
+
 
+# ============================================================================
+# 실행부
+# ============================================================================
+if __name__ == "__main__":
+    mednli_input_csv = os.path.join(BASE_PATH, MEDNLI_INPUT_FILENAME)
     try:
-        with open(output_filename, "w", encoding="utf-8", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(translated_results)
-        print(f"🎉 {region_name} TruthfulQA 방언 파일 저장 완료 → {output_filename}")
+        mednli_columns = read_header(mednli_input_csv)
+        if 'sentence1_ko' not in mednli_columns and 'sentence1' not in mednli_columns:
+            raise ValueError("MedNLI 파일에 'sentence1' 또는 'sentence1_ko' 컬럼이 없습니다.")
     except Exception as e:
-        print(f"🚨 TruthfulQA CSV 저장 실패: {e}", file=sys.stderr)
+        print(f"🚨 MedNLI 파일 로드 오류: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    truthfulqa_input_csv = os.path.join(BASE_PATH, TRUTHFULQA_INPUT_FILENAME)
+    try:
+        tqa_columns = read_header(truthfulqa_input_csv)
+        if not all(col in tqa_columns for col in required_tqa_cols):
+            raise ValueError("TruthfulQA 파일에 필수 컬럼이 누락되었습니다.")
+    except Exception as e:
+        print(f"🚨 TruthfulQA 파일 로드 오류: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if MULTI_REGION:
+        # 입력 한 번 순회로 4개 지역 파일을 동시에 채움
+        translate_mednli(mednli_input_csv, list(regions.items()))
+        translate_truthfulqa(truthfulqa_input_csv, list(regions.items()))
+    else:
+        for item in regions.items():
+            translate_mednli(mednli_input_csv, [item])
+        for item in regions.items():
+            translate_truthfulqa(truthfulqa_input_csv, [item])
 
-print("\n\n✅ MedNLI 4개 + TruthfulQA 4개 번역 완료 (총 8개 파일 생성됨)")
+    print("\n\n✅ MedNLI 4개 + TruthfulQA 4개 번역 완료 (총 8개 파일 생성됨)")
+    print(tm.summary())
+    print(cache_summary())
+    print(perf_stats.perf_summary())
@@ -0,0 +1,152 @@
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from collections import defaultdict
+
+# 번역 메모리 파일 (실행·데이터셋 간 공유)
+TM_PATH = os.environ.get("TM_PATH", "translation_memory.sqlite")
+# near-duplicate 로 보고할 최소 유사도 (추정 Jaccard)
+TM_NEAR_THRESHOLD = float(os.environ.get("TM_NEAR_THRESHOLD", "0.8"))
+# 이 값 이상이면 near-duplicate 번역을 그대로 재사용 (기본: 재사용 안 함, 보고만)
+TM_NEAR_REUSE = float(os.environ.get("TM_NEAR_REUSE", "1.01"))
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE = 3
+_PRIME = (1 << 61) - 1
+
+# 프로세스와 무관하게 항상 같은 해시 함수 (Python hash() 는 실행마다 달라짐)
+_rng = random.Random(20240601)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFC", str(text))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def shingles(norm):
+    compact = norm.replace(" ", "")
+    if len(compact) <= SHINGLE:
+        return {compact}
+    return {compact[i:i + SHINGLE] for i in range(len(compact) - SHINGLE + 1)}
+
+
+def minhash(norm):
+    hashed = [zlib.crc32(s.encode("utf-8")) for s in shingles(norm)]
+    return tuple(min((a * h + b) % _PRIME for h in hashed) for a, b in _PERMS)
+
+
+def similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+#############################################
+# 번역 메모리: (지역, 정규화된 원문) → 번역
+#   - exact: SQLite 에 영구 저장
+#   - near : MinHash + LSH 밴딩 (메모리에서 재구성)
+#############################################
+class TranslationMemory:
+    def __init__(self, path=TM_PATH, near_threshold=TM_NEAR_THRESHOLD, near_reuse=TM_NEAR_REUSE):
+        self.path = path
+        self.near_threshold = near_threshold
+        self.near_reuse = near_reuse
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory ("
+            " region TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (region, source))"
+        )
+        self._conn.commit()
+
+        self._exact = {}
+        self._sigs = {}
+        self._buckets = defaultdict(set)
+        for region, source, translation in self._conn.execute(
+            "SELECT region, source, translation FROM memory"
+        ):
+            self._index(region, source, translation)
+
+        # 지역별 통계: lookups / exact / near(보고) / near_reused
+        self.stats = defaultdict(lambda: {"lookups": 0, "exact": 0, "near": 0, "near_reused": 0})
+
+    def _index(self, region, norm, translation):
+        self._exact[(region, norm)] = translation
+        sig = minhash(norm)
+        self._sigs[(region, norm)] = sig
+        for band in range(BANDS):
+            chunk = sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+            self._buckets[(region, band, chunk)].add(norm)
+
+    def near(self, region, text):
+        """가장 비슷한 기존 원문 → (원문, 번역, 유사도) 또는 None"""
+        norm = normalize(text)
+        sig = minhash(norm)
+        candidates = set()
+        with self._lock:
+            for band in range(BANDS):
+                chunk = sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+                candidates |= self._buckets.get((region, band, chunk), set())
+            candidates.discard(norm)
+            best = None
+            for cand in candidates:
+                score = similarity(sig, self._sigs[(region, cand)])
+                if score >= self.near_threshold and (best is None or score > best[2]):
+                    best = (cand, self._exact[(region, cand)], score)
+        return best
+
+    def lookup(self, region, text):
+        """번역이 있으면 반환, 없으면 None. 호출할 때마다 적중률 통계에 반영된다."""
+        norm = normalize(text)
+        with self._lock:
+            stat = self.stats[region]
+            stat["lookups"] += 1
+            hit = self._exact.get((region, norm))
+            if hit is not None:
+                stat["exact"] += 1
+                return hit
+        near = self.near(region, text)
+        if near is None:
+            return None
+        with self._lock:
+            stat["near"] += 1
+            if near[2] >= self.near_reuse:
+                stat["near_reused"] += 1
+                return near[1]
+        return None
+
+    def contains(self, region, text):
+        return (region, normalize(text)) in self._exact
+
+    def put(self, region, text, translation):
+        norm = normalize(text)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO memory (region, source, translation, created_at) VALUES (?, ?, ?, ?)",
+                (region, norm, translation, time.time()),
+            )
+            self._conn.commit()
+            self._index(region, norm, translation)
+
+    def summary(self):
+        lines = ["📚 번역 메모리 적중률"]
+        for region, stat in self.stats.items():
+            total = stat["lookups"]
+            reused = stat["exact"] + stat["near_reused"]
+            rate = reused / total * 100 if total else 0.0
+            lines.append(
+                f"   • {region}: 조회 {total} / exact {stat['exact']} / near-dup {stat['near']}"
+                f" (재사용 {stat['near_reused']}) → 호출 절감 {rate:.1f}%"
+            )
+        return "\n".join(lines)
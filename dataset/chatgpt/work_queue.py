@@ -0,0 +1,188 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# 작업 큐 파일 (여러 호스트의 worker 가 같은 공유 폴더의 파일을 본다)
+SHARD_QUEUE_PATH = os.environ.get("SHARD_QUEUE_PATH", "shard_queue.sqlite")
+# lease 유지 시간(초). worker 는 그 1/3 마다 연장하고, 연장이 끊긴 shard 는 다른 worker 가 가져간다
+SHARD_LEASE_SECONDS = float(os.environ.get("SHARD_LEASE_SECONDS", "300"))
+# shard 하나를 최대 몇 번까지 가져가 볼지 (넘으면 failed)
+SHARD_MAX_ATTEMPTS = int(os.environ.get("SHARD_MAX_ATTEMPTS", "3"))
+
+
+#############################################
+# SQLite 작업 큐
+#   inputs: 입력 파일 하나 (내용 해시 / 평가 옵션 / 병합 여부)
+#   shards: 입력의 행 구간 하나 (pending → leased → done / failed)
+#   - claim 은 BEGIN IMMEDIATE 로 한 번에 한 worker 만 → 같은 shard 를 둘이 가져가지 않음
+#   - lease 가 만료된 shard (worker 가 죽었거나 멈춤) 는 놀고 있는 worker 가 다시 가져간다
+#   - 공유 파일 시스템(NFS 등)에서는 WAL 이 안전하지 않아 기본 rollback journal 을 쓴다
+#############################################
+class ShardQueue:
+    def __init__(self, path=SHARD_QUEUE_PATH, lease_seconds=SHARD_LEASE_SECONDS, max_attempts=SHARD_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS inputs ("
+            " input TEXT PRIMARY KEY,"
+            " sha256 TEXT NOT NULL,"
+            " task TEXT NOT NULL,"
+            " options TEXT NOT NULL,"
+            " shards INTEGER NOT NULL,"
+            " merged INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS shards ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " input TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " shard_file TEXT NOT NULL,"
+            " start INTEGER NOT NULL,"
+            " stop INTEGER NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " worker TEXT,"
+            " lease_until REAL NOT NULL DEFAULT 0,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_shards_status ON shards(status, seq)")
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 연결은 스레드 간 공유 불가 → 스레드마다 하나씩 (lease 연장 스레드 포함)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _write(self, fn):
+        """쓰기 트랜잭션 하나 (BEGIN IMMEDIATE → 다른 프로세스의 쓰기와 직렬화)"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    # ---------- coordinator ----------
+    def input_entry(self, input_file):
+        row = self._conn().execute("SELECT * FROM inputs WHERE input = ?", (input_file,)).fetchone()
+        return dict(row, options=json.loads(row["options"])) if row else None
+
+    def add_input(self, input_file, sha256, task, options, shards):
+        """shards: [(shard_file, start, stop)]. 같은 입력의 이전 계획은 지운다."""
+        def add(conn):
+            conn.execute("DELETE FROM shards WHERE input = ?", (input_file,))
+            conn.execute(
+                "INSERT OR REPLACE INTO inputs (input, sha256, task, options, shards, merged) VALUES (?, ?, ?, ?, ?, 0)",
+                (input_file, sha256, task, json.dumps(options, ensure_ascii=False), len(shards)),
+            )
+            conn.executemany(
+                "INSERT INTO shards (input, seq, shard_file, start, stop) VALUES (?, ?, ?, ?, ?)",
+                [(input_file, seq, path, start, stop) for seq, (path, start, stop) in enumerate(shards)],
+            )
+        self._write(add)
+
+    def reset_failed(self):
+        """failed shard 를 다시 pending 으로 (시도 횟수 초기화)"""
+        return self._write(lambda conn: conn.execute(
+            "UPDATE shards SET status = 'pending', attempts = 0, error = NULL WHERE status = 'failed'"
+        ).rowcount)
+
+    # ---------- worker ----------
+    def claim(self, worker, n=1):
+        """pending 또는 lease 가 만료된 shard 를 최대 n 개 가져온다.
+        seq 순으로 고르므로 여러 입력 파일이 worker 들에게 고르게 섞여 나간다."""
+        def claim(conn):
+            now = time.time()
+            # 만료된 lease 중 시도 횟수를 다 쓴 것은 failed
+            conn.execute(
+                "UPDATE shards SET status = 'failed', error = COALESCE(error, 'lease 만료') "
+                "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            rows = conn.execute(
+                "SELECT * FROM shards WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY seq, id LIMIT ?",
+                (now, n),
+            ).fetchall()
+            for row in rows:
+                conn.execute(
+                    "UPDATE shards SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (worker, now + self.lease_seconds, row["id"]),
+                )
+            return [dict(row) for row in rows]
+        return self._write(claim)
+
+    def renew(self, ids, worker):
+        """아직 이 worker 가 가진 shard 의 lease 연장 → 연장된 id 목록"""
+        def renew(conn):
+            kept = []
+            for shard_id in ids:
+                cur = conn.execute(
+                    "UPDATE shards SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                    (time.time() + self.lease_seconds, shard_id, worker),
+                )
+                if cur.rowcount:
+                    kept.append(shard_id)
+            return kept
+        return self._write(renew)
+
+    def complete(self, shard_id, worker):
+        """done 으로 표시. lease 를 잃었으면 (다른 worker 가 가져감) False."""
+        return self._write(lambda conn: conn.execute(
+            "UPDATE shards SET status = 'done', lease_until = 0, error = NULL "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (shard_id, worker),
+        ).rowcount == 1)
+
+    def release(self, shard_id, worker, error):
+        """실패한 shard 를 돌려준다 (시도 횟수를 다 썼으면 failed)"""
+        self._write(lambda conn: conn.execute(
+            "UPDATE shards SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_until = 0, error = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            (self.max_attempts, error, shard_id, worker),
+        ))
+
+    def begin_merge(self, input_file):
+        """모든 shard 가 done 이고 아직 병합 전이면 병합 권한을 가져온다 (한 worker 만 True)"""
+        return self._write(lambda conn: conn.execute(
+            "UPDATE inputs SET merged = 1 WHERE input = ? AND merged = 0 AND NOT EXISTS "
+            "(SELECT 1 FROM shards WHERE shards.input = inputs.input AND status != 'done')",
+            (input_file,),
+        ).rowcount == 1)
+
+    def abort_merge(self, input_file):
+        self._write(lambda conn: conn.execute("UPDATE inputs SET merged = 0 WHERE input = ?", (input_file,)))
+
+    # ---------- 조회 ----------
+    def inputs(self):
+        rows = self._conn().execute("SELECT * FROM inputs ORDER BY input").fetchall()
+        return [dict(row, options=json.loads(row["options"])) for row in rows]
+
+    def shards(self, input_file):
+        return [dict(row) for row in self._conn().execute(
+            "SELECT * FROM shards WHERE input = ? ORDER BY seq", (input_file,)
+        ).fetchall()]
+
+    def counts(self):
+        """{status: shard 수}"""
+        return {row[0]: row[1] for row in self._conn().execute(
+            "SELECT status, COUNT(*) FROM shards GROUP BY status"
+        ).fetchall()}
+
+    def unfinished(self):
+        counts = self.counts()
+        return counts.get("pending", 0) + counts.get("leased", 0)